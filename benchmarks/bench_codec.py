@@ -0,0 +1,84 @@
+import argparse
+import json
+import sys
+import time
+
+from edsm import codec
+
+from tests import standin
+
+"""
+Compares JSON codec backends (see edsm.codec) on EDSM payloads.
+
+    python -m benchmarks.bench_codec [recorded_response.json ...]
+
+Decodes from bytes (as edsm.api does with response bodies) and encodes with config.JSON_INDENT=None.
+Without arguments, uses synthetic payloads shaped like EDSM responses. Prints results as JSON.
+"""
+
+def synthetic_payloads() -> dict[str, bytes]:
+    market = standin.market({'marketId' : 1230})
+
+    # real markets list ~100+ commodities
+    template = market['commodities'][0]
+    market['commodities'] = [dict(template, id = f'commodity{i}', name = f'Commodity {i}', stock = i * 7) for i in range(120)]
+
+    return {
+        'traffic' : json.dumps(standin.traffic({'systemName' : 'Sol'})).encode(),
+        'stations' : json.dumps(standin.stations({'systemName' : 'Sol'})).encode(),
+        'market' : json.dumps(market).encode(),
+        'sphere-systems' : json.dumps(standin.sphere_systems({'systemName' : 'Sol', 'radius' : 500})).encode(),
+    }
+
+def time_per_call(func, arg, min_time:float = 0.2) -> float:
+    # seconds per call, averaged over enough calls to take at least min_time
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(arg)
+
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+        calls *= 2
+
+def run(payloads:dict[str, bytes]) -> list[dict]:
+    results = []
+
+    for name in codec.available():
+        c = codec.get_codec(name)
+
+        for payload_name, body in payloads.items():
+            obj = c.loads(body)
+
+            results.append({
+                'codec' : name,
+                'payload' : payload_name,
+                'bytes' : len(body),
+                'loads_us' : time_per_call(c.loads, body) * 1e6,
+                'dumps_us' : time_per_call(c.dumps, obj) * 1e6,
+            })
+
+    return results
+
+def main(argv:list[str] = None):
+    parser = argparse.ArgumentParser(description = "Compare JSON codec backends on EDSM payloads")
+    parser.add_argument('payloads', nargs = '*', help = "files holding recorded EDSM responses")
+    args = parser.parse_args(argv)
+
+    if args.payloads:
+        payloads = {}
+        for path in args.payloads:
+            with open(path, 'rb') as f:
+                payloads[path] = f.read()
+
+    else:
+        payloads = synthetic_payloads()
+
+    json.dump({'benchmark' : 'codec', 'results' : run(payloads)}, sys.stdout, indent = 2)
+    print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from unittest import mock
+
+import requests
+
+import edsm.api as api
+import edsm.log as log
+
+from tests import standin
+
+"""
+Measures edsm.log.Logger against a local EDSM stand-in (see tests/standin.py), no edsm.net needed.
+
+    python -m benchmarks.bench_logger --systems 100 1000 10000 --latency 0.02 --rate-limit 720
+
+For each number of systems, runs Logger.log cycles and reports cycles per second, requests per second,
+time spent appending to the log, and peak memory (traced during one extra cycle, since tracing slows things down).
+The stand-in runs in its own process so it doesn't compete with the logger for the GIL. Prints results as JSON.
+"""
+
+ENDPOINTS = {
+    'traffic' : '/api-system-v1/traffic',
+    'stations' : '/api-system-v1/stations',
+    'market' : '/api-system-v1/stations/market',
+}
+
+KEYS = {
+    'traffic' : {'system' : ['name', 'id64'], 'traffic' : ['traffic', 'breakdown']},
+    'stations' : {'system' : ['name', 'id64'], 'traffic' : ['traffic'], 'stations' : ['name', 'marketId', 'market']},
+}
+
+COUNT_ROUTE = '/stand-in/requests'
+
+def serve(conn, recorded:dict, options:dict):
+    # runs in a child process until conn is closed by the parent
+    routes = dict(standin.ROUTES)
+    for endpoint, filepath in recorded.items():
+        routes[ENDPOINTS[endpoint]] = standin.recorded(filepath)
+
+    with standin.StandIn(routes, **options) as server:
+        routes[COUNT_ROUTE] = lambda params: len(server.requests)
+        conn.send(server.url)
+
+        try:
+            conn.recv()
+
+        except EOFError:
+            pass
+
+def request_count(url:str) -> int:
+    return requests.get(url + COUNT_ROUTE).json()
+
+def synthetic_systems(n:int) -> list[dict]:
+    return [standin.system({'systemName' : f'Benchmark {i}'}) for i in range(n)]
+
+def timed_cycle(logger:log.Logger) -> dict:
+    # same steps as Logger.log, timed separately
+    start = time.perf_counter()
+    logger.update_by_keys()
+
+    payload = logger.generate_payload()
+
+    append_start = time.perf_counter()
+    logger.append(payload)
+
+    end = time.perf_counter()
+    return {'cycle' : end - start, 'append' : end - append_start}
+
+def run(url:str, n:int, keys:dict, log_format:str, cycles:int, directory:str) -> dict:
+    logger = log.Logger(keys, format = log_format)
+    logger.filepath = os.path.join(directory, f'bench-{n}.{log_format}')
+    logger.systems.populate(synthetic_systems(n))
+
+    requests_before = request_count(url)
+    results = [timed_cycle(logger) for _ in range(cycles)]
+    requests_made = request_count(url) - requests_before - 1 # minus the first count request
+
+    elapsed = sum(result['cycle'] for result in results)
+
+    tracemalloc.start()
+    timed_cycle(logger)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'systems' : n,
+        'format' : log_format,
+        'cycles' : cycles,
+        'cycles_per_second' : cycles / elapsed,
+        'requests' : requests_made,
+        'requests_per_second' : requests_made / elapsed,
+        'append_seconds' : [result['append'] for result in results],
+        'append_seconds_mean' : sum(result['append'] for result in results) / cycles,
+        'peak_memory_bytes' : peak,
+    }
+
+def main(argv:list[str] = None):
+    parser = argparse.ArgumentParser(description = "Benchmark edsm.log.Logger against a local EDSM stand-in")
+    parser.add_argument('--systems', type = int, nargs = '+', default = [100, 1000, 10000])
+    parser.add_argument('--cycles', type = int, default = 3)
+    parser.add_argument('--keys', choices = KEYS, default = 'traffic')
+    parser.add_argument('--format', default = 'jsonl', help = "log format (see edsm.log.Logger)")
+    parser.add_argument('--latency', type = float, default = 0, help = "seconds added to each response")
+    parser.add_argument('--error-rate', type = float, default = 0, help = "fraction of requests answered with a 500")
+    parser.add_argument('--rate-limit', type = int, default = None, help = "requests allowed per hour")
+    parser.add_argument('--recorded', nargs = '+', default = [], metavar = 'ENDPOINT=FILE',
+        help = f"serve a recorded response for an endpoint ({', '.join(ENDPOINTS)})")
+    args = parser.parse_args(argv)
+
+    recorded = dict(item.split('=', 1) for item in args.recorded)
+    options = {'latency' : args.latency, 'error_rate' : args.error_rate, 'rate_limit' : args.rate_limit}
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target = serve, args = (child_conn, recorded, options), daemon = True)
+    server.start()
+
+    try:
+        url = parent_conn.recv()
+        results = []
+
+        with tempfile.TemporaryDirectory() as directory, \
+            mock.patch.object(api.System, 'url_base', url + '/api-system-v1/'), \
+            mock.patch.object(api.Systems, 'url_base', url + '/api-v1/'):
+
+            for n in args.systems:
+                results.append(run(url, n, KEYS[args.keys], args.format, args.cycles, directory))
+
+    finally:
+        parent_conn.close()
+        server.join(timeout = 5)
+
+    output = {
+        'benchmark' : 'logger',
+        'options' : dict(vars(args), recorded = recorded),
+        'results' : results,
+    }
+
+    json.dump(output, sys.stdout, indent = 2)
+    print()
+
+if __name__ == '__main__':
+    main()
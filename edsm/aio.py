@@ -0,0 +1,365 @@
+import asyncio
+import ssl
+import time
+import weakref
+
+from urllib.parse import urlsplit, urlencode
+
+import edsm.api as api
+import edsm.cache as cache
+import edsm.coalesce as coalesce
+import edsm.codec as codec
+import edsm.config as config
+import edsm.metrics as metrics
+import edsm.ratelimit as ratelimit
+
+from requests import HTTPError
+
+"""
+asyncio counterparts to the endpoint wrappers in edsm.api.
+
+Requests are sent over pooled keep-alive HTTP/1.1 connections opened with asyncio streams,
+so thousands of requests can be in flight from one event loop without holding a thread each.
+Concurrency is bounded per <Client> (see config.ASYNC_MAX_CONCURRENCY).
+Close the default client with close_client before the event loop ends (or pass your own <Client> and close it).
+"""
+
+# NOTE: one default client per event loop, since asyncio streams and semaphores can't be shared across loops
+_clients = weakref.WeakKeyDictionary()
+
+class Client():
+    """
+    Minimal HTTP/1.1 client with per-host keep-alive connection pools.
+
+    arg: max_concurrency <int> - max number of requests in flight at once (defaults to config.ASYNC_MAX_CONCURRENCY)
+    arg: timeout <float> - seconds to wait for a single request (defaults to config.REQUEST_TIMEOUT)
+
+    method: get (url, params, headers) <tuple[int, dict, bytes]>
+    method: close <None>
+    """
+    def __init__(self, max_concurrency:int = None, timeout:float = None):
+        if max_concurrency is None:
+            max_concurrency = config.ASYNC_MAX_CONCURRENCY
+
+        if timeout is None:
+            timeout = config.REQUEST_TIMEOUT
+
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = timeout
+
+        # (scheme, host, port) -> list of idle (reader, writer) pairs
+        self.pools = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get(self, url:str, params:dict = None, headers:dict = None) -> tuple[int, dict, bytes]:
+        """
+        arg: url* <str>
+        arg: params <dict> - query string parameters
+        arg: headers <dict> - extra request headers
+
+        returns <tuple[int, dict, bytes]> - status code, response headers (lowercased names), body
+
+        Sends a GET request, reusing an idle pooled connection when one is available
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+
+        query_string = parts.query
+        if params:
+            query_string = '&'.join(filter(None, [query_string, urlencode(params, doseq = True)]))
+
+        if query_string:
+            path = f'{path}?{query_string}'
+
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+
+        request_headers = {'Host' : parts.netloc, 'User-Agent' : config.USER_AGENT, 'Connection' : 'keep-alive'}
+        request_headers.update(headers or {})
+
+        request = f'GET {path} HTTP/1.1\r\n'
+        request += ''.join(f'{k}: {v}\r\n' for k, v in request_headers.items())
+        request = (request + '\r\n').encode('latin-1')
+
+        async with self.semaphore:
+            return await asyncio.wait_for(self._send(key, request), self.timeout)
+
+    async def _send(self, key, request:bytes):
+        # NOTE: a pooled connection may have been closed by the server while idle,
+        # so a failure on a reused connection is retried once on a fresh one
+        reused = bool(self.pools.get(key))
+        reader, writer = await self._acquire(key)
+
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, headers, body, keep_alive = await self._read_response(reader)
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self._close(writer)
+            if not reused:
+                raise
+
+            return await self._send(key, request)
+
+        except BaseException:
+            await self._close(writer)
+            raise
+
+        if keep_alive:
+            self.pools.setdefault(key, []).append((reader, writer))
+        else:
+            await self._close(writer)
+
+        return status, headers, body
+
+    async def _acquire(self, key):
+        idle = self.pools.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+
+            await self._close(writer)
+
+        scheme, host, port = key
+        ssl_context = ssl.create_default_context() if scheme == 'https' else None
+
+        return await asyncio.open_connection(host, port, ssl = ssl_context)
+
+    @staticmethod
+    async def _read_response(reader:asyncio.StreamReader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before response")
+
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = (connection != 'close') if version == 'HTTP/1.1' else (connection == 'keep-alive')
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # discard trailers
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+
+            body = b''.join(chunks)
+
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        return int(status), headers, body, keep_alive
+
+    @staticmethod
+    async def _close(writer:asyncio.StreamWriter):
+        writer.close()
+        try:
+            await writer.wait_closed()
+
+        except (OSError, ssl.SSLError):
+            # NOTE: the connection is gone either way, errors from shutting it down don't matter
+            pass
+
+    async def close(self):
+        pools, self.pools = self.pools, {}
+
+        for idle in pools.values():
+            for reader, writer in idle:
+                await self._close(writer)
+
+
+def get_client() -> Client:
+    """
+    returns <Client>
+
+    Returns the default client for the running event loop, creating it on first use
+    """
+    loop = asyncio.get_running_loop()
+
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = Client()
+
+    return client
+
+async def close_client():
+    """
+    Closes the default client for the running event loop (see get_client), if it has one.
+    Call it before the loop is closed, i.e. at the end of the coroutine passed to asyncio.run
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+async def query(url, params, client:Client = None, fresh:bool = False):
+    # NOTE: fresh skips the cache lookup (the response is still cached), same as edsm.api.query
+    response_cache = cache.get_cache()
+    if response_cache and not fresh:
+        cached = response_cache.get(url, params)
+        if cached is not None:
+            return codec.loads(cached)
+
+    if config.COALESCE_REQUESTS:
+        # NOTE: concurrent callers with the same url and params share one request (see edsm.coalesce),
+        # but each decodes its own copy of the body
+        return codec.loads(await coalesce.flights.do_async(cache.cache_key(url, params), lambda: fetch(url, params, client, response_cache)))
+
+    return codec.loads(await fetch(url, params, client, response_cache))
+
+async def fetch(url, params, client:Client = None, response_cache:cache.ResponseCache = None) -> bytes:
+    # sends the request for query(), skipping the cache lookup. Returns the raw body
+    if client is None:
+        client = get_client()
+
+    limiter = ratelimit.get_limiter()
+    recorder = metrics.get_metrics()
+
+    for attempt in range(config.RATE_LIMIT_RETRIES + 1):
+        await limiter.acquire_async()
+        start = time.perf_counter()
+        try:
+            status, headers, body = await client.get(url, params)
+
+        except Exception:
+            if recorder:
+                recorder.observe_request(cache.endpoint_of(url), 'error', time.perf_counter() - start)
+            raise
+
+        finally:
+            limiter.release()
+
+        if recorder:
+            recorder.observe_request(cache.endpoint_of(url), status, time.perf_counter() - start, len(body))
+
+        limiter.update(status, headers)
+        if status != 429:
+            break
+
+    if status >= 400:
+        error = HTTPError(f"{status} Error for url: {url}")
+        error.status = status
+        raise error
+
+    if response_cache:
+        response_cache.set(url, params, body)
+
+    return body
+
+
+class System(api.System):
+    """
+    Async versions of the endpoint wrappers in <edsm.api.System>.
+    See the docstrings there for args and return values.
+    """
+    @classmethod
+    async def traffic(self, systemName):
+        endpoint = "traffic"
+        params = {'systemName' : systemName}
+
+        return await query(self.url_base + endpoint, params)
+
+    @classmethod
+    async def stations(self, systemName, fresh = False):
+        endpoint = "stations"
+        params = {'systemName' : systemName}
+
+        return await query(self.url_base + endpoint, params, fresh = fresh)
+
+    @classmethod
+    async def market(self, systemName, stationName):
+        endpoint = "stations/market"
+        params = {'systemName' : systemName, 'stationName' : stationName}
+
+        return await query(self.url_base + endpoint, params)
+
+    @classmethod
+    async def marketById(self, marketId):
+        endpoint = "stations/market"
+        params = {'marketId' : marketId}
+
+        return await query(self.url_base + endpoint, params)
+
+    @classmethod
+    async def factions(self, systemName, showHistory = 0):
+        endpoint = "factions"
+        params = {'systemName' : systemName, 'showHistory' : int(showHistory)}
+
+        return await query(self.url_base + endpoint, params)
+
+
+class Systems(api.Systems):
+    """
+    Async versions of the endpoint wrappers in <edsm.api.Systems>.
+    See the docstrings there for args and return values.
+    """
+    @classmethod
+    async def system(self, systemName:str, showId:bool = 0,
+        showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0,
+        showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0):
+
+        endpoint = "system"
+        params = {'systemName' : systemName,
+            **api.show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo)}
+
+        return await query(self.url_base + endpoint, params)
+
+    @classmethod
+    async def sphere_systems(self, systemName:str, radius:int, showId:bool = 0,
+        showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0,
+        showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0):
+
+        endpoint = "sphere-systems"
+
+        params = {'systemName' : systemName, 'radius' : radius,
+            **api.show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo)}
+
+        return await query(self.url_base + endpoint, params)
+
+    @classmethod
+    async def cube_systems(self, systemName:str = None, size:int = None, x:float = None, y:float = None, z:float = None,
+        showId:bool = 0, showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0,
+        showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0):
+
+        endpoint = "cube-systems"
+
+        params = api.cube_params(systemName, size, x, y, z,
+            api.show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo))
+
+        return await query(self.url_base + endpoint, params)
+
+    @classmethod
+    async def systems(self, systemNames:list[str], showId:bool = 0,
+        showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0,
+        showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0):
+
+        endpoint = "systems"
+        params = {'systemName[]' : list(systemNames),
+            **api.show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo)}
+
+        return await query(self.url_base + endpoint, params)
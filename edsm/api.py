@@ -1,13 +1,163 @@
+import threading
+import time
+
 import requests
-import json
+import edsm.cache as cache
+import edsm.coalesce as coalesce
+import edsm.codec as codec
 import edsm.config as config
+import edsm.metrics as metrics
+import edsm.ratelimit as ratelimit
+
+from requests.adapters import HTTPAdapter
+
+# NOTE: one session is shared by every caller (including ThreadPoolExecutor workers in edsm.models)
+# so that connections are kept alive and reused instead of paying a new TCP+TLS handshake per request
+_session = None
+_session_lock = threading.Lock()
+
+def new_session(pool_size:int = None) -> requests.Session:
+    """
+    arg: pool_size <int> - max number of pooled connections per host (defaults to config.MAX_THREADS)
+
+    returns <requests.Session>
+
+    Builds a keep-alive session with a connection pool large enough for every worker thread
+    """
+    if pool_size is None:
+        pool_size = config.MAX_THREADS
+
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+def get_session() -> requests.Session:
+    """
+    returns <requests.Session>
+
+    Returns the shared session used by query(), creating it on first use
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+
+    return _session
+
+def set_session(session:requests.Session or None) -> requests.Session or None:
+    """
+    arg: session* <requests.Session or None> - session to be shared by all queries. 
+    Pass None to have a fresh one created on next use.
+
+    returns <requests.Session or None> - the previously shared session
+
+    Swaps out the shared session (i.e. to inject a fake one for testing)
+    """
+    global _session
+
+    with _session_lock:
+        old_session = _session
+        _session = session
+
+    return old_session
+
+def query(url, params, session:requests.Session = None, fresh:bool = False):
+    # NOTE: fresh skips the cache lookup (the response is still cached), for data that must be current
+    response_cache = cache.get_cache()
+    if response_cache and not fresh:
+        body = response_cache.get(url, params)
+        if body is not None:
+            return codec.loads(body)
+
+    if config.COALESCE_REQUESTS:
+        # NOTE: concurrent callers with the same url and params share one request (see edsm.coalesce),
+        # but each decodes its own copy of the body
+        return codec.loads(coalesce.flights.do(cache.cache_key(url, params), lambda: fetch(url, params, session, response_cache)))
 
-def query(url, params):
+    return codec.loads(fetch(url, params, session, response_cache))
+
+def fetch(url, params, session:requests.Session = None, response_cache:cache.ResponseCache = None) -> bytes:
+    # sends the request for query(), skipping the cache lookup. Returns the raw body
+    if session is None:
+        session = get_session()
+
+    limiter = ratelimit.get_limiter()
+    recorder = metrics.get_metrics()
     headers = {'User-Agent' : config.USER_AGENT}
-    r = requests.get(url, params = params, headers = headers)
+
+    # NOTE: a 429 makes the limiter back off, so the request is retried instead of failing the whole update
+    for attempt in range(config.RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            r = session.get(url, params = params, headers = headers, timeout = config.REQUEST_TIMEOUT)
+
+        except Exception:
+            if recorder:
+                recorder.observe_request(cache.endpoint_of(url), 'error', time.perf_counter() - start)
+            raise
+
+        finally:
+            limiter.release()
+
+        if recorder:
+            recorder.observe_request(cache.endpoint_of(url), r.status_code, time.perf_counter() - start, len(r.content))
+
+        limiter.update(r.status_code, r.headers)
+        if r.status_code != 429:
+            break
+
     r.raise_for_status()
 
-    return json.loads(r.text)
+    if response_cache:
+        response_cache.set(url, params, r.content)
+
+    return r.content
+
+def show_params(showId:bool = 0, showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0,
+    showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0) -> dict:
+    """
+    returns <dict> - the optional show* params shared by the <Systems> endpoints (see Systems.system)
+    """
+    if showAllInfo:
+        showId = 1
+        showCoordinates = 1
+        showPermit = 1
+        showInformation = 1
+        showPrimaryStar = 1
+        includeHidden = 1
+
+    return {'showId' : int(showId),
+    'showCoordinates' : int(showCoordinates),
+    'showPermit' : int(showPermit),
+    'showInformation' : int(showInformation),
+    'showPrimaryStar' : int(showPrimaryStar),
+    'includeHidden' : int(includeHidden)}
+
+def cube_params(systemName:str, size:int, x:float, y:float, z:float, show:dict) -> dict:
+    """
+    arg: show* <dict> - see show_params
+
+    returns <dict> - params for Systems.cube_systems, centered on systemName, or on x, y, z without one
+    """
+    params = dict(show)
+
+    if systemName is not None:
+        params['systemName'] = systemName
+
+    else:
+        params.update(x = x, y = y, z = z)
+
+    if size is not None:
+        params['size'] = size
+
+    return params
 
 class System():
     url_base = "https://www.edsm.net/api-system-v1/"
@@ -26,9 +176,10 @@ class System():
         return query(self.url_base + endpoint, params)
 
     @classmethod
-    def stations(self, systemName):
+    def stations(self, systemName, fresh = False):
         """
         systemName* <string> - name of system
+        fresh <bool> - skip the response cache (see query)
 
         returns <dict>
 
@@ -38,7 +189,7 @@ class System():
         endpoint = "stations"
         params = {'systemName' : systemName}
 
-        return query(self.url_base + endpoint, params)
+        return query(self.url_base + endpoint, params, fresh = fresh)
 
     @classmethod
     def market(self, systemName, stationName):
@@ -111,22 +262,9 @@ class Systems():
         Queries EDSM to get information on a system
         """
         
-        if showAllInfo:
-            showId = 1
-            showCoordinates = 1
-            showPermit = 1
-            showInformation = 1
-            showPrimaryStar = 1
-            includeHidden = 1
-
         endpoint = "system"
-        params = {'systemName' : systemName, 
-        'showId' : int(showId),
-        'showCoordinates' : int(showCoordinates),
-        'showPermit' : int(showPermit),
-        'showInformation' : int(showInformation),
-        'showPrimaryStar' : int(showPrimaryStar),
-        'includeHidden' : int(includeHidden)}
+        params = {'systemName' : systemName,
+            **show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo)}
 
         return query(self.url_base + endpoint, params)
         
@@ -151,23 +289,65 @@ class Systems():
 
         Queries EDSM to get information on systems within a sphere radius of given system
         """
-        if showAllInfo:
-            showId = 1
-            showCoordinates = 1
-            showPermit = 1
-            showInformation = 1
-            showPrimaryStar = 1
-            includeHidden = 1
-
         endpoint = "sphere-systems"
 
-        params = {'systemName' : systemName, 
-        'radius' : radius, 
-        'showId' : int(showId),
-        'showCoordinates' : int(showCoordinates),
-        'showPermit' : int(showPermit),
-        'showInformation' : int(showInformation),
-        'showPrimaryStar' : int(showPrimaryStar),
-        'includeHidden' : int(includeHidden)}
+        params = {'systemName' : systemName, 'radius' : radius,
+            **show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo)}
+
+        return query(self.url_base + endpoint, params)
+
+    @classmethod
+    def cube_systems(self, systemName:str = None, size:int = None, x:float = None, y:float = None, z:float = None,
+        showId:bool = 0, showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0,
+        showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0):
+        """
+        arg: systemName <string> - name of system at the center of the cube
+        arg: size <int> - width of the cube (in lightyears, EDSM allows up to config.CUBE_MAX_SIZE)
+        arg: x, y, z <float> - coordinates of the center of the cube, used instead of systemName
+
+        arg: showId <bool>
+        arg: showCoordinates <bool>
+        arg: showPermit <bool> 
+        arg: showInformation <bool>
+        arg: showPrimaryStar <bool>
+        arg: includeHidden <bool>
+
+        arg: showAllInfo <bool> - whether to set all optional args to True
+
+        returns <list[dict]>
+
+        Queries EDSM to get information on systems within a cube around given system or coordinates
+        (see edsm.region for regions bigger than one cube)
+        """
+        endpoint = "cube-systems"
+
+        params = cube_params(systemName, size, x, y, z,
+            show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo))
+
+        return query(self.url_base + endpoint, params)
+
+    @classmethod
+    def systems(self, systemNames:list[str], showId:bool = 0, 
+        showCoordinates:bool = 0, showPermit:bool = 0, showInformation:bool = 0, 
+        showPrimaryStar:bool = 0, includeHidden:bool = 0, showAllInfo:bool = 0):
+        """
+        arg: systemNames* <list[string]> - names of systems
+
+        arg: showId <bool>
+        arg: showCoordinates <bool>
+        arg: showPermit <bool>
+        arg: showInformation <bool>
+        arg: showPrimaryStar <bool>
+        arg: includeHidden <bool>
+
+        arg: showAllInfo <bool> - whether to set all optional args to True
+
+        returns <list[dict]> - systems that were found (unknown names are left out)
+
+        Queries EDSM to get information on several systems at once (see edsm.bulk for long lists of names)
+        """
+        endpoint = "systems"
+        params = {'systemName[]' : list(systemNames),
+            **show_params(showId, showCoordinates, showPermit, showInformation, showPrimaryStar, includeHidden, showAllInfo)}
 
         return query(self.url_base + endpoint, params)
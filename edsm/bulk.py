@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+from urllib.parse import quote
+
+import edsm.api as api
+import edsm.config as config
+import edsm.retry as retry
+
+"""
+Fetching many systems by name with EDSM's api-v1/systems endpoint, which takes a list of names per request.
+
+Names are split into chunks small enough for one request, chunks are fetched concurrently,
+and results are handed over as each chunk arrives:
+
+    for systems_data in bulk.iter_systems(names, showCoordinates = 1):
+        ...
+
+    missing = systems.load(names) # see edsm.models.Systems.load
+"""
+
+# encoded length of the key repeated for every name ('systemName%5B%5D=' and '&')
+_PARAM_LENGTH = len(quote('systemName[]')) + 2
+
+def chunks(names:list[str], max_names:int = None, max_length:int = None) -> list[list[str]]:
+    """
+    arg: names* <list[str]>
+    arg: max_names <int> - max names per chunk (defaults to config.BULK_MAX_NAMES)
+    arg: max_length <int> - max length of a chunk's names once encoded in a url (defaults to config.BULK_MAX_URL_LENGTH)
+
+    returns <list[list[str]]> - names in order, split into chunks. A name too long for max_length gets a chunk of its own
+    """
+    max_names = max_names or config.BULK_MAX_NAMES
+    max_length = max_length or config.BULK_MAX_URL_LENGTH
+
+    result = []
+    chunk = []
+    length = 0
+
+    for name in names:
+        name_length = _PARAM_LENGTH + len(quote(name))
+
+        if chunk and (len(chunk) >= max_names or length + name_length > max_length):
+            result.append(chunk)
+            chunk = []
+            length = 0
+
+        chunk.append(name)
+        length += name_length
+
+    if chunk:
+        result.append(chunk)
+
+    return result
+
+def iter_systems(names:list[str], executor:ThreadPoolExecutor = None, **options) -> Iterator[list[dict]]:
+    """
+    arg: names* <list[str]>
+    arg: executor <ThreadPoolExecutor> - (defaults to a new one with config.MAX_THREADS workers)
+    arg: options - passed to edsm.api.Systems.systems (i.e. showCoordinates = 1)
+
+    returns <Iterator[list[dict]]> - systems found in each chunk, in the order chunks finish
+
+    Chunks are retried on transient errors (see edsm.retry). A chunk that still fails raises
+    once it's reached, after the chunks that finished before it were yielded
+    """
+    if executor is None:
+        with ThreadPoolExecutor(max_workers = config.MAX_THREADS) as executor:
+            yield from iter_systems(names, executor, **options)
+
+        return
+
+    futures = [
+        executor.submit(retry.call_with_retries, lambda chunk = chunk: api.Systems.systems(chunk, **options))
+        for chunk in chunks(names)
+    ]
+
+    try:
+        for future in as_completed(futures):
+            # NOTE: EDSM can answer with an empty object instead of an empty list when no names were found
+            yield future.result() or []
+
+    finally:
+        # i.e. generator closed early, don't start chunks that haven't been sent yet
+        for future in futures:
+            future.cancel()
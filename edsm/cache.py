@@ -0,0 +1,331 @@
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlencode
+
+import edsm.config as config
+
+"""
+Response cache used under edsm.api.query and edsm.aio.query.
+
+Raw response bodies are cached (and decoded again on every hit), so models built from a
+cached response never share mutable objects with each other.
+Each endpoint has its own time-to-live (see config.CACHE_TTLS). Endpoints without one are never cached.
+"""
+
+# NOTE: on-disk entries are an 8 byte expiry time (unix time, big-endian double) followed by the response body.
+# Every file the cache writes is named with this prefix, files without it are never read or removed
+_EXPIRY = struct.Struct('>d')
+DISK_PREFIX = 'edsm-cache-'
+
+def endpoint_of(url:str) -> str:
+    """
+    arg: url* <str> - i.e. 'https://www.edsm.net/api-system-v1/stations/market'
+
+    returns <str> - endpoint name with the API prefix removed, i.e. 'stations/market'
+    """
+    path = urlsplit(url).path.strip('/')
+    return path.split('/', 1)[-1]
+
+def cache_key(url:str, params:dict) -> str:
+    return url + '?' + urlencode(sorted((params or {}).items()), doseq = True)
+
+
+class ResponseCache():
+    """
+    In-memory LRU cache of response bodies with per-endpoint TTLs and an optional persistent tier on disk.
+
+    arg: ttls <dict[str, float]> - endpoint -> seconds to keep responses for (defaults to config.CACHE_TTLS)
+    arg: max_entries <int> - max number of responses held in memory (defaults to config.CACHE_MAX_ENTRIES)
+    arg: max_bytes <int> - max total size of responses held in memory (defaults to config.CACHE_MAX_BYTES)
+    arg: path <str or None> - directory for the on-disk tier, None to keep responses in memory only
+    (defaults to config.CACHE_PATH)
+    arg: max_disk_bytes <int> - max total size of responses held on disk (defaults to config.CACHE_DISK_MAX_BYTES)
+
+    method: get (url, params) <bytes or None>
+    method: set (url, params, body) <None>
+    method: stats <dict>
+    method: prune_disk <None> - removes expired entries from disk, then the oldest until under max_disk_bytes
+    method: clear <None>
+
+    NOTE: the disk tier is pruned on set, whenever it grows past max_disk_bytes and
+    at least every prune_interval seconds
+    """
+    prune_interval = 600
+
+    def __init__(self, ttls:dict[str, float] = None, max_entries:int = None, max_bytes:int = None, path:str = None,
+            max_disk_bytes:int = None):
+        self.ttls = ttls if ttls is not None else config.CACHE_TTLS
+        self.max_entries = max_entries if max_entries is not None else config.CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes if max_bytes is not None else config.CACHE_MAX_BYTES
+        self.path = path if path is not None else config.CACHE_PATH
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else config.CACHE_DISK_MAX_BYTES
+
+        # key -> (expires, body), least recently used first
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.lock = threading.Lock()
+
+        self.disk_bytes = 0
+        self.pruned = 0.0
+        self.disk_lock = threading.Lock()
+
+        if self.path:
+            os.makedirs(self.path, exist_ok = True)
+            self.prune_disk()
+
+    def ttl(self, url:str) -> float:
+        return self.ttls.get(endpoint_of(url), 0)
+
+    def get(self, url:str, params:dict) -> bytes or None:
+        """
+        returns <bytes or None> - cached response body, None if there is no fresh entry
+        """
+        if not self.ttl(url):
+            return None
+
+        key = cache_key(url, params)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry:
+                self._pop(key)
+
+        entry = self._read_disk(key, now)
+
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.disk_hits += 1
+            self._put(key, *entry)
+
+        return entry[1]
+
+    def set(self, url:str, params:dict, body:bytes):
+        ttl = self.ttl(url)
+        if not ttl:
+            return
+
+        key = cache_key(url, params)
+        expires = time.time() + ttl
+
+        with self.lock:
+            self._put(key, expires, body)
+
+        self._write_disk(key, expires, body)
+
+        if self.path and (self.disk_bytes > self.max_disk_bytes or time.time() - self.pruned > self.prune_interval):
+            self.prune_disk()
+
+    def _put(self, key, expires, body):
+        # NOTE: caller must hold self.lock
+        if key in self.entries:
+            self._pop(key)
+
+        self.entries[key] = (expires, body)
+        self.bytes += len(body)
+
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._pop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _pop(self, key):
+        expires, body = self.entries.pop(key)
+        self.bytes -= len(body)
+
+    def _disk_path(self, key) -> str:
+        return os.path.join(self.path, DISK_PREFIX + hashlib.sha1(key.encode()).hexdigest())
+
+    def _read_disk(self, key, now) -> tuple[float, bytes] or None:
+        if not self.path:
+            return None
+
+        filepath = self._disk_path(key)
+        try:
+            with open(filepath, 'rb') as f:
+                data = f.read()
+
+        except FileNotFoundError:
+            return None
+
+        # NOTE: a file too short for its header (or with a nonsense expiry) was corrupted, i.e. truncated by a crash,
+        # so it's dropped the same as an expired one
+        expires = _EXPIRY.unpack_from(data)[0] if len(data) >= _EXPIRY.size else math.nan
+        if not now < expires < math.inf:
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                return None
+
+            with self.disk_lock:
+                self.disk_bytes = max(0, self.disk_bytes - len(data))
+
+            return None
+
+        return expires, data[_EXPIRY.size:]
+
+    def _write_disk(self, key, expires, body):
+        if not self.path:
+            return
+
+        # write to a temp file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir = self.path, prefix = DISK_PREFIX, suffix = '.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_EXPIRY.pack(expires) + body)
+
+        filepath = self._disk_path(key)
+        with self.disk_lock:
+            # NOTE: an overwritten entry's size no longer counts
+            try:
+                replaced = os.path.getsize(filepath)
+            except FileNotFoundError:
+                replaced = 0
+
+            os.replace(tmp, filepath)
+            self.disk_bytes = max(0, self.disk_bytes - replaced) + _EXPIRY.size + len(body)
+
+    def _disk_files(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.path) if entry.name.startswith(DISK_PREFIX) and entry.is_file()]
+
+    def prune_disk(self):
+        if not self.path:
+            return
+
+        now = time.time()
+        kept = [] # (mtime, size, path)
+
+        with self.disk_lock:
+            for entry in self._disk_files():
+                try:
+                    stat = entry.stat()
+
+                    if entry.name.endswith('.tmp'):
+                        # left behind by a writer that died, otherwise still being written
+                        if stat.st_mtime < now - self.prune_interval:
+                            os.remove(entry.path)
+
+                        continue
+
+                    with open(entry.path, 'rb') as f:
+                        header = f.read(_EXPIRY.size)
+
+                    if len(header) < _EXPIRY.size or _EXPIRY.unpack(header)[0] <= now:
+                        os.remove(entry.path)
+                        continue
+
+                except FileNotFoundError:
+                    # removed by another reader or process
+                    continue
+
+                kept.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for mtime, size, filepath in kept)
+
+            # oldest writes first
+            for mtime, size, filepath in sorted(kept):
+                if total <= self.max_disk_bytes:
+                    break
+
+                try:
+                    os.remove(filepath)
+                except FileNotFoundError:
+                    pass
+
+                total -= size
+
+            self.disk_bytes = total
+            self.pruned = now
+
+    def stats(self) -> dict:
+        """
+        returns <dict>
+
+        Hit/miss counts and current memory usage
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                'hits' : self.hits,
+                'disk_hits' : self.disk_hits,
+                'misses' : self.misses,
+                'hit_rate' : self.hits / lookups if lookups else 0.0,
+                'evictions' : self.evictions,
+                'entries' : len(self.entries),
+                'bytes' : self.bytes,
+                'disk_bytes' : self.disk_bytes,
+            }
+
+    def clear(self):
+        """
+        Drops every cached response, including those on disk. Other files in the cache's directory are left alone
+        """
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+        if self.path:
+            with self.disk_lock:
+                for entry in self._disk_files():
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+                self.disk_bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ResponseCache or None:
+    """
+    returns <ResponseCache or None> - None if caching is disabled (see config.CACHE_ENABLED)
+
+    Returns the cache shared by every request, creating it on first use
+    """
+    global _cache
+
+    if _cache is None and config.CACHE_ENABLED:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+
+    return _cache
+
+def set_cache(cache:ResponseCache or None) -> ResponseCache or None:
+    """
+    arg: cache* <ResponseCache or None> - cache to be shared by all requests.
+    Pass None to have a fresh one created on next use (if config.CACHE_ENABLED).
+
+    returns <ResponseCache or None> - the previously shared cache
+    """
+    global _cache
+
+    with _cache_lock:
+        old_cache = _cache
+        _cache = cache
+
+    return old_cache
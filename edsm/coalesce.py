@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import weakref
+
+"""
+Single-flight coalescing of identical requests made at the same time (used by edsm.api.query and edsm.aio.query).
+
+The first caller for a key runs the request, callers asking for the same key while it's in flight wait for it
+and get the same result (or error). Nothing is kept once the request finishes, see edsm.cache for that.
+
+NOTE: coalesced callers share the same result object, so edsm.api and edsm.aio coalesce the raw response body
+and each caller decodes its own copy.
+Thread and async callers are coalesced separately (async callers per event loop).
+"""
+
+class Call():
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """
+    method: do (key, func) <object> - returns func(), shared with every concurrent call for key
+    method: do_async (key, func) <object> (coroutine) - same, for a coroutine function
+
+    attr: coalesced <int> - number of calls that were answered by another caller's request
+    """
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+        # event loop -> {key : asyncio.Future}
+        self.async_calls = weakref.WeakKeyDictionary()
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self.calls[key] = Call()
+
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+
+        except BaseException as e:
+            call.error = e
+            raise
+
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+            call.event.set()
+
+    async def do_async(self, key, func):
+        calls = self.async_calls.setdefault(asyncio.get_running_loop(), {})
+
+        future = calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+
+            # NOTE: shielded so a cancelled waiter doesn't cancel the request for everyone else
+            return await asyncio.shield(future)
+
+        future = calls[key] = asyncio.ensure_future(func())
+
+        # NOTE: forgotten when the request finishes, not when the leader returns, so a cancelled leader
+        # doesn't let new callers start a duplicate request while the first is still running
+        def forget(future):
+            if calls.get(key) is future:
+                del calls[key]
+
+        future.add_done_callback(forget)
+
+        return await asyncio.shield(future)
+
+
+# shared by edsm.api.query and edsm.aio.query
+flights = SingleFlight()
@@ -0,0 +1,136 @@
+import abc
+import json
+
+import edsm.config as config
+
+"""
+JSON encoding/decoding used for API responses (edsm.api, edsm.aio) and log files (edsm.log, edsm.delta, edsm.reader).
+
+Uses a faster backend when one is installed (orjson, then ujson), falling back on the stdlib json module.
+The backend can be picked with config.JSON_CODEC.
+"""
+
+class Codec(abc.ABC):
+    """
+    Base class of the JSON backends (see BACKENDS)
+
+    method: loads (data) <object> - data can be <bytes> (i.e. a response body, decoded without a str copy) or <str>
+    method: dumps (obj, indent) <str>
+
+    attr: name <str> - backend name, as in config.JSON_CODEC
+    """
+    name = None
+
+    @abc.abstractmethod
+    def loads(self, data:bytes or str):
+        pass
+
+    @abc.abstractmethod
+    def dumps(self, obj, indent:int = None) -> str:
+        pass
+
+
+class StdlibCodec(Codec):
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj, indent = None):
+        return json.dumps(obj, indent = indent)
+
+
+class OrjsonCodec(Codec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+    def dumps(self, obj, indent = None):
+        # NOTE: orjson only does 2-space indents, and only str dict keys
+        if indent not in (None, 0, 2):
+            return json.dumps(obj, indent = indent)
+
+        option = self.orjson.OPT_INDENT_2 if indent else 0
+        try:
+            return self.orjson.dumps(obj, option = option).decode()
+
+        except TypeError:
+            return json.dumps(obj, indent = indent)
+
+
+class UjsonCodec(Codec):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def loads(self, data):
+        return self.ujson.loads(data)
+
+    def dumps(self, obj, indent = None):
+        return self.ujson.dumps(obj, indent = indent or 0, ensure_ascii = False)
+
+
+# in order of preference for 'auto'
+BACKENDS = {
+    'orjson' : OrjsonCodec,
+    'ujson' : UjsonCodec,
+    'json' : StdlibCodec,
+}
+
+_codecs = {}
+
+def available() -> list[str]:
+    """
+    returns <list[str]> - names of installed backends, in order of preference
+    """
+    names = []
+    for name in BACKENDS:
+        try:
+            get_codec(name)
+
+        except ImportError:
+            continue
+
+        names.append(name)
+
+    return names
+
+def get_codec(name:str = None) -> Codec:
+    """
+    arg: name <str> - 'auto', 'orjson', 'ujson' or 'json' (defaults to config.JSON_CODEC)
+
+    returns <Codec>
+
+    Raises ImportError if the named backend isn't installed
+    """
+    name = name or config.JSON_CODEC
+
+    if name == 'auto':
+        for backend in BACKENDS:
+            try:
+                return get_codec(backend)
+
+            except ImportError:
+                continue
+
+    codec = _codecs.get(name)
+    if codec is None:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown JSON codec \'{name}\'")
+
+        codec = _codecs[name] = BACKENDS[name]()
+
+    return codec
+
+def loads(data:bytes or str):
+    return get_codec().loads(data)
+
+def dumps(obj, indent:int = None) -> str:
+    return get_codec().dumps(obj, indent)
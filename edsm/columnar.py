@@ -0,0 +1,209 @@
+import json
+import mmap
+import os
+import sys
+
+from array import array
+
+"""
+Columnar binary storage for traffic data.
+
+A store is a directory holding one file of fixed-width int64 values per column, plus 'schema.json':
+
+    timestamp, id64, day, week, total, breakdown:<ship type>, ...
+
+Every traffic snapshot of every system is one row. Columns can be memory-mapped for reading
+(see TrafficStore.column) or loaded straight into NumPy arrays (see TrafficStore.to_numpy).
+Values a row doesn't have (i.e. a ship type missing from its breakdown, or every row written before a
+ship type showed up) are stored as MISSING.
+"""
+
+BASE_COLUMNS = ['timestamp', 'id64', 'day', 'week', 'total']
+BREAKDOWN_PREFIX = 'breakdown:'
+
+# stands in for values a row doesn't have, same as edsm.models.MISSING (no real traffic count)
+MISSING = -(1 << 63)
+
+# NOTE: values are written in native byte order, which is recorded in the schema so readers on other machines can tell
+ITEMSIZE = array('q').itemsize
+
+def _value(value:int or None) -> int:
+    return MISSING if value is None else value
+
+
+class TrafficStore():
+    """
+    arg: path* <str> - directory of the store, created if it doesn't exist
+    arg: readonly <bool> - open for reading only, safe to use while another process is appending
+
+    method: append (timestamp, rows) <None>
+    method: append_systems (timestamp, systems) <None>
+    method: column (name) <memoryview> - int64 values of column, memory-mapped
+    method: to_numpy (names) <dict[str, numpy.ndarray]>
+    method: close <None>
+
+    attr: columns <list[str]>
+    attr: rows <int>
+    """
+    def __init__(self, path:str, readonly:bool = False):
+        self.path = path
+        self.readonly = readonly
+
+        if not readonly:
+            os.makedirs(path, exist_ok = True)
+
+        self.schema_path = os.path.join(path, 'schema.json')
+        self.maps = {}
+
+        try:
+            with open(self.schema_path, 'r') as f:
+                schema = json.loads(f.read())
+
+        except FileNotFoundError:
+            schema = {'byteorder' : sys.byteorder, 'rows' : 0, 'columns' : []}
+
+        if schema['byteorder'] != sys.byteorder:
+            raise ValueError(f"Store at \'{path}\' was written with {schema['byteorder']}-endian values")
+
+        self.rows = schema['rows']
+        self.files = {column['name'] : column['file'] for column in schema['columns']}
+
+        if readonly:
+            return
+
+        for name in BASE_COLUMNS:
+            if name not in self.files:
+                self._add_column(name)
+
+        # drop values past the last row recorded in the schema (i.e. left over from an interrupted append)
+        for name in self.files:
+            with open(self._file(name), 'r+b') as f:
+                f.truncate(self.rows * ITEMSIZE)
+
+        self._write_schema()
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.files)
+
+    def __len__(self):
+        return self.rows
+
+    def _file(self, name:str) -> str:
+        return os.path.join(self.path, self.files[name])
+
+    def _add_column(self, name:str):
+        self.files[name] = f'{len(self.files)}.i64'
+
+        with open(self._file(name), 'wb') as f:
+            f.write(array('q', [MISSING]).tobytes() * self.rows)
+
+    def _write_schema(self):
+        schema = {
+            'byteorder' : sys.byteorder,
+            'rows' : self.rows,
+            'columns' : [{'name' : name, 'file' : file} for name, file in self.files.items()],
+        }
+
+        tmp = self.schema_path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(json.dumps(schema))
+
+        os.replace(tmp, self.schema_path)
+
+    def append(self, timestamp:int, rows:list[dict]):
+        """
+        arg: timestamp* <int> - unix time of snapshot
+        arg: rows* <list[dict]> - dicts with 'id64', 'traffic' and 'breakdown' keys (as returned from edsm.api.System.traffic)
+
+        Appends one row per dict. Each column is written with a single call to write.
+        """
+        if self.readonly:
+            raise PermissionError(f"Store at \'{self.path}\' was opened read-only")
+
+        if not rows:
+            return
+
+        breakdowns = [row.get('breakdown') if isinstance(row.get('breakdown'), dict) else {} for row in rows]
+
+        for breakdown in breakdowns:
+            for ship in breakdown:
+                if BREAKDOWN_PREFIX + ship not in self.files:
+                    self._add_column(BREAKDOWN_PREFIX + ship)
+
+        values = {
+            'timestamp' : [timestamp] * len(rows),
+            'id64' : [row.get('id64') or 0 for row in rows],
+            'day' : [_value((row.get('traffic') or {}).get('day')) for row in rows],
+            'week' : [_value((row.get('traffic') or {}).get('week')) for row in rows],
+            'total' : [_value((row.get('traffic') or {}).get('total')) for row in rows],
+        }
+
+        for name in self.files:
+            if name.startswith(BREAKDOWN_PREFIX):
+                ship = name[len(BREAKDOWN_PREFIX):]
+                values[name] = [_value(breakdown.get(ship)) for breakdown in breakdowns]
+
+        # NOTE: existing maps only cover the files as they were when mapped, so they're dropped (not closed,
+        # memoryviews handed out earlier stay valid)
+        self.maps = {}
+
+        for name, column in values.items():
+            with open(self._file(name), 'ab') as f:
+                f.write(array('q', column).tobytes())
+
+        self.rows += len(rows)
+        self._write_schema()
+
+    def append_systems(self, timestamp:int, systems):
+        """
+        arg: timestamp* <int>
+        arg: systems* <edsm.models.Systems>
+
+        Appends traffic of every system in systems that has been updated
+        """
+        self.append(timestamp, [system.traffic.dict for system in systems if system.traffic.dict])
+
+    def column(self, name:str) -> memoryview:
+        """
+        arg: name* <str> - i.e. 'day' or 'breakdown:Anaconda'
+
+        returns <memoryview> - int64 values of column, one per row, memory-mapped (read-only)
+        """
+        if not self.rows:
+            return memoryview(array('q'))
+
+        if name not in self.maps:
+            with open(self._file(name), 'rb') as f:
+                # NOTE: only maps rows recorded in the schema, so a concurrent append in progress isn't visible
+                self.maps[name] = mmap.mmap(f.fileno(), self.rows * ITEMSIZE, access = mmap.ACCESS_READ)
+
+        return memoryview(self.maps[name]).cast('q')
+
+    def to_numpy(self, names:list[str] = None) -> dict:
+        """
+        arg: names <list[str]> - columns to load (defaults to all of them)
+
+        returns <dict[str, numpy.ndarray]> - read-only arrays backed by memory maps of the column files
+
+        Requires NumPy
+        """
+        import numpy
+
+        names = self.columns if names is None else names
+        return {
+            name : numpy.memmap(self._file(name), dtype = numpy.int64, mode = 'r', shape = (self.rows,))
+                if self.rows else numpy.zeros(0, dtype = numpy.int64)
+            for name in names
+        }
+
+    def close(self):
+        for m in self.maps.values():
+            try:
+                m.close()
+
+            except BufferError:
+                # still referenced by a memoryview handed out by column(), leave it for the garbage collector
+                pass
+
+        self.maps = {}
@@ -1,4 +1,5 @@
-# maximum number of threads to be used by ThreadPoolExecutor objects
+# maximum number of threads to be used by ThreadPoolExecutor objects.
+# Also sets the size of the shared HTTP connection pool in edsm.api
 # default = 20
 MAX_THREADS = 20
 
@@ -11,3 +12,117 @@ USER_AGENT = ""
 # Defines number of spaces to use for indentation when writing to json. 
 # Set to None for no indent (smaller file size)
 JSON_INDENT = None
+
+# maximum number of requests in flight at once for each edsm.aio.Client
+# default = 200
+ASYNC_MAX_CONCURRENCY = 200
+
+# number of seconds to wait for a single request before giving up
+# default = 30
+REQUEST_TIMEOUT = 30
+
+# Storage format used by edsm.log.Logger objects.
+# 'json' - whole file is one JSON array, rewritten on every append
+# 'jsonl' - JSON Lines, one snapshot per line, appended without rewriting the file
+# 'columnar' - traffic only, one binary int64 file per column in a directory (see edsm.columnar)
+# 'delta' - JSON Lines with station markets stored as changes since the previous snapshot (see edsm.delta)
+# 'sqlite' - SQLite database with indexed tables for traffic, stations and prices (see edsm.sqlstore)
+LOG_FORMAT = 'json'
+
+# Number of snapshots between full (keyframe) snapshots in 'delta' format logs
+DELTA_KEYFRAME_INTERVAL = 24
+
+# When to fsync appended snapshots to disk ('jsonl' format only).
+# 'always' - after every append
+# 'never' - leave flushing to the OS
+# <int or float> - at most once every n seconds
+FSYNC_POLICY = 'never'
+
+# Starting request rate (requests per second) shared by all requests to EDSM,
+# used until EDSM's 'X-Rate-Limit-*' response headers say otherwise.
+# Set to None for no limit until then
+RATE_LIMIT = None
+
+# maximum number of requests that can be sent back-to-back before the rate limit kicks in
+# default = 20
+RATE_LIMIT_BURST = 20
+
+# number of times a request is retried after EDSM responds with 429 (Too Many Requests)
+# default = 3
+RATE_LIMIT_RETRIES = 3
+
+# Whether responses from EDSM are cached (see edsm.cache)
+CACHE_ENABLED = False
+
+# Number of seconds responses from each endpoint are cached for.
+# Endpoints left out (or set to 0) are never cached
+CACHE_TTLS = {
+    'traffic' : 600,
+    'stations' : 86400,
+    'factions' : 3600,
+    'system' : 86400,
+    'sphere-systems' : 86400,
+}
+
+# Limits for responses held in memory by the cache. Least recently used responses are evicted first
+CACHE_MAX_ENTRIES = 10000
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Directory for persisting cached responses across runs. Set to None to cache in memory only.
+# Only files named 'edsm-cache-*' in it are read, pruned or cleared by the cache
+CACHE_PATH = None
+
+# Limit for responses held on disk by the cache. Expired responses are removed first, then the oldest
+CACHE_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+# Number of attempts made for each update task before it's counted as failed.
+# Only transient errors (connection errors, timeouts, 429 and 5xx responses) are retried
+RETRY_ATTEMPTS = 3
+
+# Base and max delay (in seconds) for jittered exponential backoff between attempts
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 30
+
+# Fraction of update tasks per cycle that may fail before the whole cycle is aborted.
+# Below this, failed entries are marked in the payload under 'errors' and keep their last known (stale) values
+ERROR_BUDGET = 0.05
+
+# JSON backend used for decoding API responses and reading/writing logs (see edsm.codec).
+# 'auto' - fastest installed backend ('orjson', then 'ujson', then 'json')
+# 'orjson', 'ujson', or 'json' (stdlib)
+JSON_CODEC = 'auto'
+
+# Collect request/update metrics (see edsm.metrics)
+METRICS_ENABLED = True
+
+# Upper bounds (in seconds) of latency/duration histogram buckets
+METRICS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Port for serving metrics in Prometheus' text format on localhost while edsm.log.Logger runs. Set to None to not serve them
+METRICS_PORT = None
+
+# Number of worker processes used by edsm.shard.ShardedLogger. Set to None to use one per CPU
+SHARDS = None
+
+# Seconds between updates of each kind of data when running a logger (see edsm.schedule), i.e.
+# {'traffic' : 900, 'markets' : 3600, 'stations' : 86400}. Kinds left out are never updated.
+# Set to None to update every kind every DEFAULT_SLEEP seconds
+CADENCES = None
+
+# Only fetch a station's market when the station's updateTime['market'] has moved forward since it was last fetched.
+# Update times come from station lists, so every market update also refreshes station lists (one request per system,
+# never answered from the cache)
+INCREMENTAL_MARKETS = True
+
+# Width (in ly) of grid cells used by edsm.spatial.SpatialIndex
+SPATIAL_CELL_SIZE = 25
+
+# Largest cube EDSM's cube-systems endpoint accepts (in ly), used as the tile size by edsm.region
+CUBE_MAX_SIZE = 200
+
+# Limits for each request made by edsm.bulk: max number of names, and max length of the encoded names in the url
+BULK_MAX_NAMES = 100
+BULK_MAX_URL_LENGTH = 4000
+
+# Have concurrent identical requests (same url and params) share one request and its decoded result (see edsm.coalesce)
+COALESCE_REQUESTS = True
@@ -0,0 +1,273 @@
+from typing import Iterator
+
+import edsm.codec as codec
+import edsm.config as config
+
+"""
+Delta encoding for market data in logged snapshots.
+
+Most commodity prices, stock and demand values don't change between polls, so instead of logging every
+station's full commodity list every cycle, 'delta' logs (see edsm.log.Logger) store:
+
+    keyframes - full snapshots, every config.DELTA_KEYFRAME_INTERVAL records
+    deltas - snapshots where each market is replaced by the fields that changed since the previous record
+
+One record per line (JSON Lines). Byte offsets of keyframes are kept in an index file next to the log
+('<filepath>.idx'), so any snapshot can be rebuilt by decoding forward from the keyframe before it.
+
+A delta market looks like:
+
+    {'delta' : {'changed' : {<commodity id> : {<field> : <value>, ...}, ...},
+                'added' : [<commodity>, ...],
+                'removed' : [<commodity id>, ...]}}
+"""
+
+def index_path(filepath:str) -> str:
+    return filepath + '.idx'
+
+def _market_key(entry_index:int, entry:dict, station_index:int, station:dict):
+    # NOTE: identifies a station across records by what was logged for it, falling back on its position
+    if station.get('marketId') is not None:
+        return station['marketId']
+
+    system_name = (entry.get('system') or {}).get('name', entry_index)
+    return (system_name, station.get('name', station_index))
+
+def _commodity_key(commodity:dict):
+    return commodity.get('id', commodity.get('name'))
+
+def diff_market(old:list[dict], new:list[dict]) -> dict:
+    """
+    arg: old* <list[dict]> - commodities from previous record
+    arg: new* <list[dict]> - commodities from this record
+
+    returns <dict> - {'delta' : ...} (see module docstring)
+    """
+    old_by_key = {_commodity_key(c) : c for c in old}
+    new_keys = set()
+
+    changed = {}
+    added = []
+
+    for commodity in new:
+        key = _commodity_key(commodity)
+        new_keys.add(key)
+
+        previous = old_by_key.get(key)
+        if previous is None:
+            added.append(commodity)
+            continue
+
+        fields = {field : value for field, value in commodity.items() if previous.get(field) != value}
+        if fields:
+            changed[key] = fields
+
+    removed = [key for key in old_by_key if key not in new_keys]
+
+    return {'delta' : {'changed' : changed, 'added' : added, 'removed' : removed}}
+
+def apply_market(old:list[dict], market:dict) -> list[dict]:
+    """
+    arg: old* <list[dict]> - commodities from previous record
+    arg: market* <dict> - {'delta' : ...} (see module docstring)
+
+    returns <list[dict]> - commodities for this record
+    """
+    delta = market['delta']
+    removed = set(delta['removed'])
+    changed = delta['changed']
+
+    commodities = []
+    for commodity in old:
+        key = _commodity_key(commodity)
+        if key in removed:
+            continue
+
+        # NOTE: keys of 'changed' are strings once written as JSON, so look up both ways
+        fields = changed.get(key) or changed.get(str(key))
+        commodities.append(dict(commodity, **fields) if fields else commodity)
+
+    return commodities + delta['added']
+
+
+class MarketDeltaEncoder():
+    """
+    arg: keyframe_interval <int> - number of records between keyframes (defaults to config.DELTA_KEYFRAME_INTERVAL)
+
+    method: encode (snapshot) <dict> - returns record to write for snapshot
+    """
+    def __init__(self, keyframe_interval:int = None):
+        self.keyframe_interval = keyframe_interval or config.DELTA_KEYFRAME_INTERVAL
+
+        self.count = 0
+        self.markets = {} # market key -> commodities in last record
+
+    def encode(self, snapshot:dict) -> dict:
+        keyframe = self.count % self.keyframe_interval == 0
+        self.count += 1
+
+        markets = {}
+        data = []
+
+        # NOTE: stations are copied (shallowly) so the snapshot passed in is never modified
+        for i, entry in enumerate(snapshot['data']):
+            entry = dict(entry)
+
+            if entry.get('stations'):
+                stations = []
+
+                for j, station in enumerate(entry['stations']):
+                    if 'market' in station:
+                        key = _market_key(i, entry, j, station)
+                        commodities = station['market']
+                        markets[key] = commodities
+
+                        old = self.markets.get(key)
+                        if not keyframe and commodities is not None and old is not None:
+                            station = dict(station, market = diff_market(old, commodities))
+
+                    stations.append(station)
+
+                entry['stations'] = stations
+
+            data.append(entry)
+
+        self.markets = markets
+
+        record = {'timestamp' : snapshot['timestamp'], 'data' : data}
+        if keyframe:
+            record['keyframe'] = True
+
+        return record
+
+
+class MarketDeltaDecoder():
+    """
+    method: decode (record) <dict> - returns full snapshot for record.
+    Records must be decoded in the order they were encoded, starting at a keyframe.
+    """
+    def __init__(self):
+        self.markets = {}
+
+    def decode(self, record:dict) -> dict:
+        markets = {}
+        data = []
+
+        for i, entry in enumerate(record['data']):
+            if entry.get('stations'):
+                stations = []
+
+                for j, station in enumerate(entry['stations']):
+                    if 'market' in station:
+                        key = _market_key(i, entry, j, station)
+                        market = station['market']
+
+                        if isinstance(market, dict):
+                            market = apply_market(self.markets[key], market)
+                            station = dict(station, market = market)
+
+                        markets[key] = market
+
+                    stations.append(station)
+
+                entry = dict(entry, stations = stations)
+
+            data.append(entry)
+
+        self.markets = markets
+        return {'timestamp' : record['timestamp'], 'data' : data}
+
+
+def read_index(filepath:str) -> list[tuple[int, int]]:
+    """
+    returns <list[tuple[int, int]]> - (timestamp, byte offset) of every keyframe in log at filepath
+    """
+    try:
+        with open(index_path(filepath), 'r') as f:
+            return [tuple(codec.loads(line)) for line in f if line.strip()]
+
+    except FileNotFoundError:
+        return []
+
+def iter_decoded(filepath:str, start:int = None) -> Iterator[dict]:
+    """
+    arg: filepath* <str> - delta log
+    arg: start <int> - unix time. Decoding starts at the last keyframe at or before start, using the index file
+
+    returns <Iterator[dict]> - full snapshots (snapshots before start may be included)
+    """
+    offset = 0
+    if start is not None:
+        for timestamp, keyframe_offset in read_index(filepath):
+            if timestamp > start:
+                break
+
+            offset = keyframe_offset
+
+    decoder = MarketDeltaDecoder()
+
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+
+        for line in f:
+            if line.strip():
+                yield decoder.decode(codec.loads(line))
+
+def read_snapshot(filepath:str, timestamp:int) -> dict or None:
+    """
+    arg: filepath* <str> - delta log
+    arg: timestamp* <int> - unix time
+
+    returns <dict or None> - the last snapshot taken at or before timestamp, None if there isn't one
+    """
+    snapshot = None
+
+    for decoded in iter_decoded(filepath, start = timestamp):
+        if decoded['timestamp'] > timestamp:
+            break
+
+        snapshot = decoded
+
+    return snapshot
+
+def is_delta_log(filepath:str) -> bool:
+    """
+    returns <bool> - whether the first record in the (JSON Lines) file at filepath is a keyframe
+    """
+    with open(filepath, 'rb') as f:
+        for line in f:
+            if line.strip():
+                return bool(codec.loads(line).get('keyframe'))
+
+    return False
+
+def append(filepath:str, encoder:MarketDeltaEncoder, data:list[dict]):
+    """
+    arg: filepath* <str>
+    arg: encoder* <MarketDeltaEncoder> - must be the same encoder for every append to the file
+    (a new encoder starts with a keyframe)
+    arg: data* <list[dict]> - snapshots
+
+    Encodes and appends snapshots to the delta log at filepath, recording keyframes in its index file
+    """
+    lines = []
+    keyframes = []
+
+    with open(filepath, 'ab') as f:
+        offset = f.tell()
+
+        for snapshot in data:
+            record = encoder.encode(snapshot)
+            line = (codec.dumps(record) + '\n').encode()
+
+            if record.get('keyframe'):
+                keyframes.append([record['timestamp'], offset])
+
+            lines.append(line)
+            offset += len(line)
+
+        f.write(b''.join(lines))
+
+    if keyframes:
+        with open(index_path(filepath), 'a') as f:
+            f.write(''.join(codec.dumps(keyframe) + '\n' for keyframe in keyframes))
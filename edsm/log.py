@@ -1,11 +1,17 @@
-import json
+import os
 import time
 import logging
 
 from logging import INFO, DEBUG
 
 import edsm.models as models
+import edsm.codec as codec
 import edsm.config as config
+import edsm.columnar as columnar
+import edsm.delta as delta
+import edsm.metrics as metrics
+import edsm.schedule as schedule
+import edsm.sqlstore as sqlstore
 
 
 """
@@ -20,40 +26,93 @@ Made for collecting live system data from edsm.net to help spot trends in market
 
 logging.basicConfig(level=INFO)
 
+def convert_json_to_jsonl(src:str, dst:str):
+    """
+    arg: src* <str> - path of a file written in 'json' format (top-level JSON array)
+    arg: dst* <str> - path of file to write in 'jsonl' format
+
+    Converts an existing log to JSON Lines, one snapshot per line. 
+    Snapshots are appended, so converting into an existing 'jsonl' log extends it.
+    """
+    with open(src, 'r') as f:
+        snapshots = codec.loads(f.read() or '[]')
+
+    with open(dst, 'a') as f:
+        f.write(''.join(codec.dumps(snapshot) + '\n' for snapshot in snapshots))
+
+
+def check_fsync_policy(policy) -> str or float:
+    """
+    arg: policy* <str or int or float> - see config.FSYNC_POLICY
+
+    returns <str or float> - policy, if it's valid. Raises ValueError otherwise
+    """
+    if policy in ('always', 'never'):
+        return policy
+
+    if isinstance(policy, (int, float)) and not isinstance(policy, bool) and policy >= 0:
+        return policy
+
+    raise ValueError(f"config.FSYNC_POLICY must be 'always', 'never' or a number of seconds, got {policy!r}")
+
+
 class Logger():
-    def __init__(self, keys:dict[str, list[str]]):
+    def __init__(self, keys:dict[str, list[str]], format:str = None):
         self.keys = keys
+        self.format = format or config.LOG_FORMAT
+
+        if self.format not in ('json', 'jsonl', 'columnar', 'delta', 'sqlite'):
+            raise ValueError(f"Unknown log format '{self.format}'")
 
         self.systems = models.Systems()
 
         # to be overwritten by children (TODO: ABCs lol)
-        self.filepath = f'{self}.json'
+        self.filepath = f'{self}.{self.format}'
 
-    def update_by_keys(self):
-        """
-        Run updates depending on which keys are provided. 
+        self.fsync_policy = check_fsync_policy(config.FSYNC_POLICY)
+        self.last_fsync = time.monotonic()
+
+        self.traffic_store = None
+        self.delta_encoder = None
+        self.sqlite_store = None
+
+    def kinds_by_keys(self, kinds:set[str] = None) -> tuple[bool, bool, bool]:
         """
+        arg: kinds <set[str]> - kinds of data to update (see edsm.schedule.KINDS), defaults to all of them
 
+        returns <tuple[bool, bool, bool]> - whether to update (traffic, stations, markets), depending on which keys are provided
+        """
         # TODO: make this grab keys to check from a standalone file
-        if 'traffic' in self.keys:
-            logging.info("Updating traffic")
-            self.systems.update_traffic()
+        traffic = 'traffic' in self.keys
+        stations = 'stations' in self.keys
+        markets = stations and 'market' in self.keys['stations']
 
-        if 'stations' in self.keys:
-            logging.info("Updating stations")
-            self.systems.update_stations()
+        if kinds is not None:
+            traffic, stations, markets = traffic and 'traffic' in kinds, stations and 'stations' in kinds, markets and 'markets' in kinds
 
-            if 'market' in self.keys['stations']:
-                logging.info("Updating station markets")
-                self.systems.update_stations_markets()
+        return traffic, stations, markets
 
-    def generate_payload(self) -> list[dict]:
+    def update_by_keys(self, kinds:set[str] = None):
         """
-        Package and timestamp requested data
+        Run updates depending on which keys are provided. 
+        Only kinds of data in kinds are updated (if given), the rest keep their last values.
+        """
+        traffic, stations, markets = self.kinds_by_keys(kinds)
+
+        logging.info(f"Updating (traffic={traffic}, stations={stations}, markets={markets})")
+        timings = self.systems.update(traffic = traffic, stations = stations, markets = markets)
+
+        logging.info("Update timings: " + ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+
+    def generate_payload(self, timestamp:int = None) -> list[dict]:
+        """
+        Package and timestamp requested data (timestamp defaults to now)
         """
         logging.info("Generating payload")
 
-        timestamp = int(time.time())
+        if timestamp is None:
+            timestamp = int(time.time())
+
         data = self.systems.get_keys(self.keys)
 
         return [{'timestamp' : timestamp, 'data' : data}]
@@ -70,37 +129,158 @@ class Logger():
         logging.info(f"Appending payload to file: \'{self.filepath}\'")
         try:
             file_read = open(self.filepath, 'r')
-            old_data = json.loads(file_read.read())
+            old_data = codec.loads(file_read.read())
             file_read.close()
                 
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
+        except (FileNotFoundError, ValueError): # NOTE: ValueError covers decode errors from every codec backend
             # TODO: log exception (as warning)
             old_data = []
 
         # TODO: needs to create subfolders if they dont exist
-        merged_data = json.dumps(old_data + data, indent=config.JSON_INDENT)
+        merged_data = codec.dumps(old_data + data, indent=config.JSON_INDENT)
 
         file_write = open(self.filepath, 'w')
         file_write.write(merged_data)
 
         file_write.close()
 
-    def log(self):
+    def append_jsonl(self, data:list[dict]):
+        """
+        Appends each snapshot in data as one line to .jsonl file (defined as self.filepath).
+        Only the new snapshots are written (with a single call to write), existing lines are never read or rewritten.
+        """
+        logging.info(f"Appending payload to file: \'{self.filepath}\'")
+
+        lines = ''.join(codec.dumps(snapshot) + '\n' for snapshot in data)
+
+        with open(self.filepath, 'a') as f:
+            f.write(lines)
+            f.flush()
+
+            if self.should_fsync():
+                os.fsync(f.fileno())
+                self.last_fsync = time.monotonic()
+
+    def append_columnar(self, data:list[dict], kinds:set[str] = None):
+        """
+        Appends traffic of every system in self.systems to the columnar store at self.filepath (a directory),
+        once for each snapshot in data. Only traffic is stored in this format (see edsm.columnar).
+
+        arg: kinds <set[str]> - see append_sqlite. Nothing is appended if traffic isn't one of them
+        """
+        if kinds is not None and 'traffic' not in kinds:
+            return
+
+        logging.info(f"Appending traffic to columnar store: \'{self.filepath}\'")
+
+        if self.traffic_store is None or self.traffic_store.path != self.filepath:
+            self.traffic_store = columnar.TrafficStore(self.filepath)
+
+        for snapshot in data:
+            self.traffic_store.append_systems(snapshot['timestamp'], self.systems)
+
+    def append_delta(self, data:list[dict]):
+        """
+        Appends data to .jsonl file (defined as self.filepath), with station markets delta-encoded 
+        against the previous snapshot (see edsm.delta). Each run of the logger starts with a keyframe.
+        """
+        logging.info(f"Appending delta-encoded payload to file: \'{self.filepath}\'")
+
+        if self.delta_encoder is None:
+            self.delta_encoder = delta.MarketDeltaEncoder()
+
+        delta.append(self.filepath, self.delta_encoder, data)
+
+    def append_sqlite(self, data:list[dict], kinds:set[str] = None):
+        """
+        Appends traffic, stations and markets (whichever are in self.keys and in kinds) of every system in self.systems
+        to the SQLite database at self.filepath, once for each snapshot in data (see edsm.sqlstore).
+        Each snapshot is written in one transaction.
+
+        arg: kinds <set[str]> - kinds updated for data (see update_by_keys), defaults to all of them.
+        Kinds that weren't updated would only repeat their last values, so they're left out
+        """
+        logging.info(f"Appending snapshot to SQLite database: '{self.filepath}'")
+
+        if self.sqlite_store is None or self.sqlite_store.path != self.filepath:
+            self.sqlite_store = sqlstore.SQLiteStore(self.filepath)
+
+        traffic, stations, markets = self.kinds_by_keys(kinds)
+
+        for snapshot in data:
+            self.sqlite_store.append_systems(snapshot['timestamp'], self.systems, traffic, stations, markets)
+
+    def should_fsync(self) -> bool:
+        if self.fsync_policy == 'always':
+            return True
+
+        if self.fsync_policy == 'never':
+            return False
+
+        return time.monotonic() - self.last_fsync >= self.fsync_policy
+
+    def append(self, data:list[dict], kinds:set[str] = None):
+        """
+        Appends data to self.filepath using the storage format in self.format.
+        kinds are the kinds of data updated for it (only used by the 'columnar' and 'sqlite' formats, see append_sqlite)
+        """
+        if self.format == 'jsonl':
+            self.append_jsonl(data)
+
+        elif self.format == 'columnar':
+            self.append_columnar(data, kinds)
+
+        elif self.format == 'delta':
+            self.append_delta(data)
+
+        elif self.format == 'sqlite':
+            self.append_sqlite(data, kinds)
+
+        else:
+            self.append_json(data)
+
+    def log(self, timestamp:int = None, kinds:set[str] = None):
         logging.info("Beginning log routine")
 
-        self.update_by_keys()
+        self.update_by_keys(kinds)
 
-        payload = self.generate_payload()
-        self.append_json(payload)
+        payload = self.generate_payload(timestamp)
+        self.append(payload, kinds)
     
-    def sleep(self, delay):
-        sleep_start = time.strftime("%H:%M:%S", time.localtime())
-        logging.info(f"{self} SLEEPING for {delay} seconds (since {sleep_start})")
+    def sleep_until(self, wakeup:float):
+        wakeup_time = time.strftime("%H:%M:%S", time.localtime(wakeup))
+        logging.info(f"{self} SLEEPING until {wakeup_time}")
+
+        schedule.sleep_until(wakeup)
+
+    def run(self, sleep:int=config.DEFAULT_SLEEP, cadences:dict[str, float] = None):
+        """
+        Run self.log() on an infinite loop, on fixed wall-clock boundaries (see edsm.schedule).
+        Each kind of data is updated on its own cadence (defaults to config.CADENCES, or every `sleep` seconds for
+        every kind). Snapshots are timestamped with their boundary and reuse the last values of kinds that weren't due.
+        The first snapshot is logged straight away (with every kind), the rest on boundaries.
+        """
+        if config.METRICS_PORT is not None:
+            server = metrics.serve(config.METRICS_PORT)
+            logging.info(f"Serving metrics on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+
+        cadences = cadences or config.CADENCES or {kind : sleep for kind in schedule.KINDS}
+        cycle_schedule = schedule.Schedule(cadences)
 
-        time.sleep(delay)
+        # NOTE: marked as updated at start, so each kind is next due at its first boundary after it
+        start = time.time()
+        kinds = cycle_schedule.due(start)
+        self.log(timestamp = int(start), kinds = kinds)
+        cycle_schedule.mark(start, kinds)
 
-    def run(self, sleep:int=config.DEFAULT_SLEEP):
-        """Run self.log() and sleep for `sleep` seconds on an infinite loop"""
         while True:
-            self.log()
-            self.sleep(sleep)
+            boundary = cycle_schedule.next_boundary(time.time())
+            self.sleep_until(boundary)
+
+            kinds = cycle_schedule.due(boundary)
+            self.log(timestamp = int(boundary), kinds = kinds)
+            cycle_schedule.mark(boundary, kinds)
+
+            missed = cycle_schedule.missed(boundary, time.time())
+            if missed:
+                logging.warning(f"Cycle overran, skipped {missed} boundaries (kinds due at them are updated at the next one)")
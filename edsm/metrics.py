@@ -0,0 +1,273 @@
+import threading
+
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import edsm.config as config
+
+"""
+Metrics for requests (fed from edsm.api.query and edsm.aio.query) and update cycles (fed from edsm.models.UpdateCycle).
+
+    requests - count, bytes received and latency histogram per endpoint and status
+    phases - duration histogram per update phase ('traffic', 'stations', 'markets', 'total'), plus the last cycle's durations
+    gauges - 'queue_depth' (tasks waiting for a worker), 'busy_workers', 'executor_utilization' (of the last cycle)
+
+Read them with get_metrics().snapshot(), or serve them in Prometheus' text format with serve().
+"""
+
+class Histogram():
+    """
+    arg: buckets <tuple[float]> - upper bounds, ascending (defaults to config.METRICS_BUCKETS)
+
+    method: observe (value) <None>
+    method: merge (other) <None> - adds the observations of another Histogram with the same buckets
+    method: snapshot <dict> - {'buckets' : {upper bound : cumulative count}, 'sum' : <float>, 'count' : <int>}
+    """
+    def __init__(self, buckets:tuple[float] = None):
+        self.buckets = tuple(buckets or config.METRICS_BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1) # last one counts values above every bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other:'Histogram'):
+        if other.buckets != self.buckets:
+            raise ValueError("Can't merge histograms with different buckets")
+
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def snapshot(self) -> dict:
+        cumulative = {}
+        total = 0
+
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative[bound] = total
+
+        return {'buckets' : cumulative, 'sum' : self.sum, 'count' : self.count}
+
+
+class Metrics():
+    """
+    method: observe_request (endpoint, status, seconds, size) <None>
+    method: observe_phase (phase, seconds) <None>
+    method: add_gauge (name, amount) <None>
+    method: set_gauge (name, value) <None>
+    method: take_requests <dict> - removes and returns request metrics, for merge_requests in another process
+    method: merge_requests (requests) <None>
+    method: snapshot <dict>
+    method: prometheus <str> - metrics in Prometheus' text exposition format
+    method: reset <None>
+    """
+    def __init__(self, buckets:tuple[float] = None):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {} # (endpoint, status) -> [count, bytes, Histogram]
+            self.phases = {} # phase -> Histogram
+            self.last_cycle = {} # phase -> seconds
+            self.gauges = {'queue_depth' : 0, 'busy_workers' : 0, 'executor_utilization' : 0.0}
+
+    def observe_request(self, endpoint:str, status:int or str, seconds:float, size:int = 0):
+        """
+        arg: endpoint* <str> - i.e. 'stations/market' (see edsm.cache.endpoint_of)
+        arg: status* <int or str> - response status, or 'error' if no response arrived
+        arg: seconds* <float> - time taken by the request
+        arg: size <int> - bytes received
+        """
+        with self.lock:
+            entry = self.requests.get((endpoint, status))
+            if entry is None:
+                entry = self.requests[(endpoint, status)] = [0, 0, Histogram(self.buckets)]
+
+            entry[0] += 1
+            entry[1] += size
+            entry[2].observe(seconds)
+
+    def observe_phase(self, phase:str, seconds:float):
+        with self.lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram(self.buckets)
+
+            histogram.observe(seconds)
+            self.last_cycle[phase] = seconds
+
+    def take_requests(self) -> dict:
+        """
+        returns <dict> - {(endpoint, status) : [count, bytes, Histogram]} recorded since the last call (picklable)
+        """
+        with self.lock:
+            requests, self.requests = self.requests, {}
+
+        return requests
+
+    def merge_requests(self, requests:dict):
+        """
+        arg: requests* <dict> - from take_requests (i.e. of a worker process, see edsm.shard)
+        """
+        with self.lock:
+            for key, (count, size, histogram) in requests.items():
+                entry = self.requests.get(key)
+                if entry is None:
+                    entry = self.requests[key] = [0, 0, Histogram(self.buckets)]
+
+                entry[0] += count
+                entry[1] += size
+                entry[2].merge(histogram)
+
+    def add_gauge(self, name:str, amount:float):
+        with self.lock:
+            self.gauges[name] = self.gauges.get(name, 0) + amount
+
+    def set_gauge(self, name:str, value:float):
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> dict:
+        """
+        returns <dict> - {'requests' : {endpoint : {status : {'count', 'bytes', 'latency'}}},
+        'phases' : {phase : {'last', 'duration'}}, 'gauges' : {name : value}}.
+        'latency' and 'duration' are Histogram snapshots
+        """
+        with self.lock:
+            requests = {}
+            for (endpoint, status), (count, size, histogram) in self.requests.items():
+                requests.setdefault(endpoint, {})[status] = {
+                    'count' : count, 'bytes' : size, 'latency' : histogram.snapshot(),
+                }
+
+            phases = {
+                phase : {'last' : self.last_cycle.get(phase), 'duration' : histogram.snapshot()}
+                for phase, histogram in self.phases.items()
+            }
+
+            return {'requests' : requests, 'phases' : phases, 'gauges' : dict(self.gauges)}
+
+    def prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, description):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, labels, values):
+            for bound, count in values['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{name}_bucket{_labels(dict(labels, le = le))} {count}')
+
+            lines.append(f'{name}_sum{_labels(labels)} {values["sum"]}')
+            lines.append(f'{name}_count{_labels(labels)} {values["count"]}')
+
+        requests = [
+            ({'endpoint' : endpoint, 'status' : status}, values)
+            for endpoint, statuses in snapshot['requests'].items() for status, values in statuses.items()
+        ]
+
+        metric('edsm_requests_total', 'counter', "Requests made to EDSM")
+        for labels, values in requests:
+            lines.append(f'edsm_requests_total{_labels(labels)} {values["count"]}')
+
+        metric('edsm_received_bytes_total', 'counter', "Bytes received from EDSM")
+        for labels, values in requests:
+            lines.append(f'edsm_received_bytes_total{_labels(labels)} {values["bytes"]}')
+
+        metric('edsm_request_duration_seconds', 'histogram', "Latency of requests to EDSM")
+        for labels, values in requests:
+            histogram('edsm_request_duration_seconds', labels, values['latency'])
+
+        metric('edsm_phase_duration_seconds', 'histogram', "Seconds from start of update cycle until each phase finished")
+        for phase, values in snapshot['phases'].items():
+            histogram('edsm_phase_duration_seconds', {'phase' : phase}, values['duration'])
+
+        metric('edsm_last_cycle_seconds', 'gauge', "Phase durations of the last update cycle")
+        for phase, values in snapshot['phases'].items():
+            lines.append(f'edsm_last_cycle_seconds{_labels({"phase" : phase})} {values["last"]}')
+
+        for name, value in snapshot['gauges'].items():
+            metric(f'edsm_{name}', 'gauge', name.replace('_', ' ').capitalize())
+            lines.append(f'edsm_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels:dict) -> str:
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> Metrics or None:
+    """
+    returns <Metrics or None> - None if metrics are disabled (see config.METRICS_ENABLED)
+
+    Returns the metrics shared by every request and update cycle, creating them on first use
+    """
+    global _metrics
+
+    if _metrics is None and config.METRICS_ENABLED:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+
+    return _metrics
+
+def set_metrics(metrics:Metrics or None) -> Metrics or None:
+    """
+    arg: metrics* <Metrics or None> - metrics to be shared by all requests and update cycles.
+    Pass None to have fresh ones created on next use (if config.METRICS_ENABLED).
+
+    returns <Metrics or None> - the previously shared metrics
+    """
+    global _metrics
+
+    with _metrics_lock:
+        old_metrics = _metrics
+        _metrics = metrics
+
+    return old_metrics
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        metrics = get_metrics()
+        body = (metrics.prometheus() if metrics else '').encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port:int = None, host:str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    arg: port <int> - (defaults to config.METRICS_PORT, 0 picks a free port)
+    arg: host <str> - only serves on localhost by default
+
+    returns <ThreadingHTTPServer> - already serving '/metrics' from a daemon thread. Call .shutdown() to stop it
+    """
+    port = config.METRICS_PORT if port is None else port
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
@@ -1,39 +1,136 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+
+from array import array
 from concurrent.futures import ThreadPoolExecutor, wait, Future
-from typing import Callable
+from typing import Callable, Awaitable
 
 import edsm.api as api
+import edsm.aio as aio
+import edsm.bulk as bulk
 import edsm.config as config
-# TODO: Logging
+import edsm.metrics as metrics
+import edsm.retry as retry
+import edsm.spatial as spatial
+
+# NOTE: NumPy is optional, only used to speed up <MarketIndex> queries
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # NOTE: 'json_dump' methods are meant to return a json-serializable representation of each model with redundant info removed
 # NOTE: 'get_keys' methods are meant allow capturing specific attirbutes returned in 'json_dump' methods
 
 # TODO: automate getting rid of redundancies in output (i.e. system name is listed in system, traffic, and station data)
 
+def records_error(attr:str):
+    """
+    arg: attr* <str> - name of attribute to record errors in
+
+    Decorator for update methods. Sets attr to a description of the error raised by the last call, 
+    or to None once a call succeeds. Data from the last successful call is left in place, so it can still be used (stale).
+    """
+    def decorator(method):
+        if asyncio.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def wrapper(self, *args, **kwargs):
+                try:
+                    result = await method(self, *args, **kwargs)
+
+                except Exception as e:
+                    setattr(self, attr, f'{type(e).__name__}: {e}')
+                    raise
+
+                setattr(self, attr, None)
+                return result
+
+        else:
+            @functools.wraps(method)
+            def wrapper(self, *args, **kwargs):
+                try:
+                    result = method(self, *args, **kwargs)
+
+                except Exception as e:
+                    setattr(self, attr, f'{type(e).__name__}: {e}')
+                    raise
+
+                setattr(self, attr, None)
+                return result
+
+        return wrapper
+
+    return decorator
+
 class Systems():
     """
     Dict-like container class for <System> objects.
+    Systems are indexed by name (case-insensitive), id, and id64.
 
-    Threads updates.
+    Threads updates. 'update_*_async' coroutines run the same updates on an event loop instead (see edsm.aio).
     """
 
     def __init__(self):
-        self.list = []
-        
-    def __delitem__(self, key):
-        self.list.remove(self.get(key))
+        # NOTE: dict used as an insertion-ordered set so removal doesn't need to scan
+        self.systems = {}
+
+        # lookup indexes, kept in sync by add_system and __delitem__
+        self.by_name = {} # keyed by casefolded name, EDSM names are case-insensitive
+        self.by_id = {}
+        self.by_id64 = {}
+
+        # (index name, key) -> systems added under a key already held by another system, oldest first.
+        # The oldest takes over the key when the system holding it is removed
+        self.shadowed = {}
+
+        # optional, only built by spatial_index()
+        self.spatial = None
+
+    def __delitem__(self, key:str):
+        self.discard(self[key])
+
+    def discard(self, system:'System'):
+        # removes <System> from self.systems (and every index), if it's there
+        if self.systems.pop(system, False) is False:
+            return
+
+        for index_name, value in self.index_keys(system):
+            index = getattr(self, index_name)
+            shadowed = self.shadowed.get((index_name, value), [])
+
+            if index.get(value) is system:
+                if shadowed:
+                    index[value] = shadowed.pop(0)
+                else:
+                    del index[value]
+
+            else:
+                shadowed[:] = [other for other in shadowed if other is not system]
+
+            if not shadowed:
+                self.shadowed.pop((index_name, value), None)
+
+        if self.spatial is not None:
+            self.spatial.remove(system)
 
     def __getitem__(self, key:str):
-        for item in self.list:
-            name = item.__dict__.get('name')
-            if name and (name == key):
-                return item
-        
-        else:
-            raise KeyError(f"No system with name \'{key}\'")
-    
+        try:
+            return self.by_name[key.casefold()]
+
+        except KeyError:
+            raise KeyError(f"No system with name \'{key}\'") from None
+
+    def __contains__(self, key:str):
+        return key.casefold() in self.by_name
+
     def __iter__(self):
-        return iter(self.list)
+        return iter(self.systems)
+
+    def __len__(self):
+        return len(self.systems)
         
     def get(self, key:str):
         # Returns star system with given name, returns None if not found
@@ -44,22 +141,100 @@ class Systems():
         except KeyError:
             return None
 
+    def get_by_id(self, id:int):
+        return self.by_id.get(id)
+
+    def get_by_id64(self, id64:int):
+        return self.by_id64.get(id64)
+
+    def index_keys(self, system:'System'):
+        # yields (index name, key) pairs that system is (or should be) filed under
+        name = system.data.get('name')
+        if name:
+            yield 'by_name', name.casefold()
+
+        for attr in ('id', 'id64'):
+            value = system.data.get(attr)
+            if value is not None:
+                yield f'by_{attr}', value
+
     def add_system(self, system_data:dict):
         # appends system data (dict) to self.systems
-        self.list.append(System(system_data))
+        self.add(System(system_data))
+
+    def add(self, system:'System'):
+        # appends <System> to self.systems, i.e. to share one System object between several containers
+        if system in self.systems:
+            return
+
+        self.systems[system] = None
+
+        # NOTE: setdefault so that lookups return the first system added under a key, same as the old linear scan
+        for index_name, value in self.index_keys(system):
+            if getattr(self, index_name).setdefault(value, system) is not system:
+                self.shadowed.setdefault((index_name, value), []).append(system)
+
+        if self.spatial is not None:
+            self.spatial.add(system)
 
     def remove(self, system_name:str):
         try:
             del self[system_name]
-        
-        # NOTE: not excepting KeyError because ValueError from call to del eats KeyError from call to self[bad_key]
-        except ValueError:
+
+        except KeyError:
             pass
     
     def populate(self, systems_data:list[dict]):
         for system in systems_data:
             self.add_system(system)
 
+    def load(self, names:list[str], **options) -> list[str]:
+        """
+        arg: names* <list[str]> - names of systems to add
+        arg: options - passed to edsm.api.Systems.systems (i.e. showCoordinates = 1)
+
+        returns <list[str]> - names EDSM didn't find
+
+        Fetches systems in bulk (see edsm.bulk) and adds each chunk as it arrives, so systems are added
+        in the order their chunks finish. Names already in self are neither fetched nor added again.
+        """
+        wanted = {name.casefold() : name for name in names if name not in self}
+
+        for systems_data in bulk.iter_systems(list(wanted.values()), **options):
+            for system_data in systems_data:
+                name = system_data.get('name', '')
+                if wanted.pop(name.casefold(), None) is not None:
+                    self.add_system(system_data)
+
+        return list(wanted.values())
+
+    def spatial_index(self, cell_size:float = None) -> spatial.SpatialIndex:
+        """
+        arg: cell_size <float> - see <edsm.spatial.SpatialIndex>. Changing it rebuilds the index
+
+        returns <edsm.spatial.SpatialIndex> - index over coords of every system, built on first call
+        and kept up to date by add_system and remove from then on
+        """
+        if self.spatial is None or (cell_size and cell_size != self.spatial.cell_size):
+            self.spatial = spatial.SpatialIndex(self, cell_size)
+
+        return self.spatial
+
+    def around(self, center:str or tuple, radius:float) -> 'Systems':
+        """
+        arg: center* <str or tuple[float, float, float]> - system name or coordinates
+        arg: radius* <float> - ly
+
+        returns <Systems> - new watchlist of systems within radius of center, nearest first (see spatial_index)
+        """
+        if isinstance(center, str):
+            center = self[center]
+
+        around = Systems()
+        around.populate([system.data for system, distance in self.spatial_index().within(center, radius)])
+
+        return around
+
     @staticmethod
     def submit_updates(executor:ThreadPoolExecutor, tasks:list[Callable[[None], None]]):
         futures = []
@@ -76,27 +251,116 @@ class Systems():
         for future in futures:
             if future.exception():
                 raise future.exception()
+
+    @staticmethod
+    def check_error_budget(errors:list[BaseException], total:int):
+        """
+        arg: errors* <list[BaseException]> - errors from failed tasks
+        arg: total* <int> - number of tasks run
+
+        Raises the first error if more than config.ERROR_BUDGET (a fraction of total) of the tasks failed
+        """
+        if not errors:
+            return
+
+        logging.warning(f"{len(errors)} of {total} updates failed (first error: {errors[0]!r})")
+
+        if len(errors) > config.ERROR_BUDGET * total:
+            raise errors[0]
             
-    # TODO: come up with tests for update funcs
-    def update_traffic(self):
-        with ThreadPoolExecutor(max_workers = config.MAX_THREADS) as executor:
-            futures = self.submit_updates(executor, [system.traffic.update for system in self.list])
-            self.check_futures(futures)
-
-    def update_stations(self):
-        with ThreadPoolExecutor(max_workers = config.MAX_THREADS) as executor:
-            futures = self.submit_updates(executor, [system.stations.update for system in self.list])
-            self.check_futures(futures)
-
-    def update_stations_markets(self):
-        with ThreadPoolExecutor(max_workers=config.MAX_THREADS) as executor:
-            tasks = []
-            for system in self.list:
-                for station in system.stations.list: # NOTE: no comprehension because 2+layer comps are confusing
-                    tasks.append(station.update_market)
-
-            futures = self.submit_updates(executor, tasks)
-            self.check_futures(futures)
+    def update_traffic(self) -> dict[str, float]:
+        return self.update(traffic = True)
+
+    def update_stations(self) -> dict[str, float]:
+        return self.update(stations = True)
+
+    def update_stations_markets(self) -> dict[str, float]:
+        return self.update(markets = True)
+
+    def update(self, traffic:bool = False, stations:bool = False, markets:bool = False, 
+        executor:ThreadPoolExecutor = None) -> dict[str, float]:
+        """
+        arg: traffic <bool> - update traffic for every system
+        arg: stations <bool> - update stations for every system
+        arg: markets <bool> - update markets for every station (without stations, only stations already known are updated).
+        With config.INCREMENTAL_MARKETS, station lists are refreshed too (bypassing the cache), since their
+        updateTime decides which markets are fetched
+        arg: executor <ThreadPoolExecutor> - executor to run every update on
+        (defaults to a new one with config.MAX_THREADS workers)
+
+        returns <dict[str, float]> - see <UpdateCycle>.timings
+
+        Runs all requested updates as one pipelined cycle: a system's market updates are submitted 
+        as soon as its stations arrive instead of waiting for every system's stations first.
+
+        Transient errors are retried per task (see edsm.retry). Tasks that still fail are marked 
+        on their models (see get_keys) and only abort the cycle if they exceed config.ERROR_BUDGET.
+        """
+        return self.run_cycle([(system, traffic, stations, markets) for system in self.list], executor)
+
+    @staticmethod
+    def run_cycle(plan:list[tuple['System', bool, bool, bool]], executor:ThreadPoolExecutor = None) -> dict[str, float]:
+        """
+        arg: plan* <list[tuple[System, bool, bool, bool]]> - (system, traffic, stations, markets) to update for each system
+        arg: executor <ThreadPoolExecutor> - see update
+
+        returns <dict[str, float]> - see <UpdateCycle>.timings
+
+        Same as update, with different updates for each system
+        """
+        if executor is None:
+            with ThreadPoolExecutor(max_workers = config.MAX_THREADS) as executor:
+                return Systems.run_cycle(plan, executor)
+
+        cycle = UpdateCycle(executor)
+        incremental = config.INCREMENTAL_MARKETS
+
+        def update_stations_then_markets(system, markets):
+            # NOTE: with incremental markets, the update times that decide which markets are fetched must be current,
+            # so the station list can't come from the cache
+            system.stations.update(fresh = markets and incremental)
+
+            if markets:
+                for station in system.stations.list:
+                    cycle.submit('markets', station.update_market)
+
+        for system, traffic, stations, markets in plan:
+            if traffic:
+                cycle.submit('traffic', system.traffic.update)
+
+            if stations or (markets and incremental):
+                cycle.submit('stations', update_stations_then_markets, system, markets)
+
+            elif markets:
+                # markets of stations already known, without refreshing the stations themselves
+                for station in system.stations.list or []:
+                    cycle.submit('markets', station.update_market)
+
+        cycle.wait()
+        return cycle.timings
+
+    @classmethod
+    async def gather_updates(self, tasks:list[Callable[[], Awaitable[None]]]):
+        # NOTE: waits on every update before raising, same as check_futures
+        results = await asyncio.gather(*[retry.call_with_retries_async(task) for task in tasks], return_exceptions = True)
+
+        self.check_error_budget([result for result in results if isinstance(result, BaseException)], len(tasks))
+
+    async def update_traffic_async(self):
+        await self.gather_updates([system.traffic.update_async for system in self.list])
+
+    async def update_stations_async(self):
+        await self.gather_updates([system.stations.update_async for system in self.list])
+
+    # NOTE: only markets whose station's updateTime moved since they were fetched are updated (see config.INCREMENTAL_MARKETS),
+    # so run update_stations_async first
+    async def update_stations_markets_async(self):
+        tasks = []
+        for system in self.list:
+            for station in system.stations.list:
+                tasks.append(station.update_market_async)
+
+        await self.gather_updates(tasks)
 
     def get_keys(self, keys_dict:dict[str, list[str]]):
         payload = []
@@ -118,10 +382,39 @@ class Systems():
                 if k == 'stations':
                     d[k] = system.stations.get_keys(keys_list)
 
+            errors = self.get_errors(system, keys_dict)
+            if errors:
+                d['errors'] = errors
+
             payload.append(d)
 
         return payload
 
+    @staticmethod
+    def get_errors(system:'System', keys_dict:dict[str, list[str]]) -> dict or None:
+        # Describes failed updates for requested data. Values in the payload for these are stale (or None if never updated)
+        errors = {}
+
+        if 'traffic' in keys_dict and system.traffic.error:
+            errors['traffic'] = system.traffic.error
+
+        if 'stations' in keys_dict:
+            if system.stations.error:
+                errors['stations'] = system.stations.error
+
+            if 'market' in keys_dict['stations'] and system.stations.list:
+                markets = {station.name : station.market_error for station in system.stations.list if station.market_error}
+                if markets:
+                    errors['markets'] = markets
+
+        return errors or None
+
+    def market_index(self) -> 'MarketIndex':
+        """
+        returns <MarketIndex> - for querying commodities across every station market in self
+        """
+        return MarketIndex(self)
+
     def json_dump(self):
         return [
                     {
@@ -131,6 +424,99 @@ class Systems():
                     }   for system in self.list
                 ]
 
+    def to_list(self) -> list['System']:
+        # returns a new list of every <System>, in the order they were added
+        return list(self.systems)
+
+    # NOTE: defined last so it doesn't shadow the builtin in the annotations above
+    @property
+    def list(self) -> tuple['System', ...]:
+        # NOTE: a tuple, so code written for the old list attribute fails loudly instead of changing a copy.
+        # Use add_system/remove to change the watchlist
+        return tuple(self.systems)
+
+
+
+class UpdateCycle():
+    """
+    Tracks update tasks submitted to a shared executor during one update cycle,
+    including tasks submitted by other tasks while the cycle is running.
+
+    arg: executor* <ThreadPoolExecutor>
+
+    method: submit (phase, task, *args) <Future> - task is retried on transient errors (see edsm.retry)
+    method: wait <None> - blocks until every task has finished, then raises the first exception 
+    if too many tasks failed (see Systems.check_error_budget)
+
+    attr: timings <dict[str, float]> - seconds from start of cycle until the last task of each phase finished, 
+    plus 'total' once wait() returns
+    attr: busy <float> - seconds spent running tasks, summed over every worker
+
+    Queue depth, busy workers, phase durations and executor utilization are recorded in edsm.metrics
+    """
+    def __init__(self, executor:ThreadPoolExecutor):
+        self.executor = executor
+        self.futures = []
+        self.timings = {}
+        self.busy = 0.0
+
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+        self.metrics = metrics.get_metrics()
+
+    def submit(self, phase:str, task:Callable, *args) -> Future:
+        def timed():
+            task_start = time.monotonic()
+            if self.metrics:
+                self.metrics.add_gauge('queue_depth', -1)
+                self.metrics.add_gauge('busy_workers', 1)
+
+            try:
+                retry.call_with_retries(task, *args)
+
+            finally:
+                end = time.monotonic()
+                with self.lock:
+                    self.timings[phase] = max(self.timings.get(phase, 0.0), end - self.start)
+                    self.busy += end - task_start
+
+                if self.metrics:
+                    self.metrics.add_gauge('busy_workers', -1)
+
+        if self.metrics:
+            self.metrics.add_gauge('queue_depth', 1)
+
+        future = self.executor.submit(timed)
+
+        with self.lock:
+            self.futures.append(future)
+
+        return future
+
+    def wait(self):
+        # NOTE: tasks only submit new tasks before finishing, so once every known future is done, no more can show up
+        while True:
+            with self.lock:
+                pending = [future for future in self.futures if not future.done()]
+
+            if not pending:
+                break
+
+            wait(pending)
+
+        self.timings['total'] = time.monotonic() - self.start
+
+        if self.metrics:
+            for phase, seconds in self.timings.items():
+                self.metrics.observe_phase(phase, seconds)
+
+            # NOTE: ThreadPoolExecutor doesn't expose its worker count publicly
+            workers = getattr(self.executor, '_max_workers', None)
+            if workers and self.timings['total']:
+                self.metrics.set_gauge('executor_utilization', self.busy / (workers * self.timings['total']))
+
+        errors = [future.exception() for future in self.futures if future.exception()]
+        Systems.check_error_budget(errors, len(self.futures))
 
 
 class System():
@@ -155,16 +541,43 @@ class System():
     attr: requirePermit <bool or None>
     attr: information <dict or None>
     attr: primaryStar <dict or None>
+
+    NOTE: attrs are read straight from system_data (which is kept as-is, not copied). 
+    Children (stations, traffic) are only created when first accessed.
     """
+    __slots__ = ('data', '_stations', '_traffic')
+
     def __init__(self, system_data:dict):
         # TODO: needs harder typing, system_data should always be a dict, no exceptions
-        self.__dict__ = system_data.copy()
         self.data = system_data
 
-        # NOTE: depends on assignment to self.__dict__ to define self.name. Maybe a bad idea?
-        # TODO: conditionals for assigning these??? so we're not wasting time initializing these if theyre not needed
-        self.stations = Stations(self.name)
-        self.traffic = Traffic(self.name)
+        self._stations = None
+        self._traffic = None
+
+    def __getattr__(self, attr):
+        # only called for attrs not found normally, i.e. fields from the API response
+        if attr in System.__slots__:
+            raise AttributeError(attr)
+
+        try:
+            return self.data[attr]
+
+        except KeyError:
+            raise AttributeError(f"\'{type(self).__name__}\' object has no attribute \'{attr}\'") from None
+
+    @property
+    def stations(self) -> 'Stations':
+        if self._stations is None:
+            self._stations = Stations(self.name)
+
+        return self._stations
+
+    @property
+    def traffic(self) -> 'Traffic':
+        if self._traffic is None:
+            self._traffic = Traffic(self.name)
+
+        return self._traffic
 
     def get_keys(self, keys: list[str]):
         # TODO: Include error for when information requested by keys is not included in response data
@@ -185,23 +598,41 @@ class Traffic():
     property: dict <dict or None>
 
     method: update <None>
+    method: update_async <None> (coroutine)
     method: json_dump <dict or None>
 
     method: get_keys (keys) <dict or None>
         arg: keys <list[str]>
+
+    attr: error <str or None> - error from last update, if it failed
     
     attr: traffic <dict>
     attr: breakdown <dict>
 
     TODO: doc rest of attributes from api response
+
+    NOTE: attrs from the api response are read straight from self.dict
     """
+    __slots__ = ('system_name', 'dict', 'error')
+
     def __init__(self, system_name:str):
         self.system_name = system_name
         self.dict = None
+        self.error = None
 
+    def __getattr__(self, attr):
+        if attr in Traffic.__slots__ or not self.dict or attr not in self.dict:
+            raise AttributeError(f"\'{type(self).__name__}\' object has no attribute \'{attr}\'")
+
+        return self.dict[attr]
+
+    @records_error('error')
     def update(self) -> None:
         self.dict = api.System.traffic(self.system_name)
-        self.__dict__.update(self.dict.copy()) # TODO: review
+
+    @records_error('error')
+    async def update_async(self) -> None:
+        self.dict = await aio.System.traffic(self.system_name)
         
     def json_dump(self) -> dict:
         if self.dict:
@@ -225,8 +656,12 @@ class Stations():
     arg: system_name* <str> - name of system
 
     property: list <list> - list of contained stations
+    property: by_name <dict[str, Station]>
+    property: by_market_id <dict[int, Station]>
+    property: error <str or None> - error from last update, if it failed
 
     method: update <None>
+    method: update_async <None> (coroutine)
     method: json_dump <dict or None>
 
     method: get_keys (keys) <dict or None>
@@ -234,27 +669,61 @@ class Stations():
 
     TODO: doc attributes from api response
     """
+    __slots__ = ('system_name', 'list', 'by_name', 'by_market_id', 'error')
+
     def __init__(self, system_name):
         self.system_name = system_name
         self.list = None
 
+        self.by_name = {}
+        self.by_market_id = {}
+
+        self.error = None
+
     def __getitem__(self, key:str) -> 'Station' or None:
         if self.list:
-            for station in self.list:
-                if station.name == key:
-                    return station
-            
-            else:
-                raise KeyError(f"No station found with name {key}")
+            try:
+                return self.by_name[key]
+
+            except KeyError:
+                raise KeyError(f"No station found with name {key}") from None
 
     def __iter__(self):
         if self.list:
             return iter(self.list)
         return None # TODO: maybe something should be raised here
 
-    def update(self):
-        stations = api.System.stations(self.system_name)
-        self.list = [Station(s) for s in stations['stations']]
+    def get_by_market_id(self, market_id:int) -> 'Station' or None:
+        return self.by_market_id.get(market_id)
+
+    def set_list(self, stations_data:list[dict]):
+        previous = self.by_market_id
+
+        self.list = [Station(s) for s in stations_data]
+
+        self.by_name = {}
+        self.by_market_id = {}
+        for station in self.list:
+            self.by_name.setdefault(station.name, station)
+
+            if station.data.get('marketId') is not None:
+                self.by_market_id.setdefault(station.marketId, station)
+
+                # carry over last known market, so there is a (stale) value if this station's market update fails,
+                # and so it isn't fetched again unless it changed (see Station.market_changed)
+                if station.marketId in previous:
+                    station.market = previous[station.marketId].market
+                    station.market_time = previous[station.marketId].market_time
+
+    @records_error('error')
+    def update(self, fresh:bool = False):
+        stations = api.System.stations(self.system_name, fresh = fresh)
+        self.set_list(stations['stations'])
+
+    @records_error('error')
+    async def update_async(self, fresh:bool = False):
+        stations = await aio.System.stations(self.system_name, fresh = fresh)
+        self.set_list(stations['stations'])
 
     def json_dump(self) -> list:
         if self.list:
@@ -264,7 +733,7 @@ class Stations():
 
     def get_keys(self, keys: list[str]):
         if self.list:
-            return [{key : station.json_dump()[key] for key in keys} for station in self.list]
+            return [station.get_keys(keys) for station in self.list]
 
         return None
 
@@ -277,8 +746,15 @@ class Station():
     arg: station_data* <dict>
 
     property: market <Market or None>
+    property: market_error <str or None> - error from last market update, if it failed
+    property: market_time <str or None> - updateTime['market'] of the station when market was fetched
 
+    method: market_changed <bool>
+    method: update_market (force) <None> - only fetches market if it changed (see config.INCREMENTAL_MARKETS), unless force
+    method: update_market_async (force) <None> (coroutine)
     method: json_dump <dict>
+    method: get_keys (keys) <dict>
+        arg: keys <list[str]>
 
     attr: id <int>
     attr: marketId <int>
@@ -294,28 +770,119 @@ class Station():
     attr: haveOutfitting <bool>
     attr: otherServices <list>
     attr: updateTime <dict>
+
+    NOTE: attrs are read straight from station_data (which is kept as-is, not copied)
     """
+    __slots__ = ('data', 'market', 'market_error', 'market_time')
+
     def __init__(self, station_data:dict):
-        self.__dict__ = station_data
+        self.data = station_data
         self.market = None 
+        self.market_error = None
+        self.market_time = None
+
+    def __getattr__(self, attr):
+        if attr in Station.__slots__:
+            raise AttributeError(attr)
+
+        try:
+            return self.data[attr]
+
+        except KeyError:
+            raise AttributeError(f"\'{type(self).__name__}\' object has no attribute \'{attr}\'") from None
 
     def __repr__(self):
-        # NOTE: depends on above assignment to self.__dict__ to define self.name and self.haveMarket
         return f'<{self.__module__}.{self.__class__.__name__}(name="{self.name}", haveMarket={self.haveMarket})>'
 
-    def update_market(self):
-        if self.haveMarket:
+    def market_changed(self) -> bool:
+        """
+        returns <bool> - whether the station's updateTime['market'] has moved past the one self.market was fetched at
+        (or either of them is unknown)
+        """
+        update_time = (self.data.get('updateTime') or {}).get('market')
+
+        # NOTE: EDSM times are 'YYYY-MM-DD HH:MM:SS', so they compare correctly as strings
+        return self.market is None or update_time is None or self.market_time is None or update_time > self.market_time
+
+    @records_error('market_error')
+    def update_market(self, force:bool = False):
+        if self.haveMarket and (force or not config.INCREMENTAL_MARKETS or self.market_changed()):
+            update_time = (self.data.get('updateTime') or {}).get('market')
+
             market_data = api.System.marketById(self.marketId)
             self.market = Market(market_data)
+            self.market_time = update_time
+
+    @records_error('market_error')
+    async def update_market_async(self, force:bool = False):
+        if self.haveMarket and (force or not config.INCREMENTAL_MARKETS or self.market_changed()):
+            update_time = (self.data.get('updateTime') or {}).get('market')
+
+            market_data = await aio.System.marketById(self.marketId)
+            self.market = Market(market_data)
+            self.market_time = update_time
 
     def json_dump(self) -> dict:
-        dict_copy = self.__dict__.copy()
-        del dict_copy['market'] # deleting because held <Market> obj is not json serializable. 
-        
-        dict_copy.update({'market' : self.market.commodities if self.market else None})
-        return dict_copy
+        # NOTE: held <Market> obj is not json serializable, so its commodities are dumped in its place
+        return {**self.data, 'market' : self.market.commodities if self.market else None}
+
+    def get_keys(self, keys: list[str]) -> dict:
+        # same as picking keys from json_dump(), without building the whole dump
+        return {key : self.data[key] if key != 'market' else (self.market.commodities if self.market else None) for key in keys}
+
+
+class CommodityTable():
+    """
+    Interns commodity names to small integer ids, shared by every <Market>.
+
+    method: intern (key, name) <int>
+    method: lookup (name) <int or None> - id for a commodity key ('gold') or display name ('Gold'), case-insensitive
+
+    attr: keys <list[str]> - commodity keys by id (EDSM's 'id' field, i.e. 'advancedcatalysers')
+    attr: names <list[str]> - display names by id (EDSM's 'name' field, i.e. 'Advanced Catalysers')
+    """
+    def __init__(self):
+        self.keys = []
+        self.names = []
+        self.ids = {}
+
+        self.lock = threading.Lock()
+
+    def intern(self, key:str, name:str = None) -> int:
+        commodity_id = self.ids.get(key)
+        if commodity_id is not None:
+            return commodity_id
+
+        with self.lock:
+            if key not in self.ids:
+                self.ids[key] = len(self.keys)
+                self.keys.append(key)
+                self.names.append(name if name is not None else key)
+
+                # NOTE: also indexed by casefolded key and display name for lookup()
+                self.ids.setdefault(key.casefold(), self.ids[key])
+                self.ids.setdefault(self.names[-1].casefold(), self.ids[key])
+
+            return self.ids[key]
 
-    # TODO: add get_key maybe
+    def lookup(self, name:str) -> int or None:
+        commodity_id = self.ids.get(name)
+        if commodity_id is None:
+            commodity_id = self.ids.get(name.casefold())
+
+        return commodity_id
+
+
+COMMODITIES = CommodityTable()
+
+# stands in for EDSM's nulls in <Market> columns (no value of a real price, stock or demand)
+MISSING = -(1 << 63)
+
+def to_column(values:list) -> array:
+    return array('q', [MISSING if value is None else value for value in values])
+
+def from_column(value:int) -> int or None:
+    return None if value == MISSING else value
 
 
 class Market():
@@ -328,13 +895,174 @@ class Market():
     attr: marketId <int>
     attr: sId <int> - station ID
     attr: sName <str> - station name
-    attr: commodities <dict>
-
-    Models station market data.
+    attr: commodities <list[dict]> - rebuilt from the columns below on access
+
+    attr: commodity_ids <array[int]> - ids from COMMODITIES
+    attr: buy_prices <array[int]>
+    attr: sell_prices <array[int]>
+    attr: stock <array[int]>
+    attr: demand <array[int]>
+    attr: stock_brackets <array[int]>
+
+    Models station market data. 
+    Commodities are held as one array per field (with the same index for the same commodity) instead of a dict per commodity.
+    Fields EDSM left null are held as MISSING (see from_column), and are null again in commodities.
     Direct chiild of <Station> objects
     """
+    __slots__ = ('data', 'commodity_ids', 'buy_prices', 'sell_prices', 'stock', 'demand', 'stock_brackets')
+
     def __init__(self, market_data):
-        self.__dict__ = market_data
-        
-        # TODO: model commodities?
+        # NOTE: market_data isn't modified, it may be shared with other callers (i.e. a cached response)
+        self.data = {k : v for k, v in market_data.items() if k != 'commodities'}
+
+        commodities = market_data.get('commodities') or []
+
+        self.commodity_ids = array('q', [COMMODITIES.intern(c['id'], c.get('name')) for c in commodities])
+        self.buy_prices = to_column([c.get('buyPrice') for c in commodities])
+        self.sell_prices = to_column([c.get('sellPrice') for c in commodities])
+        self.stock = to_column([c.get('stock') for c in commodities])
+        self.demand = to_column([c.get('demand') for c in commodities])
+        self.stock_brackets = to_column([c.get('stockBracket') for c in commodities])
+
         # TODO: update method?
+
+    def __getattr__(self, attr):
+        if attr in Market.__slots__:
+            raise AttributeError(attr)
+
+        try:
+            return self.data[attr]
+
+        except KeyError:
+            raise AttributeError(f"\'{type(self).__name__}\' object has no attribute \'{attr}\'") from None
+
+    def __len__(self):
+        return len(self.commodity_ids)
+
+    @property
+    def commodities(self) -> list[dict]:
+        return [
+            {
+                'id' : COMMODITIES.keys[commodity_id],
+                'name' : COMMODITIES.names[commodity_id],
+                'buyPrice' : from_column(self.buy_prices[i]),
+                'stock' : from_column(self.stock[i]),
+                'sellPrice' : from_column(self.sell_prices[i]),
+                'demand' : from_column(self.demand[i]),
+                'stockBracket' : from_column(self.stock_brackets[i]),
+            } for i, commodity_id in enumerate(self.commodity_ids)
+        ]
+
+
+class MarketIndex():
+    """
+    Commodity columns of every market in a <Systems> concatenated together, for queries across all stations.
+    Uses NumPy for the queries when it's installed. Missing values (see <Market>) never match a query.
+
+    arg: systems* <Systems>
+
+    method: best_sell (commodity) <tuple[System, Station, int] or None> - station paying the most for commodity
+    method: best_buy (commodity) <tuple[System, Station, int] or None> - cheapest station with commodity in stock
+    method: stocked (commodity, min_stock) <list[tuple[System, Station, int]]> - stations with more than min_stock in stock
+    method: demanded (commodity, min_demand) <list[tuple[System, Station, int]]> - stations with more than min_demand demand
+
+    NOTE: a snapshot of markets at the time it's built; build a new one after updating markets.
+    """
+    def __init__(self, systems:'Systems'):
+        self.stations = [] # (system, station) for each market
+        self.rows = array('q') # index into self.stations for each commodity row
+
+        self.commodity_ids = array('q')
+        self.buy_prices = array('q')
+        self.sell_prices = array('q')
+        self.stock = array('q')
+        self.demand = array('q')
+
+        for system in systems:
+            for station in system.stations.list or []:
+                market = station.market
+                if not market:
+                    continue
+
+                self.rows.extend([len(self.stations)] * len(market))
+                self.stations.append((system, station))
+
+                self.commodity_ids.extend(market.commodity_ids)
+                self.buy_prices.extend(market.buy_prices)
+                self.sell_prices.extend(market.sell_prices)
+                self.stock.extend(market.stock)
+                self.demand.extend(market.demand)
+
+    def _numpy(self, column:array):
+        # NOTE: zero-copy view, the index's columns aren't resized once it's built
+        return numpy.frombuffer(column, dtype = numpy.int64)
+
+    def _mask(self, commodity_id:int, *minimums:tuple[array, int]):
+        # returns NumPy mask of rows for commodity_id with a value above min_value in each (column, min_value)
+        mask = self._numpy(self.commodity_ids) == commodity_id
+        for column, min_value in minimums:
+            mask &= self._numpy(column) > min_value
+
+        return mask
+
+    def _select(self, commodity:str, column:array, min_value:int = None) -> list[int]:
+        # returns indexes of rows for commodity (with a value above min_value in column, if given)
+        commodity_id = COMMODITIES.lookup(commodity)
+        if commodity_id is None:
+            return []
+
+        if min_value is None:
+            # NOTE: MISSING is below any min_value, so it's only let through when there is none
+            min_value = MISSING
+
+        if numpy:
+            return numpy.flatnonzero(self._mask(commodity_id, (column, min_value))).tolist()
+
+        return [i for i, c in enumerate(self.commodity_ids) if c == commodity_id and column[i] > min_value]
+
+    def _result(self, i:int, column:array) -> tuple:
+        system, station = self.stations[self.rows[i]]
+        return system, station, column[i]
+
+    def best_sell(self, commodity:str) -> tuple or None:
+        commodity_id = COMMODITIES.lookup(commodity)
+        if commodity_id is None:
+            return None
+
+        if numpy:
+            mask = self._mask(commodity_id, (self.sell_prices, 0))
+            if not mask.any():
+                return None
+
+            return self._result(int(numpy.where(mask, self._numpy(self.sell_prices), MISSING).argmax()), self.sell_prices)
+
+        rows = self._select(commodity, self.sell_prices, 0)
+        if not rows:
+            return None
+
+        return self._result(max(rows, key = self.sell_prices.__getitem__), self.sell_prices)
+
+    def best_buy(self, commodity:str) -> tuple or None:
+        commodity_id = COMMODITIES.lookup(commodity)
+        if commodity_id is None:
+            return None
+
+        if numpy:
+            mask = self._mask(commodity_id, (self.stock, 0), (self.buy_prices, 0))
+            if not mask.any():
+                return None
+
+            prices = numpy.where(mask, self._numpy(self.buy_prices), numpy.iinfo(numpy.int64).max)
+            return self._result(int(prices.argmin()), self.buy_prices)
+
+        rows = [i for i in self._select(commodity, self.stock, 0) if self.buy_prices[i] > 0]
+        if not rows:
+            return None
+
+        return self._result(min(rows, key = self.buy_prices.__getitem__), self.buy_prices)
+
+    def stocked(self, commodity:str, min_stock:int = 0) -> list[tuple]:
+        return [self._result(i, self.stock) for i in self._select(commodity, self.stock, min_stock)]
+
+    def demanded(self, commodity:str, min_demand:int = 0) -> list[tuple]:
+        return [self._result(i, self.demand) for i in self._select(commodity, self.demand, min_demand)]
@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import threading
+import time
+
+import edsm.config as config
+
+"""
+Adaptive rate limiting shared by every request sent through edsm.api and edsm.aio.
+
+EDSM reports its quota in 'X-Rate-Limit-Limit', 'X-Rate-Limit-Remaining' and 'X-Rate-Limit-Reset'
+(seconds until the quota is fully restored) response headers. <RateLimiter> spreads the remaining quota
+evenly over the time left until reset, and halves concurrency whenever EDSM answers with a 429.
+"""
+
+class RateLimiter():
+    """
+    Token bucket with an adjustable concurrency cap.
+
+    arg: rate <float or None> - starting request rate (requests per second), None for unlimited
+    until the first response with rate limit headers arrives (defaults to config.RATE_LIMIT)
+    arg: burst <int> - max number of tokens held by the bucket (defaults to config.RATE_LIMIT_BURST)
+    arg: max_concurrency <int> - max number of requests in flight 
+    (defaults to the larger of config.MAX_THREADS and config.ASYNC_MAX_CONCURRENCY)
+    arg: share <float> - fraction of EDSM's quota this limiter spends, for limiters in processes sharing one quota
+    (i.e. 1 / number of processes, see edsm.shard)
+
+    method: acquire <None> - blocks until a request may be sent
+    method: acquire_async <None> (coroutine)
+    method: release <None> - must be called once the request acquired for has finished
+    method: update (status, headers) <None> - adjusts rate and concurrency from a response
+    method: state <dict>
+    """
+    def __init__(self, rate:float = None, burst:int = None, max_concurrency:int = None, share:float = 1.0):
+        self.rate = rate if rate is not None else config.RATE_LIMIT
+        self.burst = burst if burst is not None else config.RATE_LIMIT_BURST
+        self.share = share
+
+        if max_concurrency is None:
+            max_concurrency = max(config.MAX_THREADS, config.ASYNC_MAX_CONCURRENCY)
+
+        self.max_concurrency = max_concurrency
+
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.concurrency = self.max_concurrency
+        self.in_flight = 0
+
+        # last values seen in response headers
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+
+        self.requests = 0
+        self.throttled = 0
+
+        self.lock = threading.Lock()
+        self.slot_free = threading.Condition(self.lock)
+
+        # (event loop, asyncio.Future) of coroutines waiting for a slot, oldest first
+        self.waiters = collections.deque()
+
+    def _refill(self, now:float):
+        if self.rate is None:
+            self.tokens = float(self.burst)
+        else:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        returns <float> - seconds to wait before sending
+
+        Takes a token without blocking.
+        Tokens may go negative, which queues callers behind each other at the current rate.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self.tokens -= 1
+            self.requests += 1
+
+            delay = max(0.0, self.blocked_until - now)
+            if self.tokens < 0 and self.rate:
+                delay = max(delay, -self.tokens / self.rate)
+
+            return delay
+
+    def _try_enter(self) -> bool:
+        # NOTE: caller must hold self.lock
+        if self.in_flight < self.concurrency:
+            self.in_flight += 1
+            return True
+
+        return False
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+        with self.slot_free:
+            while not self._try_enter():
+                self.slot_free.wait()
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+        # NOTE: can't wait on a threading.Condition from the event loop, so wait on a future that
+        # _wake resolves (from whichever thread frees the slot) once the slot is taken on our behalf
+        with self.lock:
+            if not self.waiters and self._try_enter():
+                return
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.waiters.append((loop, future))
+
+        try:
+            await future
+
+        except asyncio.CancelledError:
+            with self.lock:
+                try:
+                    self.waiters.remove((loop, future))
+                    granted = False
+
+                except ValueError:
+                    # already given a slot by _wake. If _grant hasn't run yet it hands the slot back itself,
+                    # otherwise the slot was handed over and is ours to give back
+                    granted = future.done() and not future.cancelled()
+
+            if granted:
+                self.release()
+
+            raise
+
+    def _wake(self):
+        # NOTE: caller must hold self.lock. Takes free slots for the oldest waiting coroutines
+        while self.waiters and self.in_flight < self.concurrency:
+            loop, future = self.waiters.popleft()
+            self.in_flight += 1
+
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+
+            except RuntimeError:
+                # event loop is closed
+                self.in_flight -= 1
+
+    def _grant(self, future:asyncio.Future):
+        # runs on the waiter's event loop
+        if future.done():
+            # cancelled after it was given a slot
+            self.release()
+
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self.slot_free:
+            self.in_flight -= 1
+            self._wake()
+            self.slot_free.notify()
+
+    def update(self, status:int, headers:dict):
+        """
+        arg: status* <int> - response status code
+        arg: headers* <dict> - response headers
+
+        Adjusts rate and concurrency from EDSM's rate limit headers
+        """
+        headers = {k.lower() : v for k, v in headers.items()}
+
+        def header(name):
+            try:
+                return float(headers[name])
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        limit = header('x-rate-limit-limit')
+        remaining = header('x-rate-limit-remaining')
+        reset = header('x-rate-limit-reset')
+        retry_after = header('retry-after')
+
+        with self.slot_free:
+            now = time.monotonic()
+            self._refill(now)
+
+            if limit is not None:
+                self.limit = limit
+
+            if remaining is not None and reset is not None:
+                self.remaining = remaining
+                self.reset = reset
+
+                # spend (our share of) what's left of the quota evenly until it resets
+                self.rate = self.share * max(remaining, 1.0) / max(reset, 1.0)
+                self.tokens = min(self.tokens, self.share * remaining)
+
+            if status == 429:
+                self.throttled += 1
+                self.tokens = min(self.tokens, 0.0)
+                self.concurrency = max(1, self.concurrency // 2)
+
+                wait = retry_after if retry_after is not None else (reset or 1.0)
+                self.blocked_until = max(self.blocked_until, now + wait)
+
+            elif status < 400 and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._wake()
+                self.slot_free.notify()
+
+    def state(self) -> dict:
+        """
+        returns <dict>
+
+        Current limiter state, for monitoring
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+
+            return {
+                'rate' : self.rate,
+                'tokens' : self.tokens,
+                'concurrency' : self.concurrency,
+                'max_concurrency' : self.max_concurrency,
+                'in_flight' : self.in_flight,
+                'waiting' : len(self.waiters),
+                'limit' : self.limit,
+                'remaining' : self.remaining,
+                'reset' : self.reset,
+                'blocked_for' : max(0.0, self.blocked_until - time.monotonic()),
+                'requests' : self.requests,
+                'throttled' : self.throttled,
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter() -> RateLimiter:
+    """
+    returns <RateLimiter>
+
+    Returns the limiter shared by every request, creating it on first use
+    """
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+
+    return _limiter
+
+def set_limiter(limiter:RateLimiter or None) -> RateLimiter or None:
+    """
+    arg: limiter* <RateLimiter or None> - limiter to be shared by all requests.
+    Pass None to have a fresh one created on next use.
+
+    returns <RateLimiter or None> - the previously shared limiter
+    """
+    global _limiter
+
+    with _limiter_lock:
+        old_limiter = _limiter
+        _limiter = limiter
+
+    return old_limiter
@@ -0,0 +1,166 @@
+import json
+
+from typing import Iterator
+
+import edsm.codec as codec
+import edsm.delta as delta
+
+"""
+For reading snapshots back out of files written by edsm.log.Logger.
+
+Snapshots are parsed and yielded one at a time, so memory use doesn't grow with the size of the file.
+Works with the 'json' (one top-level array), 'jsonl' (one snapshot per line) and 'delta' (see edsm.delta) formats.
+
+    for snapshot in iter_snapshots('log.json', start = 1633046400, systems = ['Sol'], fields = ['system.name', 'traffic.traffic']):
+        ...
+"""
+
+# number of characters read from file at a time when streaming a top-level JSON array
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+def detect_format(filepath:str) -> str or None:
+    """
+    returns <str or None> - 'json' or 'jsonl', None if the file is empty
+    """
+    with open(filepath, 'r') as f:
+        while True:
+            c = f.read(1)
+            if not c:
+                return None
+
+            if not c.isspace():
+                return 'json' if c == '[' else 'jsonl'
+
+def _iter_array(f) -> Iterator[dict]:
+    # Decodes items of a top-level JSON array one by one, reading more of the file only when needed
+    buffer = f.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Expected a top-level JSON array")
+
+    pos = 1
+    eof = False
+
+    while True:
+        # skip whitespace and separators between items
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+
+        except json.JSONDecodeError:
+            if eof:
+                raise
+
+        else:
+            yield item
+            pos = end
+            continue
+
+        # item is cut off at the end of buffer, keep the unread part and read more.
+        # NOTE: reads at least as much as is already buffered, so the buffer doubles while an item doesn't fit in it
+        # and a large item is decoded O(log n) times instead of once per chunk
+        chunk = f.read(max(CHUNK_SIZE, len(buffer) - pos))
+        eof = not chunk
+
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+def _iter_lines(f) -> Iterator[dict]:
+    for line in f:
+        if line.strip():
+            yield codec.loads(line)
+
+def iter_raw(filepath:str, start:int = None) -> Iterator[dict]:
+    """
+    arg: filepath* <str>
+    arg: start <int> - unix time, lets delta logs skip ahead to the keyframe before it
+
+    returns <Iterator[dict]> - every snapshot in file, unfiltered (though snapshots before start may be skipped)
+    """
+    file_format = detect_format(filepath)
+    if file_format is None:
+        return
+
+    if file_format == 'jsonl' and delta.is_delta_log(filepath):
+        yield from delta.iter_decoded(filepath, start = start)
+        return
+
+    with open(filepath, 'r') as f:
+        if file_format == 'json':
+            yield from _iter_array(f)
+
+        else:
+            yield from _iter_lines(f)
+
+def project(entry:dict, fields:list[str]) -> dict:
+    """
+    arg: entry* <dict> - one item of a snapshot's 'data'
+    arg: fields* <list[str]> - 'section' or 'section.key' paths, i.e. ['system.name', 'traffic']
+
+    returns <dict> - entry with only the given fields
+    """
+    projected = {}
+
+    for field in fields:
+        section, _, key = field.partition('.')
+        if section not in entry:
+            continue
+
+        if not key:
+            projected[section] = entry[section]
+            continue
+
+        value = entry[section]
+        if isinstance(value, list):
+            # i.e. 'stations.name', pick key from every station
+            items = projected.setdefault(section, [{} for _ in value])
+            for projected_item, item in zip(items, value):
+                projected_item[key] = item.get(key)
+
+        elif isinstance(value, dict):
+            projected.setdefault(section, {})[key] = value.get(key)
+
+        else:
+            projected[section] = value
+
+    return projected
+
+def iter_snapshots(filepath:str, start:int = None, end:int = None,
+    systems:list[str] = None, fields:list[str] = None) -> Iterator[dict]:
+    """
+    arg: filepath* <str>
+    arg: start <int> - only yield snapshots taken at or after this unix time
+    arg: end <int> - only yield snapshots taken at or before this unix time
+    arg: systems <list[str]> - only keep entries for systems with these names (case-insensitive).
+    Requires 'name' to have been logged under 'system'
+    arg: fields <list[str]> - only keep these fields of each entry (see project)
+
+    returns <Iterator[dict]> - snapshots ({'timestamp' : <int>, 'data' : <list[dict]>}), in the order they were logged
+    """
+    names = {name.casefold() for name in systems} if systems is not None else None
+
+    for snapshot in iter_raw(filepath, start = start):
+        timestamp = snapshot['timestamp']
+
+        if start is not None and timestamp < start:
+            continue
+
+        if end is not None and timestamp > end:
+            # snapshots are logged in time order, so none of the rest are in range either
+            break
+
+        data = snapshot['data']
+
+        if names is not None:
+            data = [entry for entry in data if (entry.get('system') or {}).get('name', '').casefold() in names]
+
+        if fields is not None:
+            data = [project(entry, fields) for entry in data]
+
+        yield {'timestamp' : timestamp, 'data' : data}
@@ -0,0 +1,150 @@
+import math
+
+from concurrent.futures import ThreadPoolExecutor
+
+import edsm.api as api
+import edsm.config as config
+import edsm.retry as retry
+import edsm.spatial as spatial
+
+"""
+Discovery of systems in regions bigger than one EDSM query allows.
+
+A box (or the box around a sphere) is split into cubes of at most config.CUBE_MAX_SIZE ly, which are fetched
+concurrently from the cube-systems endpoint. Systems found in more than one cube are kept once (by id64).
+
+    systems = models.Systems()
+    region.populate(systems, region.fetch_sphere('Sol', 500))
+"""
+
+def tiles(low:spatial.Point, high:spatial.Point, size:float = None) -> list[spatial.Point]:
+    """
+    arg: low* <tuple[float, float, float]> - lowest corner of box
+    arg: high* <tuple[float, float, float]> - highest corner of box
+    arg: size <float> - max width of tiles (defaults to config.CUBE_MAX_SIZE)
+
+    returns <list[tuple[float, float, float]]> - centers of equally sized cubes covering the box.
+    Each cube is at most size wide, see tile_size
+    """
+    size = size or config.CUBE_MAX_SIZE
+
+    counts = [max(1, math.ceil((hi - lo) / size)) for lo, hi in zip(low, high)]
+    widths = [(hi - lo) / count for lo, hi, count in zip(low, high, counts)]
+
+    return [
+        (low[0] + (i + 0.5) * widths[0], low[1] + (j + 0.5) * widths[1], low[2] + (k + 0.5) * widths[2])
+        for i in range(counts[0]) for j in range(counts[1]) for k in range(counts[2])
+    ]
+
+def tile_size(low:spatial.Point, high:spatial.Point, size:float = None) -> float:
+    # width of the cubes returned by tiles(low, high, size), the widest axis decides
+    size = size or config.CUBE_MAX_SIZE
+    return max((hi - lo) / max(1, math.ceil((hi - lo) / size)) for lo, hi in zip(low, high))
+
+def dedupe(systems_data:list[dict]) -> list[dict]:
+    """
+    returns <list[dict]> - systems_data with later duplicates dropped (matched by id64, or name if there's no id64)
+    """
+    seen = set()
+    unique = []
+
+    for system in systems_data:
+        key = system.get('id64')
+        if key is None:
+            key = (system.get('name') or '').casefold()
+
+        if key not in seen:
+            seen.add(key)
+            unique.append(system)
+
+    return unique
+
+def fetch_box(low, high, executor:ThreadPoolExecutor = None, **options) -> list[dict]:
+    """
+    arg: low* <tuple or dict or edsm.models.System> - lowest corner of box (see edsm.spatial.coords_of)
+    arg: high* <tuple or dict or edsm.models.System> - highest corner of box
+    arg: executor <ThreadPoolExecutor> - (defaults to a new one with config.MAX_THREADS workers)
+    arg: options - passed to edsm.api.Systems.cube_systems (i.e. showInformation = 1).
+    showId and showCoordinates are always set.
+
+    returns <list[dict]> - every system in the box, once each
+
+    Tiles are retried on transient errors (see edsm.retry), any tile that still fails raises once every tile is done
+    """
+    low, high = spatial.coords_of(low), spatial.coords_of(high)
+
+    if executor is None:
+        with ThreadPoolExecutor(max_workers = config.MAX_THREADS) as executor:
+            return fetch_box(low, high, executor, **options)
+
+    options = dict(options, showId = 1, showCoordinates = 1)
+
+    # NOTE: tiles are rounded up to whole ly so that neighbouring cubes overlap rather than leave gaps
+    size = math.ceil(tile_size(low, high))
+
+    def fetch(center):
+        x, y, z = center
+        return retry.call_with_retries(lambda: api.Systems.cube_systems(x = x, y = y, z = z, size = size, **options))
+
+    futures = [executor.submit(fetch, center) for center in tiles(low, high)]
+
+    systems_data = []
+    for future in futures:
+        systems_data.extend(future.result() or [])
+
+    # drop systems picked up by the overlap of edge tiles
+    return [
+        system for system in dedupe(systems_data)
+        if all(lo <= c <= hi for lo, c, hi in zip(low, spatial.coords_of(system) or low, high))
+    ]
+
+def fetch_sphere(center, radius:float, executor:ThreadPoolExecutor = None, **options) -> list[dict]:
+    """
+    arg: center* <str or tuple or dict or edsm.models.System> - system name, or coordinates (see edsm.spatial.coords_of)
+    arg: radius* <float> - ly
+    arg: executor <ThreadPoolExecutor>
+    arg: options - see fetch_box
+
+    returns <list[dict]> - every system within radius of center, once each, nearest first (with 'distance' set)
+
+    Raises ValueError if center is a name EDSM has no coordinates for
+    """
+    if isinstance(center, str):
+        # NOTE: EDSM answers unknown names with an empty list (or object) instead of an error
+        system = api.Systems.system(center, showCoordinates = 1)
+        if not system or 'coords' not in system:
+            raise ValueError(f"No coordinates for system '{center}' on EDSM")
+
+        center = system['coords']
+
+    center = spatial.coords_of(center)
+
+    low = tuple(c - radius for c in center)
+    high = tuple(c + radius for c in center)
+
+    found = []
+    for system in fetch_box(low, high, executor, **options):
+        distance = math.dist(center, spatial.coords_of(system))
+        if distance <= radius:
+            found.append(dict(system, distance = round(distance, 2)))
+
+    return sorted(found, key = lambda system: system['distance'])
+
+def populate(systems, systems_data:list[dict]) -> int:
+    """
+    arg: systems* <edsm.models.Systems>
+    arg: systems_data* <list[dict]>
+
+    returns <int> - number of systems added (ones already in systems, by id64 or name, are skipped)
+    """
+    added = 0
+
+    for system in systems_data:
+        id64 = system.get('id64')
+        if (id64 is not None and systems.get_by_id64(id64)) or system.get('name', '') in systems:
+            continue
+
+        systems.add_system(system)
+        added += 1
+
+    return added
@@ -0,0 +1,73 @@
+import asyncio
+import random
+import time
+
+import requests
+
+import edsm.config as config
+
+"""
+Retries with jittered exponential backoff for single update tasks,
+so that one transient error doesn't cost a whole update cycle.
+"""
+
+def is_transient(exc:BaseException) -> bool:
+    """
+    returns <bool> - whether the request that raised exc is worth retrying
+    (connection errors, timeouts, 429s and 5xx responses)
+    """
+    if isinstance(exc, requests.HTTPError):
+        response = getattr(exc, 'response', None)
+        status = getattr(response, 'status_code', None) or getattr(exc, 'status', None)
+
+        return status is not None and (status == 429 or status >= 500)
+
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, asyncio.TimeoutError))
+
+def backoff_delay(attempt:int, base:float = None, cap:float = None) -> float:
+    """
+    arg: attempt* <int> - number of attempts made so far, starting at 0
+    arg: base <float> - (defaults to config.RETRY_BACKOFF)
+    arg: cap <float> - (defaults to config.RETRY_BACKOFF_MAX)
+
+    returns <float> - seconds to wait before the next attempt ("full jitter": uniform between 0 and base * 2^attempt, capped)
+    """
+    base = config.RETRY_BACKOFF if base is None else base
+    cap = config.RETRY_BACKOFF_MAX if cap is None else cap
+
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def call_with_retries(task, *args, attempts:int = None):
+    """
+    arg: task* <Callable>
+    arg: attempts <int> - max number of calls (defaults to config.RETRY_ATTEMPTS)
+
+    Calls task(*args), retrying transient errors with backoff. Other errors are raised straight away.
+    """
+    attempts = config.RETRY_ATTEMPTS if attempts is None else attempts
+
+    for attempt in range(attempts):
+        try:
+            return task(*args)
+
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_transient(e):
+                raise
+
+            time.sleep(backoff_delay(attempt))
+
+async def call_with_retries_async(task, *args, attempts:int = None):
+    """
+    Same as call_with_retries, for a coroutine function
+    """
+    attempts = config.RETRY_ATTEMPTS if attempts is None else attempts
+
+    for attempt in range(attempts):
+        try:
+            return await task(*args)
+
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_transient(e):
+                raise
+
+            await asyncio.sleep(backoff_delay(attempt))
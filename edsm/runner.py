@@ -0,0 +1,158 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import edsm.config as config
+import edsm.log as log
+import edsm.metrics as metrics
+import edsm.models as models
+import edsm.schedule as schedule
+
+"""
+For running many loggers (watchlists) in one process, on one schedule and one fetch engine.
+
+Every logger keeps its own keys, output file and cadences, but systems are shared: a system on several watchlists
+is one <edsm.models.System>, updated once per cycle with everything any due watchlist needs from it. All updates
+go through one executor, and (like every query) one connection pool and rate limiter (see edsm.api, edsm.ratelimit).
+
+    runner = Runner()
+    runner.add(traffic_logger, cadences = {'traffic' : 900})
+    runner.add(market_logger, cadences = {'stations' : 86400, 'markets' : 3600})
+    runner.run()
+"""
+
+class Runner():
+    """
+    arg: max_workers <int> - size of the shared executor (defaults to config.MAX_THREADS)
+
+    method: add (logger, cadences) <None>
+    method: remove (logger) <None>
+    method: log (timestamp, due) <dict[str, float]> - runs one cycle for due loggers, returns its timings
+    method: run <None> - runs cycles on an infinite loop, on the loggers' wall-clock boundaries
+    method: close <None> - shuts down the shared executor
+
+    attr: systems <edsm.models.Systems> - every system on any watchlist, once each
+    attr: loggers <dict[edsm.log.Logger, edsm.schedule.Schedule]>
+    """
+    def __init__(self, max_workers:int = None):
+        self.executor = ThreadPoolExecutor(max_workers = max_workers or config.MAX_THREADS)
+
+        self.systems = models.Systems()
+        self.loggers = {}
+
+    def shared(self, system:models.System) -> models.System:
+        # returns the shared System for system, adding it to self.systems if it's new
+        id64 = system.data.get('id64')
+        found = self.systems.get_by_id64(id64) if id64 is not None else None
+
+        if found is None:
+            found = self.systems.get(system.data.get('name', ''))
+
+        if found is None:
+            self.systems.add(system)
+            found = system
+
+        return found
+
+    def add(self, logger:log.Logger, cadences:dict[str, float] = None):
+        """
+        arg: logger* <edsm.log.Logger> - its systems should be populated before it's added
+        arg: cadences <dict[str, float]> - see edsm.schedule (defaults to config.CADENCES, or every
+        config.DEFAULT_SLEEP seconds for every kind)
+
+        Swaps the systems on logger's watchlist for the shared ones
+        """
+        watchlist = models.Systems()
+        for system in logger.systems:
+            watchlist.add(self.shared(system))
+
+        logger.systems = watchlist
+
+        cadences = cadences or config.CADENCES or {kind : config.DEFAULT_SLEEP for kind in schedule.KINDS}
+        self.loggers[logger] = schedule.Schedule(cadences)
+
+    def remove(self, logger:log.Logger):
+        """
+        Stops running logger. Shared systems no other logger watches are dropped
+        """
+        del self.loggers[logger]
+
+        watched = {system for other in self.loggers for system in other.systems}
+        for system in list(self.systems):
+            if system not in watched:
+                self.systems.discard(system)
+
+    def plan(self, due:dict[log.Logger, set[str]]) -> list[tuple]:
+        """
+        arg: due* <dict[edsm.log.Logger, set[str]]> - kinds due for each logger
+
+        returns <list[tuple[System, bool, bool, bool]]> - see edsm.models.Systems.run_cycle.
+        Each system is in it once, with every update any due logger needs from it
+        """
+        flags = {}
+
+        for logger, kinds in due.items():
+            needs = logger.kinds_by_keys(kinds)
+            if not any(needs):
+                continue
+
+            for system in logger.systems:
+                flags[system] = tuple(a or b for a, b in zip(flags.get(system, (False, False, False)), needs))
+
+        return [(system, *needs) for system, needs in flags.items()]
+
+    def log(self, timestamp:int, due:dict[log.Logger, set[str]]) -> dict[str, float]:
+        """
+        arg: timestamp* <int> - for every snapshot written this cycle
+        arg: due* <dict[edsm.log.Logger, set[str]]> - kinds due for each logger
+
+        Updates every system once, then appends a snapshot for every due logger
+        """
+        plan = self.plan(due)
+
+        logging.info(f"Updating {len(plan)} systems for {len(due)} loggers")
+        timings = models.Systems.run_cycle(plan, self.executor)
+
+        logging.info("Update timings: " + ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+
+        for logger, kinds in due.items():
+            logger.append(logger.generate_payload(timestamp), kinds)
+
+        return timings
+
+    def run(self):
+        """
+        Runs cycles on an infinite loop. Each cycle fires on the next boundary of any logger (see edsm.schedule),
+        loggers with nothing due at a boundary are left out of it
+
+        Raises ValueError if no logger was added
+        """
+        if not self.loggers:
+            raise ValueError("Runner has no loggers to run, add one first")
+
+        if config.METRICS_PORT is not None:
+            server = metrics.serve(config.METRICS_PORT)
+            logging.info(f"Serving metrics on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+
+        while True:
+            boundary = min(logger_schedule.next_boundary(time.time()) for logger_schedule in self.loggers.values())
+
+            logging.info(f"{self} SLEEPING until {time.strftime('%H:%M:%S', time.localtime(boundary))}")
+            schedule.sleep_until(boundary)
+
+            due = {}
+            for logger, logger_schedule in self.loggers.items():
+                kinds = logger_schedule.due(boundary)
+
+                # NOTE: a boundary only belongs to loggers with one of their own cadences on it
+                if kinds and logger_schedule.fires_at(boundary):
+                    due[logger] = kinds
+
+            self.log(int(boundary), due)
+
+            for logger, kinds in due.items():
+                self.loggers[logger].mark(boundary, kinds)
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,80 @@
+import math
+import time
+
+"""
+Wall-clock schedule for edsm.log.Logger.run.
+
+Each kind of data ('traffic', 'stations', 'markets') has its own cadence in seconds. Updates fire on multiples
+of the cadence since the unix epoch (i.e. a cadence of 900 fires at :00, :15, :30 and :45 of every hour, 86400 at
+midnight UTC), so samples stay evenly spaced no matter how long each cycle takes.
+
+    schedule = Schedule({'traffic' : 900, 'markets' : 3600, 'stations' : 86400})
+
+    boundary = schedule.next_boundary(time.time())
+    ... wait until boundary ...
+    kinds = schedule.due(boundary)
+    ... update kinds ...
+    schedule.mark(boundary, kinds)
+"""
+
+KINDS = ('traffic', 'stations', 'markets')
+
+class Schedule():
+    """
+    arg: cadences* <dict[str, float]> - kind -> seconds between updates
+
+    method: next_boundary (now) <float> - first boundary of any kind after now
+    method: fires_at (boundary) <bool> - whether boundary is a boundary of any kind
+    method: due (boundary) <set[str]> - kinds to update at boundary
+    method: mark (boundary, kinds) <None> - records kinds as updated at boundary
+    method: missed (boundary, now) <int> - number of boundaries between boundary and now (skipped by an overrunning cycle)
+
+    NOTE: a kind is due if it has never been updated, or if one of its boundaries has passed since its last update,
+    so kinds whose boundary was skipped (because a cycle overran) are caught up at the next boundary.
+    """
+    def __init__(self, cadences:dict[str, float]):
+        for kind, cadence in cadences.items():
+            if cadence <= 0:
+                raise ValueError(f"Cadence of \'{kind}\' must be positive, got {cadence}")
+
+        self.cadences = dict(cadences)
+        self.last = {kind : None for kind in cadences}
+
+    def next_boundary(self, now:float) -> float:
+        return min((math.floor(now / cadence) + 1) * cadence for cadence in self.cadences.values())
+
+    def fires_at(self, boundary:float) -> bool:
+        return any(boundary % cadence == 0 for cadence in self.cadences.values())
+
+    def due(self, boundary:float) -> set[str]:
+        return {
+            kind for kind, cadence in self.cadences.items()
+            if self.last[kind] is None or math.floor(boundary / cadence) > math.floor(self.last[kind] / cadence)
+        }
+
+    def mark(self, boundary:float, kinds:set[str]):
+        for kind in kinds:
+            self.last[kind] = boundary
+
+    def missed(self, boundary:float, now:float) -> int:
+        count = 0
+        while True:
+            boundary = self.next_boundary(boundary)
+            if boundary > now:
+                return count
+
+            count += 1
+
+
+def sleep_until(wakeup:float):
+    """
+    arg: wakeup* <float> - unix time
+
+    NOTE: sleeps in steps, since time.sleep can wake up early and the wall clock can be adjusted while asleep
+    """
+    while True:
+        remaining = wakeup - time.time()
+        if remaining <= 0:
+            return
+
+        time.sleep(min(remaining, 60))
@@ -0,0 +1,269 @@
+import logging
+import multiprocessing
+import os
+import time
+
+from typing import Iterator
+
+import edsm.api as api
+import edsm.codec as codec
+import edsm.config as config
+import edsm.log as log
+import edsm.metrics as metrics
+import edsm.models as models
+import edsm.ratelimit as ratelimit
+
+"""
+Sharded logging, for watchlists too big for one process.
+
+<ShardedLogger> splits its systems across worker processes (system i goes to shard i % shards). Every cycle, each
+worker updates its share and projects it with the logger's keys, so fetching, JSON decoding and model building run on
+every core instead of under one GIL. Results are either:
+
+    merged - sent back to the logger and appended as one snapshot, in any format but 'columnar' and 'sqlite'
+    segments - written by each worker to its own segment file ('<filepath>.shard<n>', JSON Lines), with the logger only
+    appending a line to the merge index ('<filepath>'): {'timestamp' : <int>, 'segments' : [[path, offset, length], ...]}
+
+Segmented logs are read back (as whole snapshots) with iter_segmented.
+
+Workers share EDSM's quota, so each one gets a rate limiter with 1/shards of the rate, burst and concurrency
+(see limiter_options). Request metrics recorded in workers are merged into this process' metrics after every cycle,
+and phase durations are recorded from the slowest shard. Gauges (queue depth, busy workers, utilization) stay in
+the workers.
+"""
+
+def segment_path(filepath:str, shard:int) -> str:
+    return f'{filepath}.shard{shard}'
+
+def interleave(parts:list[list]) -> list:
+    """
+    arg: parts* <list[list]> - items of each shard, in shard order
+
+    returns <list> - items back in watchlist order (shard n holds items n, n + shards, n + 2 * shards, ...)
+    """
+    merged = [None] * sum(len(part) for part in parts)
+    for shard, part in enumerate(parts):
+        merged[shard::len(parts)] = part
+
+    return merged
+
+def limiter_options(shards:int) -> dict:
+    """
+    returns <dict> - <edsm.ratelimit.RateLimiter> arguments for one of shards processes sharing EDSM's quota
+    """
+    max_concurrency = max(config.MAX_THREADS, config.ASYNC_MAX_CONCURRENCY)
+
+    return {
+        'rate' : config.RATE_LIMIT / shards if config.RATE_LIMIT is not None else None,
+        'burst' : max(1, config.RATE_LIMIT_BURST // shards),
+        'max_concurrency' : max(1, max_concurrency // shards),
+        'share' : 1 / shards,
+    }
+
+def _work(conn, keys:dict, systems_data:list[dict], url_bases:tuple[str, str], segment:str or None, limiter:dict):
+    # NOTE: runs in a worker process. url_bases are passed along since they'd be lost with the 'spawn' start method
+    api.System.url_base, api.Systems.url_base = url_bases
+    ratelimit.set_limiter(ratelimit.RateLimiter(**limiter))
+
+    # NOTE: with the 'fork' start method, the parent's metrics come along, start from nothing
+    if metrics.get_metrics() is not None:
+        metrics.set_metrics(metrics.Metrics())
+
+    systems = models.Systems()
+    systems.populate(systems_data)
+
+    while True:
+        try:
+            message = conn.recv()
+
+        except EOFError:
+            return
+
+        if message is None:
+            return
+
+        timestamp, traffic, stations, markets = message
+
+        recorder = metrics.get_metrics()
+
+        try:
+            timings = systems.update(traffic = traffic, stations = stations, markets = markets)
+            data = systems.get_keys(keys)
+
+            if segment is not None:
+                line = (codec.dumps({'timestamp' : timestamp, 'data' : data}) + '\n').encode()
+                with open(segment, 'ab') as f:
+                    offset = f.tell()
+                    f.write(line)
+
+                data = [segment, offset, len(line)]
+
+            conn.send(('ok', timings, data, recorder.take_requests() if recorder else None))
+
+        except Exception as e:
+            requests = recorder.take_requests() if recorder else None
+
+            try:
+                conn.send(('error', e, None, requests))
+
+            except Exception:
+                # exception couldn't be pickled
+                conn.send(('error', RuntimeError(f'{type(e).__name__}: {e}'), None, requests))
+
+
+class ShardedLogger(log.Logger):
+    """
+    arg: keys* <dict[str, list[str]]> - see <edsm.log.Logger>
+    arg: shards <int> - number of worker processes (defaults to config.SHARDS)
+    arg: format <str> - see <edsm.log.Logger>. Ignored when segments is True
+    arg: segments <bool> - have workers write their own segment files instead of merging in this process
+
+    method: start <None> - starts workers with the systems in self.systems (called by log() if needed)
+    method: close <None> - stops workers. Call start() (or log()) again to pick up changes to self.systems.
+    Workers exit on their own if the logger's process dies
+
+    NOTE: workers get a copy of the watchlist and of the keys when started, and run with the config they were started
+    with (i.e. changes made to edsm.config at runtime only carry over with the 'fork' start method).
+    Each worker's rate limiter gets 1/shards of the quota (see limiter_options).
+    Snapshots are timestamped when their cycle starts (unless log() is given a timestamp).
+    """
+    def __init__(self, keys:dict[str, list[str]], shards:int = None, format:str = None, segments:bool = False):
+        super().__init__(keys, format = format)
+
+        # NOTE: these formats read from self.systems, which is only updated in the workers
+        if self.format in ('columnar', 'sqlite') and not segments:
+            raise ValueError(f"Sharded logs can't be written in \'{self.format}\' format")
+
+        self.shards = shards or config.SHARDS or os.cpu_count()
+        self.segments = segments
+
+        if segments:
+            self.filepath = f'{self}.index'
+
+        self.workers = []
+
+    def start(self):
+        self.close()
+
+        systems_data = [system.data for system in self.systems]
+        url_bases = (api.System.url_base, api.Systems.url_base)
+        limiter = limiter_options(self.shards)
+
+        for shard in range(self.shards):
+            conn, worker_conn = multiprocessing.Pipe()
+            segment = segment_path(self.filepath, shard) if self.segments else None
+
+            process = multiprocessing.Process(target = _work, daemon = True,
+                args = (worker_conn, self.keys, systems_data[shard::self.shards], url_bases, segment, limiter))
+            process.start()
+            worker_conn.close()
+
+            self.workers.append((process, conn))
+
+    def close(self):
+        for process, conn in self.workers:
+            try:
+                conn.send(None)
+
+            except (BrokenPipeError, OSError):
+                pass
+
+            conn.close()
+            process.join(timeout = 5)
+
+            if process.is_alive():
+                process.terminate()
+
+        self.workers = []
+
+    def dispatch(self, timestamp:int, kinds:set[str] = None) -> list:
+        """
+        arg: timestamp* <int>
+        arg: kinds <set[str]> - see <edsm.log.Logger>.update_by_keys
+
+        returns <list> - result of every shard, in shard order (data for merged logs, [path, offset, length] for segments)
+
+        Runs one update cycle on every worker. Raises the first error from a shard once every shard has finished
+        """
+        traffic, stations, markets = self.kinds_by_keys(kinds)
+
+        logging.info(f"Updating {self.shards} shards (traffic={traffic}, stations={stations}, markets={markets})")
+
+        for process, conn in self.workers:
+            conn.send((timestamp, traffic, stations, markets))
+
+        results = []
+        errors = []
+        timings = {}
+
+        recorder = metrics.get_metrics()
+
+        for process, conn in self.workers:
+            status, value, result, requests = conn.recv()
+
+            if recorder and requests:
+                recorder.merge_requests(requests)
+
+            if status == 'error':
+                errors.append(value)
+                continue
+
+            for phase, seconds in value.items():
+                timings[phase] = max(timings.get(phase, 0.0), seconds)
+
+            results.append(result)
+
+        if errors:
+            raise errors[0]
+
+        if recorder:
+            for phase, seconds in timings.items():
+                recorder.observe_phase(phase, seconds)
+
+        logging.info("Update timings (slowest shard): " + ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+        return results
+
+    def append_index(self, timestamp:int, segments:list[list]):
+        logging.info(f"Appending segment index to file: \'{self.filepath}\'")
+
+        with open(self.filepath, 'a') as f:
+            f.write(codec.dumps({'timestamp' : timestamp, 'segments' : segments}) + '\n')
+
+    def log(self, timestamp:int = None, kinds:set[str] = None):
+        logging.info("Beginning sharded log routine")
+
+        if not self.workers:
+            self.start()
+
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        results = self.dispatch(timestamp, kinds)
+
+        if self.segments:
+            self.append_index(timestamp, results)
+
+        else:
+            self.append([{'timestamp' : timestamp, 'data' : interleave(results)}])
+
+
+def iter_segmented(filepath:str) -> Iterator[dict]:
+    """
+    arg: filepath* <str> - merge index written by a <ShardedLogger> with segments=True
+
+    returns <Iterator[dict]> - snapshots, merged from their segments ({'timestamp' : <int>, 'data' : <list[dict]>})
+    """
+    with open(filepath, 'r') as index:
+        for line in index:
+            if not line.strip():
+                continue
+
+            entry = codec.loads(line)
+            parts = []
+
+            for path, offset, length in entry['segments']:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    parts.append(codec.loads(f.read(length))['data'])
+
+            yield {'timestamp' : entry['timestamp'], 'data' : interleave(parts)}
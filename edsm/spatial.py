@@ -0,0 +1,192 @@
+import math
+
+from array import array
+
+import edsm.config as config
+
+# NOTE: NumPy is optional, only used to compute distances for many systems at once
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+Uniform grid over system coordinates, for answering radius, nearest-k and bounding-box questions locally
+instead of asking EDSM (i.e. edsm.api.Systems.sphere_systems) again.
+
+    index = systems.spatial_index()
+    index.within(systems['Sol'], 20) # [(<System>, distance), ...], nearest first
+
+Systems without coords (see sphere_systems' showCoordinates) aren't indexed.
+"""
+
+Point = tuple[float, float, float]
+
+def coords_of(system) -> Point or None:
+    """
+    arg: system* <edsm.models.System or dict or tuple> - system, its data, a coords dict ({'x', 'y', 'z'}) or a point
+
+    returns <tuple[float, float, float] or None>
+    """
+    if isinstance(system, (tuple, list)):
+        return tuple(system)
+
+    data = system if isinstance(system, dict) else system.data
+    coords = data.get('coords', data)
+
+    try:
+        return (coords['x'], coords['y'], coords['z'])
+
+    except (KeyError, TypeError):
+        return None
+
+
+class Cell():
+    __slots__ = ('systems', 'coords')
+
+    def __init__(self):
+        self.systems = []
+        self.coords = array('d') # x, y, z of each system, flattened
+
+    def add(self, system, point:Point):
+        self.systems.append(system)
+        self.coords.extend(point)
+
+    def remove(self, system) -> bool:
+        for i, s in enumerate(self.systems):
+            if s is system:
+                del self.systems[i]
+                del self.coords[3 * i:3 * i + 3]
+                return True
+
+        return False
+
+
+class SpatialIndex():
+    """
+    arg: systems <Iterable[edsm.models.System]> - systems to index
+    arg: cell_size <float> - width of grid cells in ly (defaults to config.SPATIAL_CELL_SIZE).
+    Around the radius of typical queries works best
+
+    method: add (system) <bool> - False if system has no coords
+    method: remove (system) <bool> - False if system wasn't indexed
+    method: within (center, radius) <list[tuple[System, float]]> - systems within radius of center, nearest first
+    method: nearest (center, k) <list[tuple[System, float]]> - k systems nearest to center, nearest first
+    method: in_box (low, high) <list[System]> - systems with low <= coords <= high on every axis
+
+    center, low and high can be a <System>, a coords dict or an (x, y, z) tuple.
+    """
+    def __init__(self, systems = (), cell_size:float = None):
+        self.cell_size = cell_size or config.SPATIAL_CELL_SIZE
+        self.cells = {} # (i, j, k) -> Cell
+        self.points = {} # System -> point it's filed under
+
+        for system in systems:
+            self.add(system)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, system):
+        return system in self.points
+
+    def cell_of(self, point:Point) -> tuple[int, int, int]:
+        return tuple(math.floor(c / self.cell_size) for c in point)
+
+    def add(self, system) -> bool:
+        point = coords_of(system)
+        if point is None:
+            return False
+
+        if system in self.points:
+            self.remove(system)
+
+        self.points[system] = point
+        self.cells.setdefault(self.cell_of(point), Cell()).add(system, point)
+
+        return True
+
+    def remove(self, system) -> bool:
+        point = self.points.pop(system, None)
+        if point is None:
+            return False
+
+        key = self.cell_of(point)
+        cell = self.cells[key]
+        cell.remove(system)
+
+        if not cell.systems:
+            del self.cells[key]
+
+        return True
+
+    def _cells_between(self, low:Point, high:Point):
+        # yields cells overlapping the box between low and high
+        (i0, j0, k0), (i1, j1, k1) = self.cell_of(low), self.cell_of(high)
+
+        # NOTE: for boxes covering more cells than exist, scanning every cell is cheaper
+        if (i1 - i0 + 1) * (j1 - j0 + 1) * (k1 - k0 + 1) > len(self.cells):
+            for (i, j, k), cell in self.cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1 and k0 <= k <= k1:
+                    yield cell
+
+            return
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for k in range(k0, k1 + 1):
+                    cell = self.cells.get((i, j, k))
+                    if cell:
+                        yield cell
+
+    @staticmethod
+    def _distances(cells:list[Cell], center:Point) -> tuple[list, list[float]]:
+        # returns (systems, distances from center) for every system in cells
+        systems = [system for cell in cells for system in cell.systems]
+
+        if numpy and len(systems) > 16:
+            coords = numpy.concatenate([numpy.frombuffer(cell.coords, dtype = numpy.float64) for cell in cells])
+            distances = numpy.sqrt(((coords.reshape(-1, 3) - center) ** 2).sum(axis = 1)).tolist()
+
+        else:
+            distances = [
+                math.dist(center, cell.coords[3 * i:3 * i + 3]) for cell in cells for i in range(len(cell.systems))
+            ]
+
+        return systems, distances
+
+    def within(self, center, radius:float) -> list[tuple]:
+        center = coords_of(center)
+        low = tuple(c - radius for c in center)
+        high = tuple(c + radius for c in center)
+
+        systems, distances = self._distances(list(self._cells_between(low, high)), center)
+
+        return sorted(
+            ((system, distance) for system, distance in zip(systems, distances) if distance <= radius),
+            key = lambda result: result[1]
+        )
+
+    def nearest(self, center, k:int) -> list[tuple]:
+        center = coords_of(center)
+        k = min(k, len(self.points))
+        if k <= 0:
+            return []
+
+        # double a search radius until it holds k systems. Systems just outside the radius can be nearer
+        # than ones in the corners of the searched cells, which is why only the radius is trusted
+        radius = self.cell_size
+        while True:
+            found = self.within(center, radius)
+            if len(found) >= k:
+                return found[:k]
+
+            radius *= 2
+
+    def in_box(self, low, high) -> list:
+        low, high = coords_of(low), coords_of(high)
+
+        return [
+            system for cell in self._cells_between(low, high) for i, system in enumerate(cell.systems)
+            if all(lo <= c <= hi for lo, c, hi in zip(low, cell.coords[3 * i:3 * i + 3], high))
+        ]
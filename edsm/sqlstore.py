@@ -0,0 +1,244 @@
+import sqlite3
+
+import edsm.codec as codec
+
+from edsm.models import COMMODITIES, from_column
+
+"""
+SQLite storage for logged snapshots, for time-range queries that don't need to read the whole log.
+
+Tables (normalized, one row per system/station/commodity per snapshot where applicable):
+
+    snapshots (id, timestamp)
+    systems (id64, name, x, y, z) - latest known info, one row per system
+    traffic (snapshot_id, timestamp, id64, day, week, total, breakdown) - breakdown is a JSON object
+    stations (marketId, id64, name, type, distanceToArrival, economy, haveMarket) - latest known info, one row per station
+    commodities (id, key, name)
+    prices (snapshot_id, timestamp, marketId, commodity, buyPrice, sellPrice, stock, demand, stockBracket)
+
+traffic is indexed on (id64, timestamp) and prices on (marketId, commodity, timestamp).
+Only fresh samples are stored: traffic and prices whose last update failed are left out of a snapshot, and so are
+markets that weren't fetched again since they were last stored (i.e. carried forward, see config.INCREMENTAL_MARKETS).
+The database is in WAL mode, so readers (i.e. a <SQLiteStore> opened with readonly=True) don't block the writer.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_timestamp ON snapshots (timestamp);
+
+CREATE TABLE IF NOT EXISTS systems (
+    id64 INTEGER PRIMARY KEY,
+    name TEXT,
+    x REAL,
+    y REAL,
+    z REAL
+);
+
+CREATE TABLE IF NOT EXISTS traffic (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    timestamp INTEGER NOT NULL,
+    id64 INTEGER NOT NULL,
+    day INTEGER,
+    week INTEGER,
+    total INTEGER,
+    breakdown TEXT
+);
+CREATE INDEX IF NOT EXISTS traffic_id64_timestamp ON traffic (id64, timestamp);
+
+CREATE TABLE IF NOT EXISTS stations (
+    marketId INTEGER PRIMARY KEY,
+    id64 INTEGER,
+    name TEXT,
+    type TEXT,
+    distanceToArrival REAL,
+    economy TEXT,
+    haveMarket INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS commodities (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS prices (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    timestamp INTEGER NOT NULL,
+    marketId INTEGER NOT NULL,
+    commodity INTEGER NOT NULL REFERENCES commodities (id),
+    buyPrice INTEGER,
+    sellPrice INTEGER,
+    stock INTEGER,
+    demand INTEGER,
+    stockBracket INTEGER
+);
+CREATE INDEX IF NOT EXISTS prices_market_commodity_timestamp ON prices (marketId, commodity, timestamp);
+"""
+
+def system_id64(system) -> int or None:
+    # id64 of <edsm.models.System>, from its own data or (if it was populated without showId) its traffic
+    id64 = system.data.get('id64')
+    if id64 is None and system.traffic.dict:
+        id64 = system.traffic.dict.get('id64')
+
+    return id64
+
+
+class SQLiteStore():
+    """
+    arg: path* <str> - database file, created if it doesn't exist
+    arg: readonly <bool> - open for reading only, safe to use while another process is appending
+
+    method: append_systems (timestamp, systems, traffic, stations, markets) <int> - returns id of the new snapshot
+    method: traffic_history (id64, start, end) <list[dict]>
+    method: price_history (market_id, commodity, start, end) <list[dict]>
+    method: close <None>
+    """
+    def __init__(self, path:str, readonly:bool = False):
+        self.path = path
+        self.readonly = readonly
+
+        if readonly:
+            self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri = True, check_same_thread = False)
+
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread = False)
+
+            # NOTE: WAL keeps readers from blocking the writer (and the other way around).
+            # synchronous=NORMAL only syncs at checkpoints, a crash can lose the last cycles but not corrupt the file
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+
+        self.conn.row_factory = sqlite3.Row
+        self.commodity_ids = {} # commodity key -> commodities.id
+        self.stored_markets = {} # marketId -> <edsm.models.Market> last stored for it
+
+    def commodity_id(self, key:str, name:str = None) -> int:
+        # NOTE: caller must be in a transaction
+        commodity_id = self.commodity_ids.get(key)
+        if commodity_id is None:
+            self.conn.execute('INSERT OR IGNORE INTO commodities (key, name) VALUES (?, ?)', (key, name))
+            commodity_id = self.conn.execute('SELECT id FROM commodities WHERE key = ?', (key,)).fetchone()[0]
+            self.commodity_ids[key] = commodity_id
+
+        return commodity_id
+
+    def append_systems(self, timestamp:int, systems, traffic:bool = True, stations:bool = True, markets:bool = True) -> int:
+        """
+        arg: timestamp* <int> - unix time of snapshot
+        arg: systems* <edsm.models.Systems>
+        arg: traffic <bool> - store traffic of every system that has it (pass False if traffic wasn't updated)
+        arg: stations <bool> - store info of every station (pass False if stations weren't updated)
+        arg: markets <bool> - store prices of every station with a market (pass False if markets weren't updated)
+
+        Writes one snapshot in a single transaction, with rows for every table batched into one executemany each.
+        Systems without a known id64 (see system_id64) are left out of systems and traffic.
+        Traffic, stations and markets whose last update failed are skipped, and so are markets already stored
+        """
+        if self.readonly:
+            raise PermissionError(f"Store at \'{self.path}\' was opened read-only")
+
+        try:
+            snapshot_id, stored_markets = self.write(timestamp, systems, traffic, stations, markets)
+
+        except BaseException:
+            # commodities added in the rolled back transaction are gone
+            self.commodity_ids = {}
+            raise
+
+        self.stored_markets.update(stored_markets)
+
+        return snapshot_id
+
+    def write(self, timestamp:int, systems, traffic:bool, stations:bool, markets:bool) -> tuple[int, dict]:
+        # does the work of append_systems, returns (snapshot id, markets stored by marketId)
+        system_rows = []
+        traffic_rows = []
+        station_rows = []
+        price_rows = []
+        stored_markets = {}
+
+        with self.conn:
+            snapshot_id = self.conn.execute('INSERT INTO snapshots (timestamp) VALUES (?)', (timestamp,)).lastrowid
+
+            for system in systems:
+                id64 = system_id64(system)
+
+                if id64 is not None:
+                    coords = system.data.get('coords') or {}
+                    system_rows.append((id64, system.data.get('name'), coords.get('x'), coords.get('y'), coords.get('z')))
+
+                if traffic and id64 is not None and system.traffic.dict and system.traffic.error is None:
+                    counts = system.traffic.dict.get('traffic') or {}
+                    traffic_rows.append((
+                        snapshot_id, timestamp, id64, counts.get('day'), counts.get('week'), counts.get('total'),
+                        codec.dumps(system.traffic.dict.get('breakdown') or {}),
+                    ))
+
+                for station in system.stations.list or []:
+                    market_id = station.data.get('marketId')
+                    if market_id is None:
+                        continue
+
+                    if stations and system.stations.error is None:
+                        station_rows.append((
+                            market_id, id64, station.data.get('name'), station.data.get('type'),
+                            station.data.get('distanceToArrival'), station.data.get('economy'), station.data.get('haveMarket'),
+                        ))
+
+                    market = station.market
+                    if not (markets and market) or station.market_error is not None or self.stored_markets.get(market_id) is market:
+                        continue
+
+                    stored_markets[market_id] = market
+                    for i, commodity in enumerate(market.commodity_ids):
+                        commodity_id = self.commodity_id(COMMODITIES.keys[commodity], COMMODITIES.names[commodity])
+                        price_rows.append((
+                            snapshot_id, timestamp, market_id, commodity_id,
+                            *(from_column(column[i]) for column in (
+                                market.buy_prices, market.sell_prices, market.stock, market.demand, market.stock_brackets
+                            )),
+                        ))
+
+            self.conn.executemany('INSERT OR REPLACE INTO systems VALUES (?, ?, ?, ?, ?)', system_rows)
+            self.conn.executemany('INSERT INTO traffic VALUES (?, ?, ?, ?, ?, ?, ?)', traffic_rows)
+            self.conn.executemany('INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?, ?, ?, ?)', station_rows)
+            self.conn.executemany('INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', price_rows)
+
+        return snapshot_id, stored_markets
+
+    def traffic_history(self, id64:int, start:int = None, end:int = None) -> list[dict]:
+        """
+        returns <list[dict]> - {'timestamp', 'day', 'week', 'total', 'breakdown'} of system id64
+        for every snapshot between start and end (inclusive, unix time), oldest first
+        """
+        rows = self.conn.execute(
+            'SELECT timestamp, day, week, total, breakdown FROM traffic '
+            'WHERE id64 = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp',
+            (id64, start if start is not None else -2 ** 63, end if end is not None else 2 ** 63 - 1)
+        )
+
+        return [dict(row, breakdown = codec.loads(row['breakdown'])) for row in rows]
+
+    def price_history(self, market_id:int, commodity:str, start:int = None, end:int = None) -> list[dict]:
+        """
+        arg: commodity* <str> - commodity key (i.e. 'gold') or display name
+
+        returns <list[dict]> - {'timestamp', 'buyPrice', 'sellPrice', 'stock', 'demand', 'stockBracket'} of commodity
+        at station market_id for every snapshot between start and end (inclusive, unix time), oldest first
+        """
+        rows = self.conn.execute(
+            'SELECT timestamp, buyPrice, sellPrice, stock, demand, stockBracket FROM prices '
+            'WHERE marketId = ? AND commodity = (SELECT id FROM commodities WHERE key = ? OR name = ? COLLATE NOCASE) '
+            'AND timestamp BETWEEN ? AND ? ORDER BY timestamp',
+            (market_id, commodity, commodity, start if start is not None else -2 ** 63, end if end is not None else 2 ** 63 - 1)
+        )
+
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
@@ -1,6 +1,6 @@
 import edsm.log
 import edsm.api
-import json
+import edsm.reader
 
 # Indicate which pieces of data to capture from which EDSM API endpoints by
 # building a dict with class names as keys and model attribute names as corresponding values
@@ -26,15 +26,13 @@ logger.log()
 """***"""
 
 # Doing some stuff to the data
+# (snapshots are read one at a time, so this works on logs too big to load at once)
 MIN_TRAFFIC = 5
-with open(logger.filepath, 'r') as f:
-    datalog = json.loads(f.read())
+for item in edsm.reader.iter_snapshots(logger.filepath, fields = ['system.name', 'traffic.traffic']):
+    print(item['timestamp'])
 
-    for item in datalog:
-        print(item['timestamp'])
+    for entry in item['data']:
+        traffic_count = entry['traffic']['traffic']['day']
 
-        for entry in item['data']:
-            traffic_count = entry['traffic']['traffic']['day']
-
-            if traffic_count >= MIN_TRAFFIC:
-                print(f"\t{entry['system']['name']} : {traffic_count}")
+        if traffic_count >= MIN_TRAFFIC:
+            print(f"\t{entry['system']['name']} : {traffic_count}")
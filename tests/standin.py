@@ -0,0 +1,327 @@
+import json
+import math
+import random
+import threading
+import time
+import unittest
+import zlib
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs
+
+import edsm.api as api
+
+"""
+Local stand-in for the EDSM 'api-v1' and 'api-system-v1' endpoints.
+
+Serves synthetic payloads shaped like EDSM responses so tests (and benchmarks) can run without edsm.net.
+Responses can be slowed down, made to fail at random, and rate limited with EDSM's X-Rate-Limit-* headers.
+
+    with StandIn() as server:
+        api.System.url_base = server.url + '/api-system-v1/'
+"""
+
+def system_id64(name:str) -> int:
+    # stable fake id64 so repeated requests for a system agree
+    return zlib.crc32(name.lower().encode())
+
+def traffic(params:dict) -> dict:
+    name = params['systemName']
+    id64 = system_id64(name)
+
+    return {
+        'id' : id64 % 100000,
+        'id64' : id64,
+        'name' : name,
+        'url' : f'https://www.edsm.net/en/system/id/{id64 % 100000}/name/{name}',
+        'discovery' : {'commander' : 'Stand-in', 'date' : '2014-11-18 18:21:43'},
+        'traffic' : {'total' : id64 % 5000, 'week' : id64 % 300, 'day' : id64 % 40},
+        'breakdown' : {'Anaconda' : id64 % 7, 'Sidewinder' : id64 % 5},
+    }
+
+def stations(params:dict) -> dict:
+    name = params['systemName']
+    id64 = system_id64(name)
+
+    return {
+        'id' : id64 % 100000,
+        'id64' : id64,
+        'name' : name,
+        'url' : f'https://www.edsm.net/en/system/stations/id/{id64 % 100000}/name/{name}',
+        'stations' : [
+            {
+                'id' : id64 % 100000 * 10 + i,
+                'marketId' : id64 * 10 + i,
+                'type' : 'Coriolis Starport',
+                'name' : f'{name} Station {i}',
+                'distanceToArrival' : 100 * (i + 1),
+                'allegiance' : 'Independent',
+                'government' : 'Democracy',
+                'economy' : 'Industrial',
+                'secondEconomy' : None,
+                'haveMarket' : i != 2,
+                'haveShipyard' : False,
+                'haveOutfitting' : False,
+                'otherServices' : [],
+                'controllingFaction' : {'id' : 1, 'name' : 'Stand-in Faction'},
+                'updateTime' : {
+                    'information' : '2021-10-08 12:00:00',
+                    'market' : '2021-10-08 12:00:00',
+                    'shipyard' : None,
+                    'outfitting' : None,
+                },
+            } for i in range(3)
+        ],
+    }
+
+def market(params:dict) -> dict:
+    market_id = int(params['marketId'])
+    id64 = market_id // 10
+
+    return {
+        'id' : id64 % 100000,
+        'id64' : id64,
+        'name' : f'System {id64}',
+        'marketId' : market_id,
+        'sId' : market_id % 1000,
+        'sName' : f'Station {market_id % 10}',
+        'commodities' : [
+            {
+                'id' : commodity,
+                'name' : commodity.capitalize(),
+                'buyPrice' : (market_id + i) % 900 + 100,
+                'stock' : (market_id * (i + 1)) % 5000,
+                'sellPrice' : (market_id + i) % 900 + 80,
+                'demand' : (market_id * (i + 3)) % 3000,
+                'stockBracket' : 2,
+            } for i, commodity in enumerate(['gold', 'silver', 'tritium', 'water'])
+        ],
+    }
+
+def system(params:dict) -> dict:
+    name = params['systemName']
+    if name.startswith('Unknown'):
+        # NOTE: EDSM answers unknown names with an empty list
+        return []
+
+    id64 = system_id64(name)
+
+    return {'name' : name, 'id' : id64 % 100000, 'id64' : id64, 'coords' : {'x' : 0.0, 'y' : 0.0, 'z' : 0.0}}
+
+def systems(params:dict) -> list:
+    # names starting with 'Unknown' aren't found
+    names = params.get('systemName[]', [])
+    names = [names] if isinstance(names, str) else names
+
+    return [system({'systemName' : name}) for name in names if not name.startswith('Unknown')]
+
+def sphere_systems(params:dict) -> list:
+    center = params['systemName']
+    radius = int(params['radius'])
+
+    return [
+        dict(system({'systemName' : f'{center} {i}'}), distance = float(i)) for i in range(radius)
+    ]
+
+# spacing (in ly) of the lattice of systems served by cube_systems
+LATTICE = 20
+
+def cube_systems(params:dict) -> list:
+    # every lattice point in the cube (edges included), as a system
+    if 'systemName' in params:
+        center = (0.0, 0.0, 0.0)
+
+    else:
+        center = tuple(float(params[axis]) for axis in 'xyz')
+
+    half = float(params.get('size', 200)) / 2
+    ranges = [range(math.ceil((c - half) / LATTICE), math.floor((c + half) / LATTICE) + 1) for c in center]
+
+    return [
+        dict(system({'systemName' : f'Lattice {i} {j} {k}'}), coords = {'x' : i * LATTICE, 'y' : j * LATTICE, 'z' : k * LATTICE})
+        for i in ranges[0] for j in ranges[1] for k in ranges[2]
+    ]
+
+def recorded(filepath:str):
+    """
+    arg: filepath* <str> - file holding a response recorded from edsm.net
+
+    returns <Callable[[dict], object]> - route serving the recorded payload for any params
+    """
+    with open(filepath, 'r') as f:
+        payload = json.loads(f.read())
+
+    return lambda params: payload
+
+ROUTES = {
+    '/api-system-v1/traffic' : traffic,
+    '/api-system-v1/stations' : stations,
+    '/api-system-v1/stations/market' : market,
+    '/api-v1/system' : system,
+    '/api-v1/systems' : systems,
+    '/api-v1/sphere-systems' : sphere_systems,
+    '/api-v1/cube-systems' : cube_systems,
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = {k : v[0] if len(v) == 1 else v for k, v in parse_qs(parts.query).items()}
+
+        self.server.record(parts.path, params)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        headers = self.server.take_quota()
+        if headers and headers['X-Rate-Limit-Remaining'] < 0:
+            headers['X-Rate-Limit-Remaining'] = 0
+            self.send_response(429)
+            self.send_headers(headers)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        status = self.server.fail(parts.path, params) if self.server.fail else None
+        if not status and self.server.error_rate and random.random() < self.server.error_rate:
+            status = 500
+
+        if status:
+            self.send_error(status)
+            return
+
+        route = self.server.routes.get(parts.path)
+        if route is None:
+            self.send_error(404)
+            return
+
+        body = json.dumps(route(params)).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_headers(headers)
+
+        if self.server.chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            for i in range(0, len(body), 512):
+                chunk = body[i:i + 512]
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+
+            self.wfile.write(b'0\r\n\r\n')
+
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def send_headers(self, headers:dict):
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandIn(ThreadingHTTPServer):
+    """
+    arg: routes <dict[str, Callable[[dict], object]]> - path -> function building a payload from query params
+    arg: chunked <bool> - send bodies with chunked transfer encoding
+    arg: latency <float> - seconds to wait before answering each request
+    arg: error_rate <float> - fraction of requests (chosen at random) answered with a 500
+    arg: rate_limit <int> - requests allowed per rate_limit_window, refilled continuously.
+    Responses carry X-Rate-Limit-Limit/Remaining/Reset headers, requests over the limit get a 429
+    arg: rate_limit_window <float> - seconds
+
+    attr: fail <Callable[[str, dict], int or None] or None> - (path, params) -> error status to respond with instead, if any
+
+    attr: url <str> - base url of the running server (i.e. 'http://127.0.0.1:12345')
+    attr: requests <list[tuple[str, dict]]> - (path, params) of every request received
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, routes:dict = None, chunked:bool = False, latency:float = 0,
+        error_rate:float = 0, rate_limit:int = None, rate_limit_window:float = 3600):
+        super().__init__(('127.0.0.1', 0), Handler)
+
+        self.routes = routes if routes is not None else ROUTES
+        self.chunked = chunked
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail = None
+
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.quota = rate_limit
+        self.quota_time = time.monotonic()
+
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record(self, path, params):
+        with self.lock:
+            self.requests.append((path, params))
+
+    def take_quota(self) -> dict or None:
+        # uses up one request of the quota, returns rate limit headers (remaining is negative if over the limit)
+        if self.rate_limit is None:
+            return None
+
+        with self.lock:
+            now = time.monotonic()
+            refill = (now - self.quota_time) * self.rate_limit / self.rate_limit_window
+
+            self.quota = min(self.rate_limit, self.quota + refill) - 1
+            self.quota_time = now
+
+            if self.quota < 0:
+                # rejected requests don't count against the quota
+                self.quota += 1
+                remaining = -1
+
+            else:
+                remaining = int(self.quota)
+
+            reset = (self.rate_limit - self.quota) * self.rate_limit_window / self.rate_limit
+
+        return {
+            'X-Rate-Limit-Limit' : self.rate_limit,
+            'X-Rate-Limit-Remaining' : remaining,
+            'X-Rate-Limit-Reset' : int(reset),
+        }
+
+    def __enter__(self):
+        threading.Thread(target = self.serve_forever, args = (0.05,), daemon = True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class StandInTestCase(unittest.TestCase):
+    """
+    Runs a <StandIn> for each test, with edsm.api (and edsm.aio) pointed at it
+    """
+    chunked = False
+
+    def setUp(self):
+        self.server = StandIn(chunked = self.chunked).__enter__()
+        self.addCleanup(self.server.__exit__)
+
+        for cls, path in [(api.System, '/api-system-v1/'), (api.Systems, '/api-v1/')]:
+            patcher = mock.patch.object(cls, 'url_base', self.server.url + path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
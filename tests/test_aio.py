@@ -0,0 +1,103 @@
+import asyncio
+
+import edsm.aio as aio
+import edsm.api as api
+
+from edsm.models import Systems
+
+from tests.standin import StandInTestCase
+
+
+def run_closing(coroutine):
+    # runs coroutine, then closes the default client it used
+    async def run():
+        try:
+            return await coroutine
+
+        finally:
+            await aio.close_client()
+
+    return asyncio.run(run())
+
+
+class ClientTest(StandInTestCase):
+    def test_traffic(self):
+        d = run_closing(aio.System.traffic('Sol'))
+
+        self.assertEqual(d['name'], 'Sol')
+        self.assertIs(type(d['traffic']['day']), int)
+
+    def test_sphere_systems(self):
+        d = run_closing(aio.Systems.sphere_systems('Sol', 5))
+
+        self.assertEqual(len(d), 5)
+
+    def test_connections_are_reused(self):
+        async def run():
+            async with aio.Client(max_concurrency = 1) as client:
+                for _ in range(5):
+                    await aio.query(api.System.url_base + 'traffic', {'systemName' : 'Sol'}, client = client)
+
+                return sum(len(idle) for idle in client.pools.values())
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_close_client(self):
+        async def run():
+            client = aio.get_client()
+            await aio.System.traffic('Sol')
+            writers = [writer for idle in client.pools.values() for reader, writer in idle]
+
+            await aio.close_client()
+            return client, writers, aio.get_client()
+
+        client, writers, new_client = asyncio.run(run())
+
+        self.assertEqual(len(writers), 1)
+        self.assertTrue(all(writer.is_closing() for writer in writers))
+        self.assertEqual(client.pools, {})
+        self.assertIsNot(new_client, client)
+
+    def test_show_params(self):
+        params = api.show_params(showCoordinates = True)
+        self.assertEqual(params['showCoordinates'], 1)
+        self.assertEqual(params['showId'], 0)
+
+        self.assertEqual(set(api.show_params(showAllInfo = 1).values()), {1})
+        self.assertEqual(api.cube_params(None, 50, 1, 2, 3, {})['size'], 50)
+
+    def test_http_error(self):
+        self.assertRaises(aio.HTTPError, run_closing, aio.query(self.server.url + '/missing', {}))
+
+
+class ChunkedClientTest(StandInTestCase):
+    chunked = True
+
+    def test_stations(self):
+        d = run_closing(aio.System.stations('Sol'))
+
+        self.assertEqual(len(d['stations']), 3)
+
+
+class SystemsAsyncTest(StandInTestCase):
+    def test_updates(self):
+        systems = Systems()
+        systems.populate([{'name' : f'System {i}'} for i in range(50)])
+
+        async def run():
+            await systems.update_traffic_async()
+            await systems.update_stations_async()
+            await systems.update_stations_markets_async()
+
+        run_closing(run())
+
+        system = systems.get('System 7')
+        self.assertEqual(system.traffic.dict['name'], 'System 7')
+        self.assertEqual(len(system.stations.list), 3)
+
+        # stand-in has no market at the third station of each system
+        self.assertEqual(len(system.stations.list[0].market.commodities), 4)
+        self.assertIs(system.stations.list[2].market, None)
+
+        self.assertEqual(len(self.server.requests), 50 + 50 + 100)
@@ -0,0 +1,49 @@
+import unittest
+
+import edsm.bulk as bulk
+
+from edsm.models import Systems
+
+from tests import standin
+
+
+class ChunksTest(unittest.TestCase):
+    def test_max_names(self):
+        names = [f'System {i}' for i in range(250)]
+        result = bulk.chunks(names, max_names = 100)
+
+        self.assertEqual([len(chunk) for chunk in result], [100, 100, 50])
+        self.assertEqual(sum(result, []), names)
+
+    def test_max_length(self):
+        names = ['Sol', 'Alpha Centauri', 'Barnard\'s Star', 'Wolf 359']
+        result = bulk.chunks(names, max_names = 100, max_length = 60)
+
+        self.assertEqual(sum(result, []), names)
+        self.assertGreater(len(result), 1)
+
+    def test_long_name_gets_own_chunk(self):
+        self.assertEqual(bulk.chunks(['A' * 100, 'B'], max_length = 50), [['A' * 100], ['B']])
+
+
+class LoadTest(standin.StandInTestCase):
+    def test_iter_systems(self):
+        names = [f'System {i}' for i in range(25)]
+        found = sum(bulk.iter_systems(names), [])
+
+        self.assertCountEqual([system['name'] for system in found], names)
+
+    def test_load(self):
+        systems = Systems()
+        systems.add_system(standin.system({'systemName' : 'System 0'}))
+
+        names = [f'System {i}' for i in range(250)] + ['Unknown 1', 'system 1']
+        missing = systems.load(names)
+
+        self.assertEqual(missing, ['Unknown 1'])
+        self.assertEqual(len(systems), 250)
+        self.assertEqual(systems['System 42'].id64, standin.system_id64('System 42'))
+
+        # 251 names left to fetch, in chunks of config.BULK_MAX_NAMES
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertNotIn('System 0', self.server.requests[0][1]['systemName[]'])
@@ -0,0 +1,143 @@
+import unittest
+
+import os
+import tempfile
+import time
+
+import edsm.api as api
+import edsm.cache as cache
+
+from edsm.cache import ResponseCache
+
+TRAFFIC_URL = 'https://www.edsm.net/api-system-v1/traffic'
+STATIONS_URL = 'https://www.edsm.net/api-system-v1/stations'
+MARKET_URL = 'https://www.edsm.net/api-system-v1/stations/market'
+
+TTLS = {'traffic' : 600, 'stations' : 86400}
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_endpoint_of(self):
+        self.assertEqual(cache.endpoint_of(MARKET_URL), 'stations/market')
+        self.assertEqual(cache.endpoint_of('https://www.edsm.net/api-v1/sphere-systems'), 'sphere-systems')
+
+    def test_hit_and_miss(self):
+        c = ResponseCache(ttls = TTLS, path = '')
+
+        self.assertIs(c.get(TRAFFIC_URL, {'systemName' : 'Sol'}), None)
+        c.set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'{}')
+
+        self.assertEqual(c.get(TRAFFIC_URL, {'systemName' : 'Sol'}), b'{}')
+        self.assertIs(c.get(TRAFFIC_URL, {'systemName' : 'Alcor'}), None)
+
+        stats = c.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_uncached_endpoint(self):
+        c = ResponseCache(ttls = TTLS, path = '')
+        c.set(MARKET_URL, {'marketId' : 1}, b'{}')
+
+        self.assertIs(c.get(MARKET_URL, {'marketId' : 1}), None)
+        self.assertEqual(c.stats()['entries'], 0)
+
+    def test_expiry(self):
+        c = ResponseCache(ttls = {'traffic' : 0.01}, path = '')
+        c.set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'{}')
+        time.sleep(0.02)
+
+        self.assertIs(c.get(TRAFFIC_URL, {'systemName' : 'Sol'}), None)
+
+    def test_lru_eviction(self):
+        c = ResponseCache(ttls = TTLS, max_entries = 2, max_bytes = 100, path = '')
+
+        c.set(TRAFFIC_URL, {'systemName' : 'A'}, b'1')
+        c.set(TRAFFIC_URL, {'systemName' : 'B'}, b'2')
+        c.get(TRAFFIC_URL, {'systemName' : 'A'})
+        c.set(TRAFFIC_URL, {'systemName' : 'C'}, b'3')
+
+        self.assertIs(c.get(TRAFFIC_URL, {'systemName' : 'B'}), None)
+        self.assertEqual(c.get(TRAFFIC_URL, {'systemName' : 'A'}), b'1')
+
+        c.set(STATIONS_URL, {'systemName' : 'D'}, b'x' * 99)
+        self.assertLessEqual(c.stats()['bytes'], 100)
+        self.assertEqual(c.stats()['evictions'], 2)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as path:
+            ResponseCache(ttls = TTLS, path = path).set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'{"name": "Sol"}')
+
+            c = ResponseCache(ttls = TTLS, path = path)
+            self.assertEqual(c.get(TRAFFIC_URL, {'systemName' : 'Sol'}), b'{"name": "Sol"}')
+            self.assertEqual(c.stats()['disk_hits'], 1)
+
+    def test_clear_leaves_other_files(self):
+        with tempfile.TemporaryDirectory() as path:
+            with open(os.path.join(path, 'notes.txt'), 'w') as f:
+                f.write('not a cache entry')
+
+            c = ResponseCache(ttls = TTLS, path = path)
+            c.set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'{}')
+            c.clear()
+
+            self.assertEqual(os.listdir(path), ['notes.txt'])
+            self.assertIs(ResponseCache(ttls = TTLS, path = path).get(TRAFFIC_URL, {'systemName' : 'Sol'}), None)
+
+    def test_disk_overwrite_counted_once(self):
+        with tempfile.TemporaryDirectory() as path:
+            c = ResponseCache(ttls = TTLS, path = path)
+
+            for _ in range(3):
+                c.set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'x' * 100)
+
+            self.assertEqual(c.stats()['disk_bytes'], 8 + 100)
+
+    def test_corrupt_disk_entry(self):
+        with tempfile.TemporaryDirectory() as path:
+            c = ResponseCache(ttls = TTLS, path = path)
+
+            ResponseCache(ttls = TTLS, path = path).set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'{}')
+            filepath = os.path.join(path, os.listdir(path)[0])
+
+            # truncated in the middle of its header
+            with open(filepath, 'r+b') as f:
+                f.truncate(3)
+
+            self.assertIs(c.get(TRAFFIC_URL, {'systemName' : 'Sol'}), None)
+            self.assertEqual(os.listdir(path), [])
+
+    def test_disk_pruned_on_set(self):
+        with tempfile.TemporaryDirectory() as path:
+            c = ResponseCache(ttls = {'traffic' : 0.01, 'stations' : 86400}, path = path, max_disk_bytes = 250)
+            c.prune_interval = 0
+
+            c.set(TRAFFIC_URL, {'systemName' : 'Sol'}, b'x' * 50)
+            time.sleep(0.02)
+
+            # expired traffic entry goes first, then the oldest stations entry once over the limit
+            for name in ('A', 'B', 'C'):
+                c.set(STATIONS_URL, {'systemName' : name}, b'x' * 100)
+                time.sleep(0.01)
+
+            self.assertEqual(len(os.listdir(path)), 2)
+            self.assertLessEqual(c.stats()['disk_bytes'], 250)
+
+            c = ResponseCache(ttls = TTLS, path = path, max_entries = 0)
+            self.assertIs(c.get(STATIONS_URL, {'systemName' : 'A'}), None)
+            self.assertEqual(c.get(STATIONS_URL, {'systemName' : 'C'}), b'x' * 100)
+
+
+class QueryCacheTest(unittest.TestCase):
+    def tearDown(self):
+        cache.set_cache(None)
+
+    def test_query_hits_cache(self):
+        from tests.test_edsm import FakeSession
+
+        cache.set_cache(ResponseCache(ttls = TTLS, path = ''))
+        session = FakeSession('{"name": "Sol"}')
+
+        for _ in range(3):
+            self.assertEqual(api.query(TRAFFIC_URL, {'systemName' : 'Sol'}, session = session), {'name' : 'Sol'})
+
+        self.assertEqual(len(session.calls), 1)
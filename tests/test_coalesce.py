@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import edsm.aio as aio
+import edsm.api as api
+
+from edsm.coalesce import SingleFlight
+
+from tests import standin
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        flights = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return {'result' : 1}
+
+        with ThreadPoolExecutor(max_workers = 5) as executor:
+            leader = executor.submit(flights.do, 'key', slow)
+            started.wait()
+            followers = [executor.submit(flights.do, 'key', slow) for _ in range(4)]
+
+            results = [future.result() for future in [leader] + followers]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.coalesced, 4)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        # nothing is kept once the call is done
+        flights.do('key', slow)
+        self.assertEqual(len(calls), 2)
+
+    def test_error_is_shared(self):
+        flights = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError('failed')
+
+        with ThreadPoolExecutor(max_workers = 2) as executor:
+            leader = executor.submit(flights.do, 'key', fail)
+            started.wait()
+            follower = executor.submit(flights.do, 'key', fail)
+
+            self.assertRaises(ValueError, leader.result)
+            self.assertRaises(ValueError, follower.result)
+
+        self.assertEqual(flights.coalesced, 1)
+
+    def test_async(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'result' : 1}
+
+        async def main():
+            return await asyncio.gather(*[flights.do_async('key', slow) for _ in range(5)])
+
+        results = asyncio.run(main())
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_cancelled_leader_keeps_request(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 1
+
+        async def main():
+            leader = asyncio.ensure_future(flights.do_async('key', slow))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0)
+
+            # the leader's request is still running, so this joins it instead of starting another
+            return await flights.do_async('key', slow)
+
+        self.assertEqual(asyncio.run(main()), 1)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.coalesced, 1)
+
+
+class QueryCoalescingTest(standin.StandInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server.latency = 0.1
+
+    def test_threads(self):
+        with ThreadPoolExecutor(max_workers = 8) as executor:
+            results = list(executor.map(lambda _: api.System.traffic('Sol'), range(8)))
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(results, [standin.traffic({'systemName' : 'Sol'})] * 8)
+
+        # each caller gets its own copy
+        self.assertEqual(len({id(result) for result in results}), 8)
+
+    def test_async(self):
+        async def main():
+            try:
+                return await asyncio.gather(*[aio.System.traffic('Sol') for _ in range(8)], aio.System.traffic('Alcor'))
+
+            finally:
+                await aio.close_client()
+
+        results = asyncio.run(main())
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(results[0], standin.traffic({'systemName' : 'Sol'}))
+        self.assertIsNot(results[0], results[1])
+
+    def test_disabled(self):
+        with mock.patch('edsm.config.COALESCE_REQUESTS', False), ThreadPoolExecutor(max_workers = 4) as executor:
+            list(executor.map(lambda _: api.System.traffic('Sol'), range(4)))
+
+        self.assertEqual(len(self.server.requests), 4)
@@ -0,0 +1,34 @@
+import unittest
+
+from unittest import mock
+
+from edsm import codec
+
+from tests import standin
+
+PAYLOAD = standin.stations({'systemName' : 'Sol'})
+
+
+class CodecTest(unittest.TestCase):
+    def test_backends_round_trip(self):
+        for name in codec.available():
+            c = codec.get_codec(name)
+
+            self.assertEqual(c.loads(c.dumps(PAYLOAD).encode()), PAYLOAD)
+            self.assertEqual(c.loads(c.dumps(PAYLOAD, indent = 2)), PAYLOAD)
+
+    def test_stdlib_always_available(self):
+        self.assertEqual(codec.available()[-1], 'json')
+
+    def test_auto(self):
+        with mock.patch('edsm.config.JSON_CODEC', 'auto'):
+            self.assertEqual(codec.get_codec().name, codec.available()[0])
+
+        with mock.patch('edsm.config.JSON_CODEC', 'json'):
+            self.assertIsInstance(codec.get_codec(), codec.StdlibCodec)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, codec.get_codec, 'yaml')
+
+    def test_base_is_abstract(self):
+        self.assertRaises(TypeError, codec.Codec)
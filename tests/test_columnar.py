@@ -0,0 +1,78 @@
+import unittest
+
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from edsm.columnar import MISSING, TrafficStore
+from edsm.models import Systems
+
+from tests import standin
+
+
+class TrafficStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = tmp.name
+
+    def test_append_and_read(self):
+        store = TrafficStore(self.path)
+        store.append(100, [standin.traffic({'systemName' : 'Sol'}), standin.traffic({'systemName' : 'Alcor'})])
+        store.append(200, [{'id64' : 1, 'traffic' : {'day' : 5, 'week' : 6, 'total' : 7}, 'breakdown' : {'Python' : 3}}])
+
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store.column('timestamp')), [100, 100, 200])
+        self.assertEqual(list(store.column('day'))[2], 5)
+
+        # new ship type back-filled as missing, and ship types left out of a breakdown are missing too
+        self.assertEqual(list(store.column('breakdown:Python')), [MISSING, MISSING, 3])
+        self.assertEqual(list(store.column('breakdown:Anaconda'))[2], MISSING)
+
+    def test_missing_values(self):
+        store = TrafficStore(self.path)
+        store.append(100, [{'id64' : 1, 'traffic' : {'day' : 0, 'week' : None, 'total' : 2}, 'breakdown' : {'Python' : 0}}])
+
+        self.assertEqual(list(store.column('day')), [0])
+        self.assertEqual(list(store.column('week')), [MISSING])
+        self.assertEqual(list(store.column('breakdown:Python')), [0])
+
+    def test_reopen(self):
+        TrafficStore(self.path).append(100, [standin.traffic({'systemName' : 'Sol'})])
+
+        store = TrafficStore(self.path, readonly = True)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(list(store.column('id64')), [standin.system_id64('Sol')])
+        self.assertIn('breakdown:Anaconda', store.columns)
+        self.assertRaises(PermissionError, store.append, 200, [{'id64' : 1}])
+
+    def test_empty_breakdown(self):
+        # EDSM sends an empty array rather than an empty object when there's no breakdown
+        store = TrafficStore(self.path)
+        store.append(100, [{'id64' : 1, 'traffic' : {'day' : 0, 'week' : 0, 'total' : 0}, 'breakdown' : []}])
+
+        self.assertEqual(store.columns, ['timestamp', 'id64', 'day', 'week', 'total'])
+
+    def test_append_systems(self):
+        systems = Systems()
+        systems.populate([{'name' : 'Sol'}, {'name' : 'Alcor'}])
+        systems['Sol'].traffic.dict = standin.traffic({'systemName' : 'Sol'})
+
+        store = TrafficStore(self.path)
+        store.append_systems(100, systems)
+
+        self.assertEqual(len(store), 1)
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_to_numpy(self):
+        store = TrafficStore(self.path)
+        self.assertEqual(len(store.to_numpy(['day'])['day']), 0)
+
+        store.append(100, [standin.traffic({'systemName' : 'Sol'}), standin.traffic({'systemName' : 'Alcor'})])
+        arrays = store.to_numpy(['timestamp', 'day'])
+
+        self.assertEqual(arrays['timestamp'].tolist(), [100, 100])
+        self.assertEqual(arrays['day'].tolist(), list(store.column('day')))
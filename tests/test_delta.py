@@ -0,0 +1,68 @@
+import unittest
+
+import copy
+import os
+import tempfile
+
+from edsm import delta
+from edsm import reader
+from edsm.log import Logger
+
+from tests import standin
+
+
+def snapshot(timestamp):
+    market = standin.market({'marketId' : 1230})['commodities']
+    market[0]['stock'] += timestamp
+    if timestamp % 3 == 0:
+        market.pop()
+
+    return {'timestamp' : timestamp, 'data' : [
+        {'system' : {'name' : 'Sol'}, 'stations' : [
+            {'name' : 'Abraham Lincoln', 'marketId' : 1230, 'market' : market},
+            {'name' : 'Daedalus', 'market' : None},
+        ]},
+    ]}
+
+SNAPSHOTS = [snapshot(t) for t in range(1, 11)]
+
+
+class DeltaTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'log.delta')
+
+    def test_round_trip(self):
+        encoder = delta.MarketDeltaEncoder(keyframe_interval = 4)
+        decoder = delta.MarketDeltaDecoder()
+
+        originals = copy.deepcopy(SNAPSHOTS)
+        records = [encoder.encode(s) for s in SNAPSHOTS]
+
+        self.assertEqual([bool(r.get('keyframe')) for r in records[:5]], [True, False, False, False, True])
+        self.assertEqual(records[1]['data'][0]['stations'][0]['market']['delta']['changed'], {'gold' : {'stock' : SNAPSHOTS[1]['data'][0]['stations'][0]['market'][0]['stock']}})
+
+        self.assertEqual([decoder.decode(r) for r in records], SNAPSHOTS)
+
+        # encoding shouldn't modify snapshots
+        self.assertEqual(SNAPSHOTS, originals)
+
+    def test_log_and_read(self):
+        logger = Logger({'stations' : ['name', 'marketId', 'market']}, format = 'delta')
+        logger.filepath = self.path
+        logger.delta_encoder = delta.MarketDeltaEncoder(keyframe_interval = 4)
+
+        for s in SNAPSHOTS:
+            logger.append([s])
+
+        self.assertEqual([t for t, offset in delta.read_index(self.path)], [1, 5, 9])
+        self.assertEqual(list(reader.iter_raw(self.path)), SNAPSHOTS)
+        self.assertEqual(list(reader.iter_snapshots(self.path, start = 6, end = 7)), SNAPSHOTS[5:7])
+
+    def test_read_snapshot(self):
+        delta.append(self.path, delta.MarketDeltaEncoder(keyframe_interval = 4), SNAPSHOTS)
+
+        self.assertEqual(delta.read_snapshot(self.path, 7), SNAPSHOTS[6])
+        self.assertEqual(delta.read_snapshot(self.path, 100), SNAPSHOTS[-1])
+        self.assertIs(delta.read_snapshot(self.path, 0), None)
@@ -1,8 +1,88 @@
 import unittest
 
+import edsm.api as api
+import edsm.ratelimit as ratelimit
+
 from edsm.api import System
 from edsm.api import Systems
 
+
+class FakeResponse():
+    def __init__(self, text, status_code = 200, headers = None):
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise api.requests.HTTPError(f"{self.status_code} Error")
+
+
+class FakeSession():
+    def __init__(self, text = '{}'):
+        self.text = text
+        self.calls = []
+
+    def get(self, url, params = None, headers = None, **kwargs):
+        self.calls.append((url, params, headers))
+        return FakeResponse(self.text)
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        ratelimit.set_limiter(ratelimit.RateLimiter())
+
+    def tearDown(self):
+        api.set_session(None)
+        ratelimit.set_limiter(None)
+
+    def test_shared_session_is_reused(self):
+        api.set_session(None)
+        self.assertIs(api.get_session(), api.get_session())
+
+    def test_pool_size(self):
+        session = api.new_session(pool_size = 7)
+        adapter = session.get_adapter('https://www.edsm.net/')
+
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+    def test_set_session(self):
+        fake = FakeSession('{"name": "Sol"}')
+        api.set_session(fake)
+
+        self.assertEqual(System.traffic('Sol'), {'name' : 'Sol'})
+        self.assertEqual(fake.calls[0][0], System.url_base + 'traffic')
+        self.assertEqual(fake.calls[0][1], {'systemName' : 'Sol'})
+
+    def test_query_session_arg(self):
+        fake = FakeSession('[]')
+
+        self.assertEqual(api.query('http://localhost/', {}, session = fake), [])
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_query_raises_http_error(self):
+        class ErrorSession(FakeSession):
+            def get(self, url, params = None, headers = None, **kwargs):
+                return FakeResponse('', status_code = 500)
+
+        self.assertRaises(api.requests.HTTPError, api.query, 'http://localhost/', {}, session = ErrorSession())
+
+    def test_query_retries_after_429(self):
+        class ThrottledSession(FakeSession):
+            def get(self, url, params = None, headers = None, **kwargs):
+                self.calls.append(url)
+                if len(self.calls) == 1:
+                    return FakeResponse('', status_code = 429, headers = {'Retry-After' : '0'})
+
+                return FakeResponse('{}')
+
+        session = ThrottledSession()
+
+        self.assertEqual(api.query('http://localhost/', {}, session = session), {})
+        self.assertEqual(len(session.calls), 2)
+
+
 class SystemTest(unittest.TestCase):
     def test_traffic_Wawawa(self):
         # as of writing this, there are no systems in the game named 'Wawawa', 
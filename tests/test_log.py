@@ -0,0 +1,106 @@
+import unittest
+
+import json
+import os
+import tempfile
+
+from unittest import mock
+
+from edsm.log import Logger
+from edsm.log import convert_json_to_jsonl
+
+KEYS = {'system' : ['name']}
+
+SNAPSHOTS = [
+    {'timestamp' : 1, 'data' : [{'system' : {'name' : 'Sol'}}]},
+    {'timestamp' : 2, 'data' : [{'system' : {'name' : 'Alcor'}}]},
+]
+
+
+class LoggerTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+
+class AppendTest(LoggerTestCase):
+    def test_append_json(self):
+        logger = Logger(KEYS, format = 'json')
+        logger.filepath = self.path('log.json')
+
+        logger.append(SNAPSHOTS[:1])
+        logger.append(SNAPSHOTS[1:])
+
+        with open(logger.filepath) as f:
+            self.assertEqual(json.loads(f.read()), SNAPSHOTS)
+
+    def test_append_jsonl(self):
+        logger = Logger(KEYS, format = 'jsonl')
+        logger.filepath = self.path('log.jsonl')
+        logger.fsync_policy = 'always'
+
+        logger.append(SNAPSHOTS[:1])
+        logger.append(SNAPSHOTS[1:])
+
+        with open(logger.filepath) as f:
+            self.assertEqual([json.loads(line) for line in f], SNAPSHOTS)
+
+    def test_append_columnar_only_with_traffic(self):
+        logger = Logger({'system' : ['name'], 'traffic' : ['traffic']}, format = 'columnar')
+        logger.filepath = self.path('traffic')
+        logger.systems.populate([{'name' : 'Sol', 'id64' : 1}])
+        logger.systems['Sol'].traffic.dict = {'id64' : 1, 'traffic' : {'day' : 1, 'week' : 2, 'total' : 3}, 'breakdown' : {}}
+
+        logger.append(SNAPSHOTS[:1], {'traffic', 'stations'})
+        logger.append(SNAPSHOTS[1:], {'stations'})
+
+        self.assertEqual(len(logger.traffic_store), 1)
+
+    def test_fsync_interval(self):
+        logger = Logger(KEYS, format = 'jsonl')
+        logger.fsync_policy = 3600
+
+        self.assertFalse(logger.should_fsync())
+
+        logger.last_fsync -= 3600
+        self.assertTrue(logger.should_fsync())
+
+    def test_bad_fsync_policy(self):
+        with mock.patch('edsm.config.FSYNC_POLICY', 'sometimes'):
+            self.assertRaisesRegex(ValueError, 'FSYNC_POLICY', Logger, KEYS)
+
+        with mock.patch('edsm.config.FSYNC_POLICY', 60):
+            self.assertEqual(Logger(KEYS).fsync_policy, 60)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, Logger, KEYS, format = 'xml')
+
+    def test_convert_json_to_jsonl(self):
+        with open(self.path('log.json'), 'w') as f:
+            f.write(json.dumps(SNAPSHOTS))
+
+        convert_json_to_jsonl(self.path('log.json'), self.path('log.jsonl'))
+
+        with open(self.path('log.jsonl')) as f:
+            self.assertEqual([json.loads(line) for line in f], SNAPSHOTS)
+
+
+class RunTest(LoggerTestCase):
+    def test_logs_at_startup(self):
+        logger = Logger(KEYS, format = 'jsonl')
+        logged = []
+
+        class Stop(Exception):
+            pass
+
+        with mock.patch.object(logger, 'log', side_effect = lambda **kwargs: logged.append(kwargs)), \
+            mock.patch.object(logger, 'sleep_until', side_effect = Stop):
+            self.assertRaises(Stop, logger.run, cadences = {'traffic' : 900, 'stations' : 3600})
+
+        # logged once with every kind before sleeping until the first boundary
+        self.assertEqual(len(logged), 1)
+        self.assertEqual(logged[0]['kinds'], {'traffic', 'stations'})
@@ -0,0 +1,93 @@
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+
+import edsm.api as api
+import edsm.metrics as metrics
+import edsm.models as models
+import edsm.ratelimit as ratelimit
+
+from tests import standin
+
+
+class HistogramTest(unittest.TestCase):
+    def test_cumulative_buckets(self):
+        histogram = metrics.Histogram(buckets = (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], {0.1 : 2, 1 : 3, float('inf') : 4})
+        self.assertEqual(snapshot['count'], 4)
+        self.assertAlmostEqual(snapshot['sum'], 5.65)
+
+    def test_merge(self):
+        a, b = metrics.Histogram(buckets = (0.1, 1)), metrics.Histogram(buckets = (0.1, 1))
+        a.observe(0.05)
+        b.observe(5)
+        a.merge(b)
+
+        self.assertEqual(a.snapshot()['buckets'], {0.1 : 1, 1 : 1, float('inf') : 2})
+        self.assertRaises(ValueError, a.merge, metrics.Histogram(buckets = (1,)))
+
+
+class MetricsTest(standin.StandInTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.metrics = metrics.Metrics()
+        old_metrics = metrics.set_metrics(self.metrics)
+        self.addCleanup(metrics.set_metrics, old_metrics)
+
+        old_limiter = ratelimit.set_limiter(ratelimit.RateLimiter(rate = None))
+        self.addCleanup(ratelimit.set_limiter, old_limiter)
+
+    def test_requests_per_endpoint_and_status(self):
+        api.System.traffic('Sol')
+        api.System.traffic('Alcor')
+
+        self.server.fail = lambda path, params: 404 if path.endswith('stations') else None
+        self.assertRaises(requests.HTTPError, api.System.stations, 'Sol')
+
+        requests_snapshot = self.metrics.snapshot()['requests']
+        self.assertEqual(requests_snapshot['traffic'][200]['count'], 2)
+        self.assertGreater(requests_snapshot['traffic'][200]['bytes'], 0)
+        self.assertEqual(requests_snapshot['traffic'][200]['latency']['count'], 2)
+        self.assertEqual(requests_snapshot['stations'][404]['count'], 1)
+
+    def test_update_cycle(self):
+        systems = models.Systems()
+        systems.populate([standin.system({'systemName' : f'Test {i}'}) for i in range(5)])
+
+        with ThreadPoolExecutor(max_workers = 2) as executor:
+            systems.update(traffic = True, stations = True, markets = True, executor = executor)
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(set(snapshot['phases']), {'traffic', 'stations', 'markets', 'total'})
+        self.assertEqual(snapshot['phases']['total']['duration']['count'], 1)
+        self.assertEqual(snapshot['gauges']['queue_depth'], 0)
+        self.assertEqual(snapshot['gauges']['busy_workers'], 0)
+        self.assertGreater(snapshot['gauges']['executor_utilization'], 0)
+
+    def test_prometheus_endpoint(self):
+        api.System.traffic('Sol')
+
+        server = metrics.serve(port = 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        host, port = server.server_address[:2]
+        text = requests.get(f'http://{host}:{port}/metrics').text
+
+        self.assertIn('edsm_requests_total{endpoint="traffic",status="200"} 1', text)
+        self.assertIn('edsm_request_duration_seconds_bucket{endpoint="traffic",status="200",le="+Inf"} 1', text)
+
+    def test_disabled(self):
+        metrics.set_metrics(None)
+
+        with mock.patch('edsm.config.METRICS_ENABLED', False):
+            self.assertIsNone(metrics.get_metrics())
+            api.System.traffic('Sol')
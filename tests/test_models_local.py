@@ -0,0 +1,317 @@
+import unittest
+
+from unittest import mock
+
+from edsm.models import Systems
+from edsm.models import System
+from edsm.models import Stations
+from edsm.models import Market
+
+import edsm.api as api
+import edsm.models as models
+
+from tests import standin
+from tests.standin import StandInTestCase
+
+# NOTE: model tests that run offline (locally or against tests/standin). Kept out of tests/test_models.py,
+# whose tests need edsm.net and the sample file it loads when the module is imported
+
+class SystemsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.systems = Systems()
+        self.systems.populate([standin.system({'systemName' : f'System {i}'}) for i in range(100)])
+
+    def test_get_case_insensitive(self):
+        self.assertEqual(self.systems.get('system 7').name, 'System 7')
+        self.assertEqual(self.systems['SYSTEM 7'].name, 'System 7')
+        self.assertIn('system 7', self.systems)
+
+    def test_get_by_id(self):
+        data = standin.system({'systemName' : 'System 7'})
+
+        self.assertIs(self.systems.get_by_id(data['id']), self.systems['System 7'])
+        self.assertIs(self.systems.get_by_id64(data['id64']), self.systems['System 7'])
+
+    def test_remove(self):
+        id64 = self.systems['System 7'].id64
+        self.systems.remove('system 7')
+
+        self.assertIs(self.systems.get('System 7'), None)
+        self.assertIs(self.systems.get_by_id64(id64), None)
+        self.assertEqual(len(self.systems), 99)
+        self.assertNotIn('System 7', [system.name for system in self.systems.list])
+
+        # removing a missing system is a no-op
+        self.systems.remove('System 7')
+        self.assertRaises(KeyError, self.systems.__delitem__, 'System 7')
+
+    def test_order_kept(self):
+        self.systems.remove('System 0')
+        self.systems.add_system({'name' : 'System 0'})
+
+        self.assertEqual(self.systems.list[0].name, 'System 1')
+        self.assertEqual(self.systems.list[-1].name, 'System 0')
+
+    def test_list_is_read_only(self):
+        self.assertRaises(AttributeError, getattr, self.systems.list, 'append')
+
+        systems = self.systems.to_list()
+        systems.pop()
+        self.assertEqual(len(self.systems), 100)
+        self.assertEqual(len(systems), 99)
+
+    def test_duplicate_names(self):
+        systems = Systems()
+        systems.populate([{'name' : 'Dup', 'id' : 1}, {'name' : 'dup', 'id' : 2}, {'name' : 'Dup', 'id' : 3}])
+
+        self.assertEqual(systems.get('Dup').id, 1)
+
+        # the next system added under the name takes over once the first is removed
+        systems.remove('Dup')
+        self.assertEqual(len(systems), 2)
+        self.assertEqual(systems.get('Dup').id, 2)
+
+        systems.discard(systems.get_by_id(3))
+        systems.remove('Dup')
+        self.assertEqual(len(systems), 0)
+        self.assertIs(systems.get('Dup'), None)
+        self.assertEqual(systems.shadowed, {})
+
+
+class SystemTest(unittest.TestCase):
+    def test_attrs_from_data(self):
+        data = standin.system({'systemName' : 'Sol'})
+        system = System(data)
+
+        self.assertIs(system.data, data)
+        self.assertEqual(system.name, 'Sol')
+        self.assertEqual(system.coords, data['coords'])
+        self.assertRaises(AttributeError, getattr, system, 'primaryStar')
+        self.assertFalse(hasattr(system, '__dict__'))
+
+    def test_lazy_children(self):
+        system = System({'name' : 'Sol'})
+
+        self.assertIs(system._traffic, None)
+        self.assertIs(system._stations, None)
+
+        self.assertIs(system.traffic, system.traffic)
+        self.assertEqual(system.stations.system_name, 'Sol')
+
+    def test_station_dump(self):
+        stations = Stations('Sol')
+        stations.set_list(standin.stations({'systemName' : 'Sol'})['stations'])
+        station = stations.list[0]
+        station.market = Market(standin.market({'marketId' : station.marketId}))
+
+        dump = station.json_dump()
+        self.assertEqual(dump['market'], station.market.commodities)
+        self.assertNotIn('market', station.data)
+
+        self.assertEqual(station.get_keys(['name', 'market']), {'name' : dump['name'], 'market' : dump['market']})
+
+
+class StationsIndexTest(unittest.TestCase):
+    def test_indexes(self):
+        stations = Stations('Sol')
+        stations.set_list(standin.stations({'systemName' : 'Sol'})['stations'])
+
+        station = stations['Sol Station 1']
+        self.assertIs(stations.get_by_market_id(station.marketId), station)
+        self.assertRaises(KeyError, stations.__getitem__, 'Nowhere')
+
+
+class SystemsUpdateTest(StandInTestCase):
+    def test_pipelined_update(self):
+        systems = Systems()
+        systems.populate([{'name' : f'System {i}'} for i in range(20)])
+
+        timings = systems.update(traffic = True, stations = True, markets = True)
+
+        self.assertEqual(set(timings), {'traffic', 'stations', 'markets', 'total'})
+        self.assertGreaterEqual(timings['total'], timings['markets'])
+
+        system = systems['System 3']
+        self.assertEqual(system.traffic.dict['name'], 'System 3')
+        self.assertEqual(len(system.stations['System 3 Station 0'].market.commodities), 4)
+
+        self.assertEqual(len(self.server.requests), 20 + 20 + 40)
+
+    def test_stations_only(self):
+        systems = Systems()
+        systems.populate([{'name' : 'Sol'}])
+
+        timings = systems.update(stations = True)
+
+        self.assertNotIn('markets', timings)
+        self.assertIs(systems['Sol'].stations.list[0].market, None)
+
+    def test_transient_errors_retried(self):
+        failed = set()
+
+        def fail_once(path, params):
+            if path.endswith('traffic') and params['systemName'] not in failed:
+                failed.add(params['systemName'])
+                return 503
+
+        self.server.fail = fail_once
+
+        systems = Systems()
+        systems.populate([{'name' : f'System {i}'} for i in range(5)])
+
+        with mock.patch('edsm.config.RETRY_BACKOFF', 0):
+            systems.update(traffic = True)
+
+        self.assertEqual(len(self.server.requests), 10)
+        self.assertEqual(systems.get_keys({'traffic' : ['traffic']})[0].get('errors'), None)
+
+    def test_partial_failure(self):
+        systems = Systems()
+        systems.populate([{'name' : f'System {i}'} for i in range(40)])
+        systems.update(stations = True, markets = True)
+
+        # stale values should be kept for failed markets
+        self.server.fail = lambda path, params: 500 if params.get('marketId') == str(systems['System 1'].stations.list[0].marketId) else None
+
+        with mock.patch('edsm.config.RETRY_BACKOFF', 0), mock.patch('edsm.config.INCREMENTAL_MARKETS', False):
+            systems.update(stations = True, markets = True)
+
+        payload = systems.get_keys({'stations' : ['name', 'market']})
+
+        self.assertEqual(list(payload[1]['errors']['markets']), ['System 1 Station 0'])
+        self.assertEqual(len(payload[1]['stations'][0]['market']), 4)
+        self.assertNotIn('errors', payload[0])
+
+    def test_error_budget_exceeded(self):
+        self.server.fail = lambda path, params: 404
+
+        systems = Systems()
+        systems.populate([{'name' : f'System {i}'} for i in range(5)])
+
+        self.assertRaises(api.requests.HTTPError, systems.update, traffic = True)
+
+        # 404s aren't transient, so they aren't retried
+        self.assertEqual(len(self.server.requests), 5)
+
+
+class IncrementalMarketTest(StandInTestCase):
+    def market_requests(self):
+        return [params['marketId'] for path, params in self.server.requests if path.endswith('market')]
+
+    def test_unchanged_markets_are_carried_forward(self):
+        systems = Systems()
+        systems.populate([{'name' : 'Sol'}])
+
+        systems.update(stations = True, markets = True)
+        market = systems['Sol'].stations.list[0].market
+        self.assertEqual(len(self.market_requests()), 2)
+
+        systems.update(stations = True, markets = True)
+        self.assertEqual(len(self.market_requests()), 2)
+        self.assertIs(systems['Sol'].stations.list[0].market, market)
+
+    def test_changed_market_is_fetched(self):
+        systems = Systems()
+        systems.populate([{'name' : 'Sol'}])
+        systems.update(stations = True, markets = True)
+
+        def stations(params):
+            data = standin.stations(params)
+            data['stations'][1]['updateTime']['market'] = '2021-10-09 08:00:00'
+            return data
+
+        self.server.routes = dict(standin.ROUTES, **{'/api-system-v1/stations' : stations})
+        systems.update(stations = True, markets = True)
+
+        station = systems['Sol'].stations.list[1]
+        self.assertEqual(self.market_requests()[2:], [str(station.marketId)])
+        self.assertEqual(station.market_time, '2021-10-09 08:00:00')
+
+        systems['Sol'].stations.list[0].update_market(force = True)
+        self.assertEqual(len(self.market_requests()), 4)
+
+
+class MarketTest(unittest.TestCase):
+    def test_commodities_round_trip(self):
+        data = standin.market({'marketId' : 1230})
+        market = Market(data)
+
+        self.assertEqual(market.commodities, data['commodities'])
+        self.assertEqual(market.marketId, 1230)
+        self.assertEqual(len(market), 4)
+
+    def test_nulls_round_trip(self):
+        data = standin.market({'marketId' : 1230})
+        data['commodities'][0].update(buyPrice = None, stock = None, stockBracket = None)
+        del data['commodities'][1]['demand']
+
+        commodities = Market(data).commodities
+
+        self.assertEqual(commodities[0], dict(data['commodities'][0]))
+        self.assertIs(commodities[1]['demand'], None)
+        self.assertEqual(commodities[1]['sellPrice'], data['commodities'][1]['sellPrice'])
+
+
+class MarketIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.systems = Systems()
+        self.systems.populate([{'name' : f'System {i}'} for i in range(10)])
+
+        for system in self.systems:
+            system.stations.set_list(standin.stations({'systemName' : system.name})['stations'])
+            for station in system.stations.list:
+                if station.haveMarket:
+                    station.market = Market(standin.market({'marketId' : station.marketId}))
+
+        self.markets = [station.market for system in self.systems for station in system.stations.list if station.market]
+
+    def check_queries(self):
+        index = self.systems.market_index()
+        gold = [market.commodities[0] for market in self.markets]
+
+        system, station, price = index.best_sell('Gold')
+        self.assertEqual(price, max(c['sellPrice'] for c in gold if c['sellPrice'] is not None))
+        self.assertEqual(station.market.commodities[0]['sellPrice'], price)
+
+        system, station, price = index.best_buy('gold')
+        self.assertEqual(price, min(c['buyPrice'] for c in gold if c['stock'] and c['buyPrice']))
+        self.assertEqual(station.market.commodities[0]['buyPrice'], price)
+
+        self.assertEqual(len(index.stocked('gold', 2000)), len([c for c in gold if (c['stock'] or 0) > 2000]))
+        self.assertEqual(len(index.demanded('gold')), len([c for c in gold if (c['demand'] or 0) > 0]))
+        self.assertEqual(index.stocked('unobtainium', 0), [])
+        self.assertIs(index.best_sell('unobtainium'), None)
+
+    def null_best_prices(self):
+        # nulls the gold prices that would otherwise win, so queries have to skip them
+        index = self.systems.market_index()
+
+        for query, field in ((index.best_sell, 'sell_prices'), (index.best_buy, 'buy_prices')):
+            system, station, price = query('gold')
+            getattr(station.market, field)[0] = models.MISSING
+
+    def test_queries(self):
+        self.check_queries()
+
+        self.null_best_prices()
+        self.check_queries()
+
+    def test_queries_without_numpy(self):
+        with mock.patch.object(models, 'numpy', None):
+            self.check_queries()
+
+            self.null_best_prices()
+            self.check_queries()
+
+    @unittest.skipIf(models.numpy is None, "NumPy isn't installed")
+    def test_numpy_matches_fallback(self):
+        self.null_best_prices()
+        index = self.systems.market_index()
+
+        for commodity in ('gold', 'silver', 'water'):
+            results = [index.best_sell(commodity), index.best_buy(commodity), index.stocked(commodity, 1000)]
+
+            with mock.patch.object(models, 'numpy', None):
+                fallback = [index.best_sell(commodity), index.best_buy(commodity), index.stocked(commodity, 1000)]
+
+            self.assertEqual(results, fallback)
@@ -0,0 +1,146 @@
+import asyncio
+import unittest
+
+import requests
+
+from edsm.ratelimit import RateLimiter
+
+from tests import standin
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_unlimited_until_headers(self):
+        limiter = RateLimiter(rate = None, burst = 2)
+
+        for _ in range(10):
+            self.assertEqual(limiter.reserve(), 0.0)
+
+    def test_headers_set_rate(self):
+        limiter = RateLimiter(rate = None, burst = 20)
+        limiter.update(200, {'X-Rate-Limit-Limit' : '360', 'X-Rate-Limit-Remaining' : '100', 'X-Rate-Limit-Reset' : '50'})
+
+        state = limiter.state()
+        self.assertEqual(state['rate'], 2.0)
+        self.assertEqual(state['limit'], 360.0)
+        self.assertEqual(state['remaining'], 100.0)
+
+    def test_queued_delay(self):
+        limiter = RateLimiter(rate = 10, burst = 1)
+
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertAlmostEqual(limiter.reserve(), 0.1, places = 2)
+        self.assertAlmostEqual(limiter.reserve(), 0.2, places = 2)
+
+    def test_429_backs_off(self):
+        limiter = RateLimiter(rate = None, burst = 5, max_concurrency = 8)
+        limiter.update(429, {'Retry-After' : '30'})
+
+        state = limiter.state()
+        self.assertEqual(state['concurrency'], 4)
+        self.assertEqual(state['throttled'], 1)
+        self.assertGreater(state['blocked_for'], 29)
+        self.assertGreater(limiter.reserve(), 29)
+
+        limiter.update(200, {})
+        self.assertEqual(limiter.state()['concurrency'], 5)
+
+    def test_concurrency_cap(self):
+        limiter = RateLimiter(rate = None, max_concurrency = 1)
+
+        limiter.acquire()
+        self.assertEqual(limiter.state()['in_flight'], 1)
+
+        async def acquire_async():
+            await asyncio.wait_for(limiter.acquire_async(), 0.1)
+
+        self.assertRaises(asyncio.TimeoutError, asyncio.run, acquire_async())
+
+        limiter.release()
+        asyncio.run(acquire_async())
+        self.assertEqual(limiter.state()['in_flight'], 1)
+
+    def test_waiters_woken_by_release(self):
+        limiter = RateLimiter(rate = None, max_concurrency = 2)
+
+        async def run():
+            order = []
+
+            async def task(i):
+                await limiter.acquire_async()
+                order.append(i)
+                await asyncio.sleep(0)
+                limiter.release()
+
+            tasks = [asyncio.ensure_future(task(i)) for i in range(50)]
+            await asyncio.sleep(0)
+
+            # every task past the first two is parked on a future, not polling
+            self.assertEqual(limiter.state()['waiting'], 48)
+
+            await asyncio.wait_for(asyncio.gather(*tasks), 5)
+            return order
+
+        self.assertEqual(asyncio.run(run()), list(range(50)))
+
+        state = limiter.state()
+        self.assertEqual(state['in_flight'], 0)
+        self.assertEqual(state['waiting'], 0)
+
+    def test_cancelled_waiter_frees_slot(self):
+        limiter = RateLimiter(rate = None, max_concurrency = 1)
+
+        async def run():
+            await limiter.acquire_async()
+
+            waiter = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0)
+
+            # granted a slot on release, but cancelled before it could run
+            limiter.release()
+            waiter.cancel()
+            await asyncio.sleep(0)
+
+            await asyncio.wait_for(limiter.acquire_async(), 1)
+
+        asyncio.run(run())
+        self.assertEqual(limiter.state()['in_flight'], 1)
+        self.assertEqual(limiter.state()['waiting'], 0)
+
+    def test_cancelled_after_grant_frees_slot(self):
+        limiter = RateLimiter(rate = None, max_concurrency = 1)
+        limiter.acquire()
+
+        async def run():
+            waiter = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0)
+
+            # _grant runs (and resolves the waiter's future), then the waiter is cancelled before it resumes
+            limiter.release()
+            await asyncio.sleep(0)
+            waiter.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+
+            await asyncio.wait_for(limiter.acquire_async(), 1)
+
+        asyncio.run(run())
+        self.assertEqual(limiter.state()['in_flight'], 1)
+        self.assertEqual(limiter.state()['waiting'], 0)
+
+
+class StandInRateLimitTest(unittest.TestCase):
+    def test_headers_from_stand_in(self):
+        limiter = RateLimiter(rate = None, burst = 20)
+
+        with standin.StandIn(rate_limit = 3) as server:
+            for _ in range(4):
+                r = requests.get(server.url + '/api-v1/system', params = {'systemName' : 'Sol'})
+                limiter.update(r.status_code, r.headers)
+
+        self.assertEqual(r.status_code, 429)
+
+        state = limiter.state()
+        self.assertEqual(state['limit'], 3.0)
+        self.assertEqual(state['remaining'], 0.0)
+        self.assertEqual(state['throttled'], 1)
@@ -0,0 +1,95 @@
+import unittest
+
+import json
+import os
+import tempfile
+
+from unittest import mock
+
+from edsm import reader
+
+SNAPSHOTS = [
+    {'timestamp' : t, 'data' : [
+        {'system' : {'name' : 'Sol', 'id64' : 1}, 'traffic' : {'traffic' : {'day' : t}, 'breakdown' : {}}},
+        {'system' : {'name' : 'Alcor', 'id64' : 2}, 'stations' : [{'name' : 'A', 'economy' : 'Industrial'}, {'name' : 'B', 'economy' : None}]},
+    ]} for t in range(100, 110)
+]
+
+
+class ReaderTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        self.json_path = os.path.join(tmp.name, 'log.json')
+        with open(self.json_path, 'w') as f:
+            f.write(json.dumps(SNAPSHOTS, indent = 2))
+
+        self.jsonl_path = os.path.join(tmp.name, 'log.jsonl')
+        with open(self.jsonl_path, 'w') as f:
+            f.write(''.join(json.dumps(snapshot) + '\n' for snapshot in SNAPSHOTS))
+
+        self.empty_path = os.path.join(tmp.name, 'empty.json')
+        open(self.empty_path, 'w').close()
+
+    def test_detect_format(self):
+        self.assertEqual(reader.detect_format(self.json_path), 'json')
+        self.assertEqual(reader.detect_format(self.jsonl_path), 'jsonl')
+        self.assertIs(reader.detect_format(self.empty_path), None)
+
+    def test_iter_raw(self):
+        self.assertEqual(list(reader.iter_raw(self.json_path)), SNAPSHOTS)
+        self.assertEqual(list(reader.iter_raw(self.jsonl_path)), SNAPSHOTS)
+        self.assertEqual(list(reader.iter_raw(self.empty_path)), [])
+
+    @mock.patch('edsm.reader.CHUNK_SIZE', 7)
+    def test_iter_array_small_chunks(self):
+        self.assertEqual(list(reader.iter_raw(self.json_path)), SNAPSHOTS)
+
+    @mock.patch('edsm.reader.CHUNK_SIZE', 64)
+    def test_large_item_decoded_few_times(self):
+        snapshot = {'timestamp' : 1, 'data' : [{'system' : {'name' : f'System {i}'}} for i in range(2000)]}
+        with open(self.json_path, 'w') as f:
+            f.write(json.dumps([snapshot, snapshot]))
+
+        decoder = reader._decoder
+        attempts = []
+
+        def raw_decode(s, idx = 0):
+            attempts.append(idx)
+            return decoder.raw_decode(s, idx)
+
+        # each item is about 1000 chunks long
+        with mock.patch.object(reader, '_decoder', mock.Mock(raw_decode = raw_decode)):
+            self.assertEqual(list(reader.iter_raw(self.json_path)), [snapshot, snapshot])
+
+        self.assertLess(len(attempts), 30)
+
+    def test_truncated_array(self):
+        with open(self.json_path, 'r+') as f:
+            f.truncate(500)
+
+        self.assertRaises(json.JSONDecodeError, list, reader.iter_raw(self.json_path))
+
+    def test_time_range(self):
+        snapshots = list(reader.iter_snapshots(self.jsonl_path, start = 102, end = 104))
+
+        self.assertEqual([s['timestamp'] for s in snapshots], [102, 103, 104])
+
+    def test_stops_after_end(self):
+        with mock.patch('edsm.reader.iter_raw', return_value = iter(SNAPSHOTS)) as iter_raw:
+            snapshots = reader.iter_snapshots(self.jsonl_path, end = 101)
+            self.assertEqual([s['timestamp'] for s in snapshots], [100, 101])
+
+        # the rest of the file isn't read once a snapshot past end turns up
+        self.assertEqual(len(list(iter_raw.return_value)), len(SNAPSHOTS) - 3)
+
+    def test_systems_filter(self):
+        for snapshot in reader.iter_snapshots(self.json_path, systems = ['sol']):
+            self.assertEqual([entry['system']['name'] for entry in snapshot['data']], ['Sol'])
+
+    def test_fields(self):
+        snapshot = next(reader.iter_snapshots(self.json_path, fields = ['system.name', 'traffic.traffic', 'stations.name']))
+
+        self.assertEqual(snapshot['data'][0], {'system' : {'name' : 'Sol'}, 'traffic' : {'traffic' : {'day' : 100}}})
+        self.assertEqual(snapshot['data'][1], {'system' : {'name' : 'Alcor'}, 'stations' : [{'name' : 'A'}, {'name' : 'B'}]})
@@ -0,0 +1,65 @@
+import math
+import unittest
+
+import edsm.region as region
+
+from edsm.models import Systems
+
+from tests import standin
+
+
+def lattice(low, high) -> set[tuple]:
+    ranges = [range(math.ceil(lo / standin.LATTICE), math.floor(hi / standin.LATTICE) + 1) for lo, hi in zip(low, high)]
+    return {(i, j, k) for i in ranges[0] for j in ranges[1] for k in ranges[2]}
+
+
+class TilesTest(unittest.TestCase):
+    def test_tiles_cover_box(self):
+        centers = region.tiles((-500, -500, -100), (500, 500, 100), size = 200)
+        self.assertEqual(len(centers), 5 * 5 * 1)
+        self.assertIn((-400, -400, 0), centers)
+
+    def test_small_box_is_one_tile(self):
+        self.assertEqual(region.tiles((0, 0, 0), (50, 50, 50)), [(25, 25, 25)])
+
+    def test_dedupe(self):
+        systems_data = [{'id64' : 1, 'name' : 'A'}, {'id64' : 1, 'name' : 'A'}, {'name' : 'B'}, {'name' : 'b'}]
+        self.assertEqual(region.dedupe(systems_data), [{'id64' : 1, 'name' : 'A'}, {'name' : 'B'}])
+
+
+class FetchTest(standin.StandInTestCase):
+    def test_fetch_box(self):
+        low, high = (-250, -100, -30), (250, 130, 30)
+        systems_data = region.fetch_box(low, high)
+
+        coords = {tuple(s['coords'][axis] // standin.LATTICE for axis in 'xyz') for s in systems_data}
+        self.assertEqual(len(coords), len(systems_data))
+        self.assertEqual(coords, lattice(low, high))
+
+        # tiles are fetched separately
+        self.assertEqual(len(self.server.requests), len(region.tiles(low, high)))
+
+    def test_fetch_sphere(self):
+        systems_data = region.fetch_sphere((0, 0, 0), 300)
+
+        self.assertEqual(len(systems_data), len({s['id64'] for s in systems_data}))
+        self.assertTrue(all(s['distance'] <= 300 for s in systems_data))
+        self.assertEqual(systems_data[0]['name'], 'Lattice 0 0 0')
+
+        expected = [p for p in lattice((-300,) * 3, (300,) * 3) if math.dist(p, (0, 0, 0)) * standin.LATTICE <= 300]
+        self.assertEqual(len(systems_data), len(expected))
+
+    def test_fetch_sphere_unknown_center(self):
+        with self.assertRaises(ValueError):
+            region.fetch_sphere('Unknown System', 50)
+
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_populate(self):
+        systems = Systems()
+        systems.add_system(standin.system({'systemName' : 'Lattice 0 0 0'}))
+
+        added = region.populate(systems, region.fetch_box((-20, -20, -20), (20, 20, 20)))
+
+        self.assertEqual(added, 26)
+        self.assertEqual(len(systems), 27)
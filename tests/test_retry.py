@@ -0,0 +1,50 @@
+import unittest
+
+from unittest import mock
+
+import requests
+
+from edsm import retry
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} Error', response = response)
+
+
+class RetryTest(unittest.TestCase):
+    def test_is_transient(self):
+        self.assertTrue(retry.is_transient(http_error(503)))
+        self.assertTrue(retry.is_transient(http_error(429)))
+        self.assertTrue(retry.is_transient(requests.ConnectionError()))
+        self.assertFalse(retry.is_transient(http_error(404)))
+        self.assertFalse(retry.is_transient(KeyError('name')))
+
+    def test_backoff_delay(self):
+        for attempt in range(10):
+            self.assertLessEqual(retry.backoff_delay(attempt, base = 1, cap = 8), 8)
+
+    @mock.patch('edsm.config.RETRY_BACKOFF', 0)
+    def test_call_with_retries(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise http_error(502)
+            return 'ok'
+
+        self.assertEqual(retry.call_with_retries(flaky, attempts = 3), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    @mock.patch('edsm.config.RETRY_BACKOFF', 0)
+    def test_gives_up(self):
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise http_error(502)
+
+        self.assertRaises(requests.HTTPError, retry.call_with_retries, broken, attempts = 2)
+        self.assertEqual(len(calls), 2)
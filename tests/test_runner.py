@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from collections import Counter
+
+import edsm.reader as reader
+
+from edsm.log import Logger
+from edsm.runner import Runner
+
+from tests import standin
+
+
+class RunnerTest(standin.StandInTestCase):
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.runner = Runner(max_workers = 4)
+        self.addCleanup(self.runner.close)
+
+        self.traffic_logger = Logger({'system' : ['name'], 'traffic' : ['traffic']}, format = 'jsonl')
+        self.traffic_logger.filepath = os.path.join(directory.name, 'traffic.jsonl')
+        self.traffic_logger.systems.populate([standin.system({'systemName' : f'System {i}'}) for i in range(0, 6)])
+
+        self.station_logger = Logger({'system' : ['name'], 'traffic' : ['traffic'], 'stations' : ['name']}, format = 'jsonl')
+        self.station_logger.filepath = os.path.join(directory.name, 'stations.jsonl')
+        self.station_logger.systems.populate([standin.system({'systemName' : f'System {i}'}) for i in range(3, 9)])
+
+        self.runner.add(self.traffic_logger, cadences = {'traffic' : 900})
+        self.runner.add(self.station_logger, cadences = {'traffic' : 900, 'stations' : 3600})
+
+    def test_systems_are_shared(self):
+        self.assertEqual(len(self.runner.systems), 9)
+        self.assertIs(self.traffic_logger.systems['System 4'], self.station_logger.systems['System 4'])
+
+    def test_each_system_fetched_once(self):
+        all_kinds = {'traffic', 'stations', 'markets'}
+        self.runner.log(3600, {self.traffic_logger : all_kinds, self.station_logger : all_kinds})
+
+        counts = Counter(path.rsplit('/', 1)[-1] for path, params in self.server.requests)
+        self.assertEqual(counts, {'traffic' : 9, 'stations' : 6})
+
+        traffic = list(reader.iter_snapshots(self.traffic_logger.filepath))
+        stations = list(reader.iter_snapshots(self.station_logger.filepath))
+
+        self.assertEqual(traffic[0]['timestamp'], 3600)
+        self.assertEqual(len(traffic[0]['data']), 6)
+        self.assertEqual(stations[0]['data'][0]['traffic'], traffic[0]['data'][3]['traffic'])
+        self.assertEqual(len(stations[0]['data'][0]['stations']), 3)
+
+    def test_only_due_loggers(self):
+        self.runner.log(900, {self.traffic_logger : {'traffic'}})
+
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertFalse(os.path.exists(self.station_logger.filepath))
+
+    def test_remove(self):
+        self.runner.remove(self.station_logger)
+
+        self.assertEqual(len(self.runner.systems), 6)
+        self.assertNotIn('System 8', self.runner.systems)
+
+    def test_run_without_loggers(self):
+        self.runner.remove(self.traffic_logger)
+        self.runner.remove(self.station_logger)
+
+        with self.assertRaises(ValueError):
+            self.runner.run()
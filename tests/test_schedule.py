@@ -0,0 +1,102 @@
+import unittest
+
+from unittest import mock
+
+from edsm.log import Logger
+from edsm.schedule import Schedule
+
+from tests import standin
+
+
+class ScheduleTest(unittest.TestCase):
+    def setUp(self):
+        self.schedule = Schedule({'traffic' : 900, 'markets' : 3600, 'stations' : 86400})
+
+    def test_wall_clock_boundaries(self):
+        self.assertEqual(self.schedule.next_boundary(86400 + 10), 86400 + 900)
+        self.assertEqual(self.schedule.next_boundary(86400 + 900), 86400 + 1800)
+
+    def test_everything_due_at_first_boundary(self):
+        self.assertEqual(self.schedule.due(900), {'traffic', 'markets', 'stations'})
+
+    def test_cadences(self):
+        self.schedule.mark(0, {'traffic', 'markets', 'stations'})
+
+        self.assertEqual(self.schedule.due(900), {'traffic'})
+        self.schedule.mark(900, {'traffic'})
+
+        self.assertEqual(self.schedule.due(3600), {'traffic', 'markets'})
+        self.assertEqual(self.schedule.due(86400), {'traffic', 'markets', 'stations'})
+
+    def test_overrun_catches_up(self):
+        self.schedule.mark(0, {'traffic', 'markets', 'stations'})
+        self.schedule.mark(2700, {'traffic'})
+
+        # cycle at 2700 ran past 3600, so markets are picked up at the next boundary
+        self.assertEqual(self.schedule.missed(2700, 3700), 1)
+        self.assertEqual(self.schedule.next_boundary(3700), 4500)
+        self.assertEqual(self.schedule.due(4500), {'traffic', 'markets'})
+
+    def test_invalid_cadence(self):
+        self.assertRaises(ValueError, Schedule, {'traffic' : 0})
+
+
+class LoggerKindsTest(standin.StandInTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.logger = Logger({'system' : ['name'], 'traffic' : ['traffic'], 'stations' : ['name', 'market']})
+        self.logger.systems.populate([standin.system({'systemName' : 'Sol'})])
+
+    def bump_market_time(self, station:int):
+        # has the stand-in report a newer market updateTime for one station of every system
+        def stations(params):
+            data = standin.stations(params)
+            data['stations'][station]['updateTime']['market'] = '2021-10-09 08:00:00'
+            return data
+
+        self.server.routes = dict(standin.ROUTES, **{'/api-system-v1/stations' : stations})
+
+    def test_only_due_kinds_are_updated(self):
+        with mock.patch.object(self.logger, 'append') as append:
+            self.logger.log(timestamp = 900, kinds = {'traffic', 'stations', 'markets'})
+            self.assertEqual(len(self.server.requests), 4)
+
+            self.logger.log(timestamp = 1800, kinds = {'stations'})
+
+        paths = [path for path, params in self.server.requests[4:]]
+        self.assertEqual(paths, ['/api-system-v1/stations'])
+
+        payload = append.call_args[0][0]
+        self.assertEqual(payload[0]['timestamp'], 1800)
+        self.assertIsNotNone(payload[0]['data'][0]['traffic'])
+
+    def test_markets_only_cycle(self):
+        # markets are due but stations aren't: station lists are still refreshed for their update times
+        with mock.patch.object(self.logger, 'append'):
+            self.logger.log(timestamp = 900, kinds = {'traffic', 'stations', 'markets'})
+
+            self.logger.log(timestamp = 1800, kinds = {'traffic', 'markets'})
+            paths = [path for path, params in self.server.requests[4:]]
+            self.assertEqual(sorted(paths), ['/api-system-v1/stations', '/api-system-v1/traffic'])
+
+            self.bump_market_time(1)
+            self.logger.log(timestamp = 2700, kinds = {'traffic', 'markets'})
+
+        paths = [path for path, params in self.server.requests[6:]]
+        self.assertEqual(sorted(paths), ['/api-system-v1/stations', '/api-system-v1/stations/market', '/api-system-v1/traffic'])
+
+    def test_markets_only_cycle_with_cache(self):
+        from edsm.cache import ResponseCache, set_cache
+
+        old = set_cache(ResponseCache(ttls = {'stations' : 86400}, path = ''))
+        self.addCleanup(set_cache, old)
+
+        with mock.patch.object(self.logger, 'append'):
+            self.logger.log(timestamp = 900, kinds = {'stations', 'markets'})
+
+            self.bump_market_time(0)
+            self.logger.log(timestamp = 1800, kinds = {'markets'})
+
+        paths = [path for path, params in self.server.requests[3:]]
+        self.assertEqual(paths, ['/api-system-v1/stations', '/api-system-v1/stations/market'])
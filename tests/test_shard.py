@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import edsm.metrics as metrics
+import edsm.reader as reader
+import edsm.shard as shard
+
+from unittest import mock
+
+from tests import standin
+
+KEYS = {'system' : ['name'], 'traffic' : ['traffic'], 'stations' : ['name', 'market']}
+
+
+class InterleaveTest(unittest.TestCase):
+    def test_interleave(self):
+        items = list(range(7))
+        self.assertEqual(shard.interleave([items[i::3] for i in range(3)]), items)
+
+
+class LimiterOptionsTest(unittest.TestCase):
+    @mock.patch.multiple('edsm.config', RATE_LIMIT = 6.0, RATE_LIMIT_BURST = 10, MAX_THREADS = 8, ASYNC_MAX_CONCURRENCY = 1)
+    def test_split_between_shards(self):
+        options = shard.limiter_options(4)
+        self.assertEqual(options, {'rate' : 1.5, 'burst' : 2, 'max_concurrency' : 2, 'share' : 0.25})
+
+        # each shard only spends its share of what EDSM reports is left
+        limiter = shard.ratelimit.RateLimiter(**options)
+        limiter.update(200, {'X-Rate-Limit-Remaining' : '360', 'X-Rate-Limit-Reset' : '60'})
+        self.assertEqual(limiter.state()['rate'], 1.5)
+
+
+class ShardedLoggerTest(standin.StandInTestCase):
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def make_logger(self, **kwargs):
+        logger = shard.ShardedLogger(KEYS, shards = 3, **kwargs)
+        logger.systems.populate([standin.system({'systemName' : f'Test {i}'}) for i in range(7)])
+        self.addCleanup(logger.close)
+
+        return logger
+
+    def check_snapshots(self, snapshots):
+        self.assertEqual(len(snapshots), 2)
+
+        for snapshot in snapshots:
+            data = snapshot['data']
+            self.assertEqual([entry['system']['name'] for entry in data], [f'Test {i}' for i in range(7)])
+            self.assertEqual(data[3]['traffic']['traffic'], standin.traffic({'systemName' : 'Test 3'})['traffic'])
+            self.assertEqual(len(data[0]['stations'][0]['market']), 4)
+
+    def test_merged(self):
+        logger = self.make_logger(format = 'jsonl')
+        logger.filepath = os.path.join(self.directory, 'log.jsonl')
+
+        logger.log()
+        logger.log()
+
+        self.check_snapshots(list(reader.iter_snapshots(logger.filepath)))
+
+    def test_segments(self):
+        logger = self.make_logger(segments = True)
+        logger.filepath = os.path.join(self.directory, 'log.index')
+
+        logger.log()
+        logger.log()
+
+        self.assertTrue(os.path.exists(shard.segment_path(logger.filepath, 2)))
+        self.check_snapshots(list(shard.iter_segmented(logger.filepath)))
+
+    def test_metrics_forwarded(self):
+        recorder = metrics.Metrics()
+        old = metrics.set_metrics(recorder)
+        self.addCleanup(metrics.set_metrics, old)
+
+        logger = self.make_logger(format = 'jsonl')
+        logger.filepath = os.path.join(self.directory, 'log.jsonl')
+        logger.log()
+
+        snapshot = recorder.snapshot()
+        self.assertEqual(snapshot['requests']['traffic'][200]['count'], 7)
+        self.assertEqual(snapshot['phases']['total']['duration']['count'], 1)
+
+    def test_shard_error(self):
+        logger = self.make_logger(format = 'jsonl')
+        logger.filepath = os.path.join(self.directory, 'log.jsonl')
+
+        self.server.fail = lambda path, params: 400 if path.endswith('traffic') else None
+        self.assertRaises(Exception, logger.log)
+        self.assertFalse(os.path.exists(logger.filepath))
+
+    def test_columnar_rejected(self):
+        self.assertRaises(ValueError, shard.ShardedLogger, KEYS, format = 'columnar')
@@ -0,0 +1,99 @@
+import math
+import random
+import unittest
+
+from unittest import mock
+
+import edsm.spatial as spatial
+
+from edsm.models import Systems
+
+
+def make_systems(n:int) -> Systems:
+    rng = random.Random(0)
+
+    systems = Systems()
+    systems.populate([
+        {'name' : f'System {i}', 'coords' : {'x' : rng.uniform(-100, 100), 'y' : rng.uniform(-100, 100), 'z' : rng.uniform(-100, 100)}}
+        for i in range(n)
+    ])
+
+    return systems
+
+def brute_force(systems:Systems, center, radius:float) -> list[str]:
+    center = spatial.coords_of(center)
+    return sorted(system.name for system in systems if math.dist(center, spatial.coords_of(system)) <= radius)
+
+
+class SpatialIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.systems = make_systems(500)
+        self.index = self.systems.spatial_index(cell_size = 10)
+
+    def test_within(self):
+        for center, radius in [((0, 0, 0), 30), (self.systems['System 7'], 45), ((90, -90, 90), 5)]:
+            found = self.index.within(center, radius)
+
+            self.assertEqual(sorted(system.name for system, distance in found), brute_force(self.systems, center, radius))
+            self.assertEqual([distance for system, distance in found], sorted(distance for system, distance in found))
+
+    @unittest.skipIf(spatial.numpy is None, "NumPy isn't installed")
+    def test_numpy_distances_match_fallback(self):
+        cells = list(self.index.cells.values())
+
+        systems, distances = self.index._distances(cells, (1.0, 2.0, 3.0))
+        with mock.patch.object(spatial, 'numpy', None):
+            fallback_systems, fallback_distances = self.index._distances(cells, (1.0, 2.0, 3.0))
+
+        self.assertEqual(systems, fallback_systems)
+        for distance, fallback in zip(distances, fallback_distances):
+            self.assertAlmostEqual(distance, fallback)
+
+    def test_within_without_numpy(self):
+        with mock.patch.object(spatial, 'numpy', None):
+            found = self.index.within((0, 0, 0), 30)
+
+        self.assertEqual(sorted(system.name for system, distance in found), brute_force(self.systems, (0, 0, 0), 30))
+
+    def test_nearest(self):
+        center = (12.5, -3, 40)
+        expected = sorted(self.systems, key = lambda system: math.dist(center, spatial.coords_of(system)))[:8]
+
+        self.assertEqual([system for system, distance in self.index.nearest(center, 8)], expected)
+        self.assertEqual(len(self.index.nearest(center, 1000)), 500)
+
+    def test_in_box(self):
+        found = self.index.in_box((-20, -20, -20), {'x' : 20, 'y' : 20, 'z' : 20})
+        expected = [system for system in self.systems if all(-20 <= c <= 20 for c in spatial.coords_of(system))]
+
+        self.assertCountEqual(found, expected)
+
+    def test_incremental(self):
+        self.systems.add_system({'name' : 'Origin', 'coords' : {'x' : 0.0, 'y' : 0.0, 'z' : 0.0}})
+        self.assertIs(self.index.nearest((0, 0, 0), 1)[0][0], self.systems['Origin'])
+
+        self.systems.remove('Origin')
+        self.assertNotIn('Origin', [system.name for system, distance in self.index.within((0, 0, 0), 5)])
+        self.assertEqual(len(self.index), 500)
+
+    def test_incremental_from_empty(self):
+        systems = Systems()
+        index = systems.spatial_index()
+
+        systems.add_system({'name' : 'Origin', 'coords' : {'x' : 0.0, 'y' : 0.0, 'z' : 0.0}})
+        self.assertEqual(len(index), 1)
+
+        # emptied again, then refilled
+        systems.remove('Origin')
+        systems.add_system({'name' : 'Far', 'coords' : {'x' : 50.0, 'y' : 0.0, 'z' : 0.0}})
+        self.assertEqual([system.name for system, distance in index.nearest((0, 0, 0), 5)], ['Far'])
+
+    def test_without_coords(self):
+        self.systems.add_system({'name' : 'Nowhere'})
+        self.assertEqual(len(self.index), 500)
+
+    def test_around(self):
+        around = self.systems.around('System 3', 25)
+
+        self.assertEqual(sorted(system.name for system in around), brute_force(self.systems, self.systems['System 3'], 25))
+        self.assertEqual(next(iter(around)).name, 'System 3')
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+import edsm.models as models
+
+from edsm.log import Logger
+from edsm.sqlstore import SQLiteStore
+
+from tests import standin
+
+KEYS = {'system' : ['name'], 'traffic' : ['traffic', 'breakdown'], 'stations' : ['name', 'market']}
+
+
+class SQLiteLoggerTest(standin.StandInTestCase):
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.logger = Logger(KEYS, format = 'sqlite')
+        self.logger.filepath = os.path.join(directory.name, 'log.sqlite')
+        self.logger.systems.populate([{'name' : 'Sol'}, {'name' : 'Alcor'}])
+
+        # NOTE: markets are fetched every cycle, so every snapshot has prices
+        with mock.patch('edsm.config.INCREMENTAL_MARKETS', False):
+            for timestamp in (1000, 2000, 3000):
+                self.logger.log(timestamp)
+
+        self.addCleanup(self.logger.sqlite_store.close)
+
+        self.store = SQLiteStore(self.logger.filepath, readonly = True)
+        self.addCleanup(self.store.close)
+
+    def test_traffic_history(self):
+        id64 = standin.system_id64('Sol')
+        history = self.store.traffic_history(id64, start = 2000)
+
+        self.assertEqual([row['timestamp'] for row in history], [2000, 3000])
+        self.assertEqual(history[0]['day'], standin.traffic({'systemName' : 'Sol'})['traffic']['day'])
+        self.assertEqual(history[0]['breakdown'], standin.traffic({'systemName' : 'Sol'})['breakdown'])
+
+    def test_price_history(self):
+        station = self.logger.systems['Alcor'].stations.list[0]
+        history = self.store.price_history(station.marketId, 'Gold', end = 2000)
+
+        expected = [c for c in standin.market({'marketId' : station.marketId})['commodities'] if c['id'] == 'gold'][0]
+        self.assertEqual([row['timestamp'] for row in history], [1000, 2000])
+        self.assertEqual(history[0]['sellPrice'], expected['sellPrice'])
+        self.assertEqual(history[0]['stock'], expected['stock'])
+
+    def test_normalized_tables(self):
+        conn = self.store.conn
+
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0], 3)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM systems').fetchone()[0], 2)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM stations').fetchone()[0], 6)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM commodities').fetchone()[0], 4)
+
+        # 2 systems x 2 stations with markets x 4 commodities, per snapshot
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0], 3 * 16)
+
+    def test_indexes_used(self):
+        plan = ' '.join(row[-1] for row in self.store.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM prices WHERE marketId = 1 AND commodity = 1 AND timestamp > 0'
+        ))
+
+        self.assertIn('prices_market_commodity_timestamp', plan)
+        self.assertEqual(self.store.conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def prices_at(self, timestamp:int) -> int:
+        return self.store.conn.execute('SELECT COUNT(*) FROM prices WHERE timestamp = ?', (timestamp,)).fetchone()[0]
+
+    def traffic_at(self, timestamp:int) -> int:
+        return self.store.conn.execute('SELECT COUNT(*) FROM traffic WHERE timestamp = ?', (timestamp,)).fetchone()[0]
+
+    def test_only_updated_kinds_stored(self):
+        self.logger.log(4000, kinds = {'traffic'})
+
+        self.assertEqual(self.traffic_at(4000), 2)
+        self.assertEqual(self.prices_at(4000), 0)
+
+    def test_carried_forward_markets_skipped(self):
+        # stand-in market update times never move, so no market is fetched again
+        self.logger.log(4000)
+        self.assertEqual(self.prices_at(4000), 0)
+
+        self.logger.systems['Sol'].stations.list[0].update_market(force = True)
+        self.logger.append(self.logger.generate_payload(5000))
+        self.assertEqual(self.prices_at(5000), 4)
+
+    def test_failed_updates_skipped(self):
+        self.server.fail = lambda path, params: 404 if params.get('systemName') == 'Sol' or params.get('marketId') else None
+
+        with mock.patch('edsm.config.INCREMENTAL_MARKETS', False), mock.patch('edsm.config.ERROR_BUDGET', 1.0):
+            self.logger.log(4000)
+
+        self.assertEqual(self.traffic_at(4000), 1)
+        self.assertEqual(self.prices_at(4000), 0)
+
+    def test_nulls_stored_as_null(self):
+        station = self.logger.systems['Alcor'].stations.list[0]
+        commodities = station.market.commodities
+        commodities[0]['buyPrice'] = None
+        station.market = models.Market(dict(station.market.data, commodities = commodities))
+
+        self.logger.append(self.logger.generate_payload(4000))
+        history = self.store.price_history(station.marketId, 'gold', start = 4000)
+
+        self.assertIs(history[0]['buyPrice'], None)
+        self.assertIsNot(history[0]['sellPrice'], None)
+
+    def test_readonly(self):
+        self.assertRaises(PermissionError, self.store.append_systems, 4000, self.logger.systems)
+
+    def test_failed_cycle_is_rolled_back(self):
+        with mock.patch('edsm.sqlstore.codec.dumps', side_effect = ValueError):
+            self.assertRaises(ValueError, self.logger.append, self.logger.generate_payload(4000))
+
+        self.assertEqual(self.store.conn.execute('SELECT MAX(timestamp) FROM snapshots').fetchone()[0], 3000)